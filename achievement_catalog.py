@@ -0,0 +1,35 @@
+class AchievementCatalog:
+    """The achievements table held in memory, plus a bit per achievement for earned-sets.
+
+    A user's earned achievements are stored as one int with a bit set for each
+    achievement (see UserStateCache's 'earned' field), so "already has it?" is
+    a mask test. Bits stay the same across reloads; new achievements get new bits.
+    """
+
+    def __init__(self):
+        self.achievements = {}  # achievement_id -> achievement dict (a row of achievements)
+        self._bits = {}  # achievement_id -> bit
+
+    def __len__(self):
+        return len(self.achievements)
+
+    async def load(self, conn):
+        """(Re)loads every achievement."""
+        rows = await conn.fetch("SELECT * FROM achievements ORDER BY achievement_id")
+        self.achievements = {row['achievement_id']: dict(row) for row in rows}
+        for achievement_id in self.achievements:
+            self._bits.setdefault(achievement_id, 1 << len(self._bits))
+        print(f" Loaded achievement catalog: {len(self.achievements)} achievement(s).")
+
+    def get(self, achievement_id):
+        return self.achievements.get(achievement_id)
+
+    def bit(self, achievement_id):
+        return self._bits.get(achievement_id, 0)
+
+    def mask(self, achievement_ids):
+        """Returns the earned-set bitmask for a list of achievement ids."""
+        mask = 0
+        for achievement_id in achievement_ids:
+            mask |= self._bits.get(achievement_id, 0)
+        return mask
@@ -0,0 +1,173 @@
+"""Blackjack engine: integer cards, incremental hand totals, no Discord.
+
+A card is an int 0-51: rank = card % 13 (0 = ace ... 12 = king), suit = card // 13.
+"""
+import random
+from array import array
+from economy import DEALER_STANDS_ON, blackjack_winnings
+
+SUITS = ('♠', '♥', '♦', '♣')
+RANKS = ('A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K')
+RANK_VALUES = (11, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10)  # Aces start as 11
+CARDS_PER_DECK = 52
+
+
+def card_value(card):
+    return RANK_VALUES[card % 13]
+
+
+def format_card(card):
+    """Display form of a card, e.g. 'A♠' or '10♥'."""
+    return f"{RANKS[card % 13]}{SUITS[card // 13]}"
+
+
+def hand_value(cards):
+    """Total of a list of cards, counting aces as 1 where needed to stay at 21 or under."""
+    hand = Hand()
+    for card in cards:
+        hand.add(card)
+    return hand.total
+
+
+class Shoe:
+    """One or more shuffled decks dealt from the end. Reshuffles a full shoe when it runs out."""
+    __slots__ = ('decks', 'rng', 'cards')
+
+    def __init__(self, decks=1, rng=None):
+        self.decks = decks
+        self.rng = rng or random
+        self.cards = array('B')
+        self.shuffle()
+
+    def shuffle(self):
+        cards = list(range(CARDS_PER_DECK)) * self.decks
+        self.rng.shuffle(cards)
+        self.cards = array('B', cards)
+
+    def draw(self):
+        if not self.cards:
+            self.shuffle()
+        return self.cards.pop()
+
+    def __len__(self):
+        return len(self.cards)
+
+
+class Hand:
+    """A hand's cards plus its running total and the number of aces still counted as 11."""
+    __slots__ = ('cards', 'total', 'soft_aces')
+
+    def __init__(self):
+        self.cards = array('B')
+        self.total = 0
+        self.soft_aces = 0
+
+    def add(self, card):
+        """Adds a card and updates the total in O(1)."""
+        self.cards.append(card)
+        value = card_value(card)
+        self.total += value
+        if value == 11:
+            self.soft_aces += 1
+        while self.total > 21 and self.soft_aces:
+            self.total -= 10
+            self.soft_aces -= 1
+        return self.total
+
+    @property
+    def is_bust(self):
+        return self.total > 21
+
+    @property
+    def is_natural(self):
+        return len(self.cards) == 2 and self.total == 21
+
+    def format(self, hide_second=False):
+        """Display form of the hand, optionally with the dealer's hole card hidden."""
+        if hide_second and len(self.cards) > 1:
+            return f"{format_card(self.cards[0])} 🂠"
+        return " ".join(format_card(card) for card in self.cards)
+
+
+class BlackjackGame:
+    """One player's game against the dealer. channel_id is where the game is being played."""
+    __slots__ = ('bet', 'channel_id', 'shoe', 'player', 'dealer', 'result')
+
+    def __init__(self, bet, channel_id, shoe=None):
+        self.bet = bet
+        self.channel_id = channel_id
+        self.shoe = shoe or Shoe()
+        self.player = Hand()
+        self.dealer = Hand()
+        self.result = None  # Set once the game is over: win / blackjack / push / lose / bust
+        for hand in (self.player, self.player, self.dealer, self.dealer):
+            hand.add(self.shoe.draw())
+
+    @property
+    def winnings(self):
+        """Coins returned to the player (0 until the game is over)."""
+        return blackjack_winnings(self.result, self.bet) if self.result else 0
+
+
+def to_state(game):
+    """A game in progress as plain data (for game_snapshots)."""
+    return {
+        'bet': game.bet,
+        'channel_id': game.channel_id,
+        'shoe': list(game.shoe.cards),
+        'player': list(game.player.cards),
+        'dealer': list(game.dealer.cards),
+    }
+
+
+def from_state(state, rng=None):
+    """Rebuilds a game saved by to_state(), with the same cards still to come."""
+    shoe = Shoe(rng=rng)
+    shoe.cards = array('B', state['shoe'])
+    game = BlackjackGame.__new__(BlackjackGame)
+    game.bet = state['bet']
+    game.channel_id = state['channel_id']
+    game.shoe = shoe
+    game.player = Hand()
+    game.dealer = Hand()
+    game.result = None
+    for card in state['player']:
+        game.player.add(card)
+    for card in state['dealer']:
+        game.dealer.add(card)
+    return game
+
+
+def deal(bet, channel_id=None, shoe=None):
+    """Starts a game. Returns it already settled if the player was dealt a natural."""
+    game = BlackjackGame(bet, channel_id, shoe)
+    if game.player.is_natural:
+        settle(game)
+    return game
+
+
+def hit(game):
+    """Draws a card for the player. Settles the game on a bust or on reaching 21. Returns the player's total."""
+    total = game.player.add(game.shoe.draw())
+    if total >= 21:
+        settle(game)
+    return total
+
+
+def settle(game):
+    """Finishes a game: the dealer draws to DEALER_STANDS_ON if needed and the result is decided."""
+    player, dealer = game.player, game.dealer
+    if player.is_bust:
+        game.result = "bust"
+    elif player.is_natural:
+        game.result = "push" if dealer.total == 21 else "blackjack"
+    else:
+        while dealer.total < DEALER_STANDS_ON:
+            dealer.add(game.shoe.draw())
+        if dealer.total > 21 or dealer.total < player.total:
+            game.result = "win"
+        elif dealer.total > player.total:
+            game.result = "lose"
+        else:
+            game.result = "push"
+    return game.result
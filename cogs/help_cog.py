@@ -22,7 +22,8 @@ class HelpCommands(commands.Cog):
             value=f"`{prefix}pp` - Roll for your PP size (resets top of the hour, highest daily wins Hog Daddy!). **Earn coins = your roll size!**\n"
                   f"`{prefix}coins [@user]` - Check your (or someone's) PP coin balance. 💰\n"
                   f"`{prefix}profile [@user]` - Show your (or someone's) PP profile, stats, and achievements.\n"
-                  f"`{prefix}leaderboard` or `{prefix}lb` - Show the daily PP leaderboard (resets at midnight UTC).",
+                  f"`{prefix}leaderboard` or `{prefix}lb` - Show the daily PP leaderboard (resets at midnight UTC).\n"
+                  f"`{prefix}rank [@user]` - Show your (or someone's) place on today's leaderboard.",
             inline=False
         )
 
@@ -1,10 +1,12 @@
 import discord
 from discord.ext import tasks, commands
-import asyncpg
-import random
-import os
 from datetime import datetime, timedelta, time, timezone
 import pytz
+from leaderboard import DailyLeaderTracker, BucketLeaderboard, LeaderboardPages
+from member_resolver import MemberResolver
+from user_cache import MISSING
+from roll_engine import RollEngine
+from economy import roll_coins
 
 # --- Constants ---
 DAILY_HOG_DADDY_ROLE_NAME = "Daily Hog Daddy"
@@ -13,12 +15,13 @@ ANNOUNCEMENT_CHANNEL_ID = 934181022659129444 # Channel for reset announcements &
 # --- End Constants ---
 
 class LeaderboardView(discord.ui.View):
-    def __init__(self, data, title="PP Leaderboard (Overall Top Rolls)", sep=10):
+    def __init__(self, pages, title="PP Leaderboard (Overall Top Rolls)", members=None):
         super().__init__(timeout=180) # 3 minute timeout
-        self.data = data
+        self.pages = pages # LeaderboardPages: rows are loaded per page, not up front
+        self.members = members or MemberResolver()
         self.current_page = 1 # Initialize current page
-        self.total_pages = (len(data) + sep - 1) // sep
-        self.sep = sep
+        self.total_pages = pages.total_pages
+        self.sep = pages.page_size
         self.title = title
         self._update_buttons()
 
@@ -33,9 +36,7 @@ class LeaderboardView(discord.ui.View):
             page_button.label = f"Page {self.current_page}/{self.total_pages}"
 
     async def show_page(self, interaction: discord.Interaction):
-        start = (self.current_page - 1) * self.sep
-        end = start + self.sep
-        page_data = self.data[start:end]
+        page_data = await self.pages.get(self.current_page)
         embed = await self.create_leaderboard_embed(page_data, interaction.guild)
         self._update_buttons()
         await interaction.response.edit_message(embed=embed, view=self)
@@ -44,26 +45,25 @@ class LeaderboardView(discord.ui.View):
         embed = discord.Embed(title=self.title, color=discord.Color.blue())
         description = ""
         start_rank = (self.current_page - 1) * self.sep + 1
-        for i, record in enumerate(page_data):
+        # Resolve the whole page at once: member cache first, then one gateway query for the rest
+        members = await self.members.resolve(guild, [user_id for user_id, _, _ in page_data])
+        for i, (user_id, size, _) in enumerate(page_data):
             rank = start_rank + i
-            user = guild.get_member(record['user_id']) # Try cache first
-            user_mention = f"User ID: {record['user_id']}" # Default fallback
-            if user:
-                user_mention = user.mention
+            if user_id not in members:
+                user_mention = f"User ID: {user_id} (Fetch Failed)" # API error
+            elif members[user_id] is None:
+                user_mention = f"User ID: {user_id} (Not Found)" # User left?
             else:
-                # If not in cache, try fetching from Discord API
-                try:
-                    fetched_user = await guild.fetch_member(record['user_id'])
-                    if fetched_user:
-                        user_mention = fetched_user.mention
-                except discord.NotFound:
-                    user_mention = f"User ID: {record['user_id']} (Not Found)" # User left?
-                except discord.HTTPException:
-                    user_mention = f"User ID: {record['user_id']} (Fetch Failed)" # API error
-                    
-            description += f"{rank}. {user_mention} - {record['size']} inches\n"
+                user_mention = members[user_id].mention
+
+            description += f"{rank}. {user_mention} - {size} inches\n"
         embed.description = description or "No users found."
         embed.set_footer(text=f"Page {self.current_page}/{self.total_pages}")
+
+        # Warm up the next page's members while this one is being read (if its rows are already at hand)
+        next_rows = self.pages.peek(self.current_page + 1) if self.current_page < self.total_pages else None
+        if next_rows:
+            self.members.prefetch(guild, [user_id for user_id, _, _ in next_rows])
         return embed
 
     @discord.ui.button(label="<<", style=discord.ButtonStyle.grey, custom_id="first_page", row=0)
@@ -94,25 +94,17 @@ class LeaderboardView(discord.ui.View):
 class PPCore(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.db_pool = None
         self.current_daily_hog_daddy_id = None
         self.daily_hog_daddy_role_id = None 
+        self.daily_leader = DailyLeaderTracker() # Today's highest roll, seeded on ready and at each reset
+        self.board = BucketLeaderboard() # Today's full leaderboard, loaded from pp_sizes on ready
+        self.rolls = RollEngine() # pls pp rolls, modifiers and clamp included (pp_roll() only stores the result)
+        self.members = MemberResolver() # Shared by every LeaderboardView so "user left" results carry over
 
     async def cog_load(self):
-        print("Attempting to connect to the database...")
         try:
-            self.db_pool = await asyncpg.create_pool(dsn=os.getenv('DATABASE_URL'))
-            print("✅ Database pool created successfully.")
-
-            # Create bot_state table if it doesn't exist
-            async with self.db_pool.acquire() as conn:
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS bot_state (
-                        key TEXT PRIMARY KEY,
-                        value TEXT,
-                        updated_at TIMESTAMP WITH TIME ZONE
-                    )
-                """)
+            # The shared pool (and bot_state table) is set up by the PPDB cog
+            await self._get_db()
 
             # Don't initialize guild-specific stuff here - do it when bot is ready
             # We'll use the on_ready event listener instead
@@ -125,9 +117,6 @@ class PPCore(commands.Cog):
 
     async def cog_unload(self):
         self.daily_reset_task.cancel()
-        if self.db_pool:
-            await self.db_pool.close()
-            print("Database pool closed.")
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -144,31 +133,68 @@ class PPCore(commands.Cog):
                 print(f"❌ Error initializing Hog Daddy on ready: {e}")
 
     async def _get_db(self):
-        if not self.db_pool:
+        """Get database pool from PPDB cog"""
+        db_cog = self.bot.get_cog('PPDB')
+        if not db_cog:
+            raise RuntimeError("PPDB cog not loaded!")
+        db = await db_cog.get_db()
+        if not db:
             raise ConnectionError("Database pool is not initialized.")
-        return self.db_pool
+        return db
 
     async def _initialize_daily_hog_daddy(self):
         """Fetches the current daily hog daddy on startup."""
         print("Initializing Daily Hog Daddy...")
+        await self._load_leaderboard()
+        await self._resync_daily_leader()
+
+        if self.daily_leader.user_id:
+            self.current_daily_hog_daddy_id = self.daily_leader.user_id
+            print(f"Initialized Daily Hog Daddy to User ID: {self.current_daily_hog_daddy_id} (Score: {self.daily_leader.size})")
+        else:
+            self.current_daily_hog_daddy_id = None
+            print("No Daily Hog Daddy found for today yet.")
+
+    async def _load_leaderboard(self):
+        """Rebuilds the in-memory leaderboard from pp_sizes."""
+        db = await self._get_db()
+        async with db.acquire() as conn:
+            rows = await conn.fetch("SELECT user_id, size, last_roll_timestamp FROM pp_sizes")
+        self.board.load((row['user_id'], row['size'], row['last_roll_timestamp']) for row in rows)
+        print(f"Loaded {len(self.board)} roll(s) into the in-memory leaderboard.")
+
+    def record_shrink(self, user_id: int, new_size: int):
+        """Called by PPItems after a shrink ray lowers someone's pp_sizes row."""
+        self.board.set_size(user_id, new_size)
+        self.daily_leader.observe_shrink(user_id, new_size)
+
+    async def _resync_daily_leader(self):
+        """Reloads today's highest roll into the in-memory tracker."""
+        start_of_day_utc = datetime.now(pytz.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        # The in-memory leaderboard already knows the answer (pp_sizes only holds today's rolls)
+        if self.board.ready:
+            top = self.board.top()
+            if top:
+                self.daily_leader.seed(start_of_day_utc.date(), *top)
+            else:
+                self.daily_leader.seed(start_of_day_utc.date(), None, None, None)
+            return
+
         db = await self._get_db()
         async with db.acquire() as conn:
-            start_of_day_utc = datetime.now(pytz.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-            
             # Find today's highest roller so far
             record = await conn.fetchrow("""
-                SELECT user_id, size FROM pp_sizes
+                SELECT user_id, size, last_roll_timestamp FROM pp_sizes
                 WHERE last_roll_timestamp >= $1
                 ORDER BY size DESC, last_roll_timestamp ASC
                 LIMIT 1
             """, start_of_day_utc)
 
-            if record:
-                self.current_daily_hog_daddy_id = record['user_id']
-                print(f"Initialized Daily Hog Daddy to User ID: {self.current_daily_hog_daddy_id} (Score: {record['size']})")
-            else:
-                self.current_daily_hog_daddy_id = None
-                print("No Daily Hog Daddy found for today yet.")
+        if record:
+            self.daily_leader.seed(start_of_day_utc.date(), record['user_id'], record['size'], record['last_roll_timestamp'])
+        else:
+            self.daily_leader.seed(start_of_day_utc.date(), None, None, None)
 
     async def _get_hog_daddy_role(self, guild: discord.Guild) -> discord.Role | None:
         """Gets the Daily Hog Daddy role object, caching the ID."""
@@ -190,35 +216,23 @@ class PPCore(commands.Cog):
             return None
 
     async def _update_daily_hog_daddy(self, ctx: commands.Context, user: discord.Member, new_size: int):
-        """Checks if the new roll is the highest today and updates the role."""
+        """Checks if the new roll is the highest today (per the in-memory tracker) and updates the role."""
         guild = ctx.guild
         if not guild:
             return # Should not happen in guild commands
 
-        db = await self._get_db()
-        async with db.acquire() as conn:
-            start_of_day_utc = datetime.now(pytz.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            # Get current highest roll today
-            current_highest = await conn.fetchrow("""
-                SELECT user_id, size FROM pp_sizes
-                WHERE last_roll_timestamp >= $1
-                ORDER BY size DESC, last_roll_timestamp ASC
-                LIMIT 1
-            """, start_of_day_utc)
+        leader_id = self.daily_leader.user_id
 
         # Determine if this user is the new highest today
         is_new_highest = False
         should_ensure_role = False
 
-        if not current_highest: # No rolls today yet
-            is_new_highest = True
-        elif new_size > current_highest['size']: # Higher score
-            is_new_highest = True
-        elif new_size == current_highest['size'] and current_highest['user_id'] == user.id:
-            # Same user rolled the same highest score - ensure they have the role
-            should_ensure_role = True
-        # If new_size == current_highest['size'] but different user, the earlier roll wins for the day.
+        if leader_id == user.id:
+            if self.current_daily_hog_daddy_id != user.id:
+                is_new_highest = True # Took the lead from someone else (or first roll of the day)
+            else:
+                should_ensure_role = True # Still the leader - ensure they have the role
+        # If someone else is still on top (ties go to the earlier roll), nothing changes.
 
         if is_new_highest or should_ensure_role:
             print(f"New Daily Hog Daddy potential: {user.name} ({user.id}) with {new_size} inches.")
@@ -328,6 +342,7 @@ class PPCore(commands.Cog):
                             ON CONFLICT (user_id) DO UPDATE SET
                                 days_as_hog_daddy = user_stats.days_as_hog_daddy + 1
                         """, winner_id)
+                        db.users.add('user_stats', winner_id, {'days_as_hog_daddy': 1})
                         print(f"Incremented days_as_hog_daddy for {winner_id}")
 
                         # Grant achievement if needed
@@ -378,6 +393,7 @@ class PPCore(commands.Cog):
                 # Reset the leaderboard by clearing the pp_sizes table
                 try:
                     await conn.execute("DELETE FROM pp_sizes")
+                    db.users.clear_field('pp_size')
                     print("Leaderboard reset: pp_sizes table cleared for the new day.")
                 except Exception as e:
                     print(f"Error resetting leaderboard: {e}")
@@ -391,8 +407,10 @@ class PPCore(commands.Cog):
                         updated_at = $2
                 """, now_utc.strftime("%Y-%m-%d"), now_utc)
 
-                # Reset internal tracker for the new day
+                # Reset internal trackers for the new day
                 self.current_daily_hog_daddy_id = None
+                self.daily_leader.reset(now_utc.date())
+                self.board.clear()
                 print("Daily Hog Daddy ID reset for the new day.")
                 print("--- Daily Reset Task Finished ---")
         except Exception as e:
@@ -447,100 +465,49 @@ class PPCore(commands.Cog):
         db = await self._get_db()
         profile_cog = self.bot.get_cog('PPProfile')
 
-        # Check cooldown using last_roll_timestamp
-        async with db.acquire() as conn:
-            last_roll_ts = await conn.fetchval(
-                "SELECT last_roll_timestamp FROM pp_sizes WHERE user_id = $1",
-                user_id
-            )
-        
-        now = datetime.now(timezone.utc) # Use timezone aware datetime
-        if last_roll_ts:
-            # Check if the last roll was within the current calendar hour
-            if (now.year == last_roll_ts.year and
-                now.month == last_roll_ts.month and
-                now.day == last_roll_ts.day and
-                now.hour == last_roll_ts.hour):
-                
-                # Calculate time until the next hour begins
-                next_hour = (now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1))
-                retry_after = next_hour - now
-                
-                # Format the remaining time nicely
-                minutes_left = int(retry_after.total_seconds() // 60)
-                seconds_left = int(retry_after.total_seconds() % 60)
-                
-                wait_message = ""
-                if minutes_left > 0:
-                    wait_message += f"{minutes_left} minute{'s' if minutes_left > 1 else ''}"
-                if seconds_left > 0:
-                    if minutes_left > 0:
-                        wait_message += " and "
-                    wait_message += f"{seconds_left} second{'s' if seconds_left > 1 else ''}"
-                    
-                await ctx.send(f"⏳ Woah there, buddy! You gotta wait {wait_message} to measure again (until the top of the hour).")
-                return
-
-        base_size = random.choices(list(range(21)), weights=[1, 2, 3, 5, 7, 10, 15, 18, 20, 25, 30, 30, 25, 20, 15, 10, 7, 5, 3, 2, 1], k=1)[0]
-        final_size = base_size
-
-        # Apply event effects if any
+        # Event effects live in memory, so they're passed into the roll
         event_cog = self.bot.get_cog('PPEvents')
-        if event_cog:
-            event_effect = event_cog.get_current_event_effect()
-            if event_effect:
-                final_size += event_effect['effect']
-                print(f"Applied event effect '{event_effect['name']}': {event_effect['effect']} to user {user_id}")
-
-        # Apply active item effects from database
-        async with db.acquire() as conn:
-            active_boost = await conn.fetchrow("""
-                SELECT effect_value FROM user_active_effects
-                WHERE user_id = $1 AND effect_type = 'pp_boost' AND end_time > NOW()
-            """, user_id)
+        event_effect = event_cog.get_current_event_effect() if event_cog else None
+        event_value = event_effect['effect'] if event_effect else 0
 
-            if active_boost:
-                boost_value = active_boost['effect_value']
-                final_size += boost_value
-                print(f"Applied item boost effect: {boost_value} to user {user_id}")
+        now = datetime.now(timezone.utc) # Use timezone aware datetime
+        this_hour = now.replace(minute=0, second=0, microsecond=0)
 
-        final_size = max(0, min(20, final_size)) # Clamp result
+        # Repeat attempts within the hour are turned away from the user cache without a query
+        cached_roll = db.users.get(user_id, 'pp_size')
+        if cached_roll not in (MISSING, None) and cached_roll[1] and cached_roll[1] >= this_hour:
+            await self._send_cooldown_message(ctx, now)
+            return
 
-        # Update database (pp_sizes, user_stats, and pp_coins)
-        stats = None
+        # The roll engine applies the modifiers and clamp (item boosts come from the effects engine);
+        # pp_roll() then does the cooldown check and the pp_sizes/user_stats/user_data upserts in one round trip
+        boost = db.effects.roll_modifier(user_id, now)
+        _, final_size = self.rolls.roll(event_value, boost)
+        coins = roll_coins(final_size)
         async with db.acquire() as conn:
-            async with conn.transaction():
-                # Update pp_sizes with new size and timestamp
-                await conn.execute("""
-                    INSERT INTO pp_sizes (user_id, size, last_roll_timestamp)
-                    VALUES ($1, $2, $3)
-                    ON CONFLICT (user_id)
-                    DO UPDATE SET size = $2, last_roll_timestamp = $3
-                """, user_id, final_size, now)
-
-                zero_increment = 1 if final_size == 0 else 0
-                twenty_increment = 1 if final_size == 20 else 0
-                stats = await conn.fetchrow("""
-                    INSERT INTO user_stats (user_id, total_rolls, zero_rolls, twenty_rolls)
-                    VALUES ($1, 1, $2, $3)
-                    ON CONFLICT (user_id) DO UPDATE SET
-                        total_rolls = user_stats.total_rolls + 1,
-                        zero_rolls = user_stats.zero_rolls + $2,
-                        twenty_rolls = user_stats.twenty_rolls + $3
-                    RETURNING zero_rolls, twenty_rolls
-                """, user_id, zero_increment, twenty_increment)
-
-                # Award PP coins equal to the roll size (1 inch = 1 coin)
-                await conn.execute("""
-                    INSERT INTO user_data (user_id, pp_coins) VALUES ($1, $2)
-                    ON CONFLICT (user_id) DO UPDATE SET pp_coins = user_data.pp_coins + $2
-                """, user_id, final_size)
-                print(f"[PP Core] Awarded {final_size} PP coins to user {user_id}")
+            roll = await db.statements.fetchrow(conn, 'pp_roll', user_id, final_size, coins, now)
+
+        if not roll['rolled']:
+            # The last roll was within the current calendar hour
+            entry = self.board.get(user_id)
+            if entry:
+                db.users.set(user_id, 'pp_size', (entry[0], roll['last_roll']))
+            await self._send_cooldown_message(ctx, now)
+            return
+
+        db.users.set(user_id, 'pp_size', (final_size, now))
+        db.users.add('user_data', user_id, {'pp_coins': coins})
+        db.users.add('user_stats', user_id, {'total_rolls': 1, 'zero_rolls': int(final_size == 0), 'twenty_rolls': int(final_size == 20)})
+        if event_effect:
+            print(f"Applied event effect '{event_effect['name']}': {event_effect['effect']} to user {user_id}")
+        if boost:
+            print(f"Applied item boost effect: {boost} to user {user_id}")
+        print(f"[PP Core] Awarded {coins} PP coins to user {user_id}")
 
         if profile_cog:
-            if final_size == 0 and stats and stats['zero_rolls'] == 1:
+            if final_size == 0 and roll['zero_rolls'] == 1:
                 await profile_cog._grant_achievement(user, 'roll_a_zero', ctx)
-            elif final_size == 20 and stats and stats['twenty_rolls'] == 1:
+            elif final_size == 20 and roll['twenty_rolls'] == 1:
                 await profile_cog._grant_achievement(user, 'roll_a_twenty', ctx)
 
         # Record score for PP Off if active
@@ -561,28 +528,75 @@ class PPCore(commands.Cog):
 
         await ctx.send(f"{user.mention}'s pp is {measurement}{event_text}")
 
+        # Track the leaderboard and today's leader in memory
+        self.board.update(user_id, final_size, now)
+        self.daily_leader.observe(user_id, final_size, now)
+        if self.daily_leader.needs_resync:
+            await self._resync_daily_leader()
+
         if ctx.guild: # Ensure it's in a guild context
             await self._update_daily_hog_daddy(ctx, user, final_size)
         else:
             print("Cannot update Daily Hog Daddy outside of a guild.")
 
+    async def _send_cooldown_message(self, ctx, now):
+        # Calculate time until the next hour begins
+        next_hour = (now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1))
+        retry_after = next_hour - now
+
+        # Format the remaining time nicely
+        minutes_left = int(retry_after.total_seconds() // 60)
+        seconds_left = int(retry_after.total_seconds() % 60)
+
+        wait_message = ""
+        if minutes_left > 0:
+            wait_message += f"{minutes_left} minute{'s' if minutes_left > 1 else ''}"
+        if seconds_left > 0:
+            if minutes_left > 0:
+                wait_message += " and "
+            wait_message += f"{seconds_left} second{'s' if seconds_left > 1 else ''}"
+
+        await ctx.send(f"⏳ Woah there, buddy! You gotta wait {wait_message} to measure again (until the top of the hour).")
+
     @commands.command(name='leaderboard', aliases=['lb'], help='Shows the daily PP leaderboard')
     async def leaderboard(self, ctx):
-        db = await self._get_db()
-        async with db.acquire() as conn:
-            top_users = await conn.fetch("""
-                SELECT user_id, size, last_roll_timestamp FROM pp_sizes
-                ORDER BY size DESC, last_roll_timestamp ASC
-                LIMIT 100 -- Limit to a reasonable number for pagination
-            """)
-
-        if not top_users:
+        # Pages are fetched as they're viewed (from the in-memory board, or pp_sizes if it isn't loaded)
+        pages = LeaderboardPages(self.board, await self._get_db(), page_size=10)
+        if not await pages.refresh_total():
             await ctx.send("The leaderboard is empty! No one has rolled today yet.")
             return
 
-        view = LeaderboardView(top_users, title="🏆 Daily PP Leaderboard (Resets Daily at Midnight UTC)", sep=10)
-        initial_embed = await view.create_leaderboard_embed(top_users[:10], ctx.guild)
+        view = LeaderboardView(pages, title="🏆 Daily PP Leaderboard (Resets Daily at Midnight UTC)", members=self.members)
+        initial_embed = await view.create_leaderboard_embed(await pages.get(1), ctx.guild)
         await ctx.send(embed=initial_embed, view=view)
 
+    @commands.command(name='rank', help="Shows where you (or someone) stand on today's leaderboard")
+    async def rank(self, ctx, member: discord.Member = None):
+        if member is None:
+            member = ctx.author
+        if not self.board.ready:
+            await self._load_leaderboard()
+
+        rank = self.board.rank(member.id)
+        if rank is None:
+            who = "You haven't" if member == ctx.author else f"{member.display_name} hasn't"
+            await ctx.send(f"📏 {who} rolled today! Use `pls pp` to get on the leaderboard.")
+            return
+
+        size, _ = self.board.get(member.id)
+        total = len(self.board)
+        ahead = rank - 1
+        bigger = self.board.count_above(size)
+        who = "You're" if member == ctx.author else f"{member.display_name} is"
+        message = f"📊 {who} ranked **#{rank}** of {total} today with **{size} inches**."
+        if ahead == 0:
+            message += " 👑 Nobody is ahead!"
+        else:
+            message += f" {ahead} {'person is' if ahead == 1 else 'people are'} ahead"
+            if bigger < ahead:
+                message += f" ({bigger} with a bigger roll, {ahead - bigger} tied but rolled earlier)"
+            message += "."
+        await ctx.send(message)
+
 async def setup(bot):
     await bot.add_cog(PPCore(bot))
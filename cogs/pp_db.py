@@ -1,17 +1,168 @@
 import os
+import time
+import asyncio
+import contextlib
 import asyncpg
 import discord
 from discord.ext import commands
+from statements import StatementRegistry
+from schema import migrate
+from counter_buffer import CounterBuffer
+from user_cache import UserStateCache
+from item_catalog import ItemCatalog
+from achievement_catalog import AchievementCatalog
+from effects import EffectsEngine
+from ledger import Ledger
+from snapshots import SnapshotStore
+
+# --- Pool Settings (override with environment variables) ---
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_ACQUIRE_TIMEOUT = float(os.getenv("DB_ACQUIRE_TIMEOUT", "5"))  # Seconds to wait for a free connection
+DB_MAX_IDLE_SECONDS = float(os.getenv("DB_MAX_IDLE_SECONDS", "300"))  # Close connections idle this long
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "1000"))  # Prepared statements kept per connection; room for every query the bot runs
+# --- End Pool Settings ---
+
+
+class PoolService:
+    """The bot's single asyncpg pool, with sizing limits and live usage counters."""
+
+    def __init__(self, dsn, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE,
+                 acquire_timeout=DB_ACQUIRE_TIMEOUT, max_idle_seconds=DB_MAX_IDLE_SECONDS,
+                 statement_cache_size=DB_STATEMENT_CACHE_SIZE, statements=None):
+        self.dsn = dsn
+        self.statements = statements or StatementRegistry()
+        self.users = UserStateCache()  # Write-through cache of coins/stats/last roll/achievements
+        self.counters = CounterBuffer(self)
+        self.items = ItemCatalog()
+        self.achievements = AchievementCatalog()
+        self.effects = EffectsEngine(self)
+        self.ledger = Ledger(self)  # Conditional coin debits/transfers and item consumption
+        self.snapshots = SnapshotStore(self)  # In-flight blackjack/duel/PP Off state, for restarts
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.max_idle_seconds = max_idle_seconds
+        self.statement_cache_size = max(statement_cache_size, len(self.statements.statements))
+        self.pool = None
+
+        # Live counters
+        self.in_use = 0
+        self.waiting = 0
+        self.acquires = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def start(self):
+        """Creates the underlying asyncpg pool."""
+        self.pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            max_inactive_connection_lifetime=self.max_idle_seconds,
+            # Registered statements must stay prepared once warmed: no LRU eviction, no expiry by age
+            statement_cache_size=self.statement_cache_size,
+            max_cached_statement_lifetime=0,
+            init=self.statements.warm,  # Prepare the hot statements on every new connection
+        )
+        self.counters.start()
+        self.snapshots.start()
+
+        # Load the item and achievement catalogs (items are kept fresh via LISTEN) and active effects
+        async with self.acquire() as conn:
+            await self.items.load(conn)
+            await self.achievements.load(conn)
+            await self.effects.load(conn)
+        self.effects.start()
+        await self.items.listen(self.dsn, self)
+
+    async def close(self):
+        if self.pool:
+            # Write out buffered counter increments before the connections go away
+            try:
+                await self.counters.close()
+            except Exception as e:
+                print(f" Failed to flush buffered counters on shutdown: {e}")
+            try:
+                await self.snapshots.close()
+            except Exception as e:
+                print(f" Failed to write game snapshots on shutdown: {e}")
+            await self.effects.close()
+            await self.items.close()
+            await self.pool.close()
+            self.pool = None
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, timeout=None):
+        """Acquires a connection, recording wait time. Raises asyncio.TimeoutError if the pool stays exhausted."""
+        if not self.pool:
+            raise ConnectionError("Database pool is not initialized.")
+
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            conn = await self.pool.acquire(timeout=timeout or self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            print(f" DB pool exhausted: no connection free after {timeout or self.acquire_timeout}s ({self.in_use} in use)")
+            raise
+        finally:
+            self.waiting -= 1
+
+        waited = time.perf_counter() - started
+        self.acquires += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+        self.in_use += 1
+        try:
+            yield conn
+        finally:
+            self.in_use -= 1
+            await self.pool.release(conn)
+
+    def stats(self):
+        """Returns a snapshot of the pool counters."""
+        return {
+            'size': self.pool.get_size() if self.pool else 0,
+            'idle': self.pool.get_idle_size() if self.pool else 0,
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'in_use': self.in_use,
+            'waiting': self.waiting,
+            'acquires': self.acquires,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': (self.total_wait / self.acquires * 1000) if self.acquires else 0.0,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
 
 class PPDB(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.DATABASE_URL = os.getenv("DATABASE_URL")
         self.db = None
-        self.bot.loop.create_task(self.initialize_db())
+        self._init_lock = asyncio.Lock()
+
+    async def cog_load(self):
+        # Create the pool before the other cogs load so they can all share it
+        await self.initialize_db()
+
+    async def cog_unload(self):
+        if self.db:
+            await self.db.close()
+            self.db = None
+            print(" PostgreSQL pool closed.")
 
     async def initialize_db(self):
-        """Creates database connection pool and ensures all required tables exist."""
+        """Runs pending schema migrations and creates the shared connection pool."""
+        async with self._init_lock:
+            if self.db:
+                return
+            await self._initialize_db()
+
+    async def _initialize_db(self):
         if not self.DATABASE_URL:
             print(" ERROR: DATABASE_URL is not set! Check your environment variables.")
             return
@@ -21,139 +172,18 @@ class PPDB(commands.Cog):
             self.DATABASE_URL = self.DATABASE_URL.replace("postgresql://", "postgres://", 1)
 
         try:
-            self.db = await asyncpg.create_pool(self.DATABASE_URL)
-            print(" Successfully connected to PostgreSQL!")
-
-            async with self.db.acquire() as conn:
-                # Ensure pp_sizes table exists
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS pp_sizes (
-                        user_id BIGINT PRIMARY KEY,
-                        size INTEGER,
-                        last_roll_timestamp TIMESTAMP WITH TIME ZONE DEFAULT NULL
-                    )
-                """)
-                print(" Table 'pp_sizes' checked/created.")
-
-                # Ensure items table exists
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS items (
-                        item_id SERIAL PRIMARY KEY,
-                        name VARCHAR(50) UNIQUE NOT NULL,
-                        description VARCHAR(255),
-                        effect_type VARCHAR(50),
-                        effect_value INTEGER,
-                        duration_minutes INTEGER DEFAULT 0,
-                        usable BOOLEAN DEFAULT TRUE
-                    )
-                """)
-                print(" Table 'items' checked/created.")
-
-                # Ensure user_inventory table exists
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS user_inventory (
-                        user_id BIGINT NOT NULL,
-                        item_id INTEGER NOT NULL,
-                        quantity INTEGER NOT NULL DEFAULT 1,
-                        PRIMARY KEY (user_id, item_id),
-                        FOREIGN KEY (item_id) REFERENCES items(item_id) ON DELETE CASCADE
-                    )
-                """)
-                print(" Table 'user_inventory' checked/created.")
-
-                # Ensure user_active_effects table exists
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS user_active_effects (
-                        user_id BIGINT NOT NULL,
-                        effect_type VARCHAR(50) NOT NULL,
-                        effect_value INTEGER,
-                        end_time TIMESTAMP NOT NULL,
-                        PRIMARY KEY (user_id, effect_type)
-                    )
-                """)
-                print(" Table 'user_active_effects' checked/created.")
-
-                # Ensure user_stats table exists
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS user_stats (
-                        user_id BIGINT PRIMARY KEY,
-                        total_rolls INTEGER DEFAULT 0,
-                        zero_rolls INTEGER DEFAULT 0,
-                        twenty_rolls INTEGER DEFAULT 0,
-                        duel_wins INTEGER DEFAULT 0,
-                        trivia_wins INTEGER DEFAULT 0,
-                        days_as_hog_daddy INTEGER DEFAULT 0
-                    )
-                """)
-                print(" Table 'user_stats' checked/created.")
-
-                # Ensure user_data table exists (for PP coins)
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS user_data (
-                        user_id BIGINT PRIMARY KEY,
-                        pp_coins INTEGER DEFAULT 0
-                    )
-                """)
-                print(" Table 'user_data' checked/created.")
-
-                # Ensure achievements table exists
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS achievements (
-                        achievement_id VARCHAR(50) PRIMARY KEY,
-                        name VARCHAR(100) NOT NULL,
-                        description VARCHAR(255),
-                        reward_role_name VARCHAR(100)
-                    )
-                """)
-                print(" Table 'achievements' checked/created.")
-
-                # Ensure user_achievements table exists
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS user_achievements (
-                        user_id BIGINT NOT NULL,
-                        achievement_id VARCHAR(50) NOT NULL,
-                        earned_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-                        PRIMARY KEY (user_id, achievement_id),
-                        FOREIGN KEY (achievement_id) REFERENCES achievements(achievement_id) ON DELETE CASCADE
-                    )
-                """)
-                print(" Table 'user_achievements' checked/created.")
-
-                # Populate achievements table if empty
-                achievement_count = await conn.fetchval("SELECT COUNT(*) FROM achievements")
-                if achievement_count == 0:
-                    print(" Populating 'achievements' table with initial data...")
-                    initial_achievements = [
-                        ('roll_a_zero', 'Micro PP', 'Rolled a 0 for the first time', None),
-                        ('roll_a_twenty', 'Maximum PP', 'Rolled a 20 for the first time', None),
-                        ('became_hog_daddy', 'Hog Daddy', 'Became the Daily Hog Daddy', None),
-                        ('first_duel_win', 'Duelist', 'Won your first PP duel', None),
-                        ('ten_duel_wins', 'Duel Master', 'Won 10 PP duels', None),
-                        ('first_win_trivia', 'Trivia Novice', 'Won your first trivia game', None),
-                        ('ten_wins_trivia', 'Trivia Master', 'Won 10 trivia games', None),
-                    ]
-                    await conn.executemany("""
-                        INSERT INTO achievements (achievement_id, name, description, reward_role_name)
-                        VALUES ($1, $2, $3, $4)
-                    """, initial_achievements)
-                    print(f" Added {len(initial_achievements)} initial achievements.")
-
-                # Populate items table if empty
-                item_count = await conn.fetchval("SELECT COUNT(*) FROM items")
-                if item_count == 0:
-                    print(" Populating 'items' table with initial data...")
-                    initial_items = [
-                        ('Growth Potion', 'Temporarily increases your next pp roll.', 'pp_boost', 2, 60, True),
-                        ('Shrink Ray', 'Zap another user to shrink their pp by 2 inches! Use: pls use shrink ray @user', 'shrink_ray', -2, 0, True),
-                        ('Lucky Socks', 'Slightly increases chance of a larger roll next time.', 'luck_boost', 1, 0, True),
-                        ('Reroll Token', 'Grants one reroll on your next pp command.', 'reroll', 1, 0, True),
-                    ]
-                    await conn.executemany("""
-                        INSERT INTO items (name, description, effect_type, effect_value, duration_minutes, usable)
-                        VALUES ($1, $2, $3, $4, $5, $6)
-                    """, initial_items)
-                    print(f" Added {len(initial_items)} initial items.")
+            # Bring the schema up to date on a dedicated connection before the pool
+            # opens, so every pooled connection can prepare statements against it
+            conn = await asyncpg.connect(self.DATABASE_URL)
+            try:
+                await migrate(conn)
+            finally:
+                await conn.close()
 
+            db = PoolService(self.DATABASE_URL)
+            await db.start()
+            self.db = db
+            print(f" Successfully connected to PostgreSQL! (pool size {db.min_size}-{db.max_size})")
             print(" PostgreSQL database initialization complete!")
 
         except Exception as e:
@@ -161,11 +191,77 @@ class PPDB(commands.Cog):
             exit(1)
 
     async def get_db(self):
-        """Get the database pool. Ensures it's initialized first."""
+        """Get the shared database pool. Ensures it's initialized first."""
         if not self.db:
             await self.initialize_db()
         return self.db
 
+    @commands.command(name='dbstats', help='Admin only: Show database pool usage')
+    @commands.has_permissions(administrator=True)
+    async def db_stats(self, ctx):
+        """Shows live counters for the shared database pool."""
+        if not self.db:
+            await ctx.send("⚠️ The database pool is not initialized.")
+            return
+
+        stats = self.db.stats()
+        embed = discord.Embed(title="🗄️ Database Pool", color=discord.Color.dark_teal())
+        embed.add_field(name="Connections", value=f"{stats['size']} open ({stats['idle']} idle), limit {stats['min_size']}-{stats['max_size']}", inline=False)
+        embed.add_field(name="In Use", value=stats['in_use'], inline=True)
+        embed.add_field(name="Waiting", value=stats['waiting'], inline=True)
+        embed.add_field(name="Timeouts", value=stats['timeouts'], inline=True)
+        embed.add_field(name="Acquires", value=stats['acquires'], inline=True)
+        embed.add_field(name="Avg Wait", value=f"{stats['avg_wait_ms']:.2f} ms", inline=True)
+        embed.add_field(name="Max Wait", value=f"{stats['max_wait_ms']:.2f} ms", inline=True)
+
+        statements = self.db.statements.stats()
+        embed.add_field(
+            name="Prepared Statements",
+            value=f"{statements['statements']} registered on {statements['connections']} connection(s)\n"
+                  f"{statements['hits']} hits / {statements['misses']} misses ({statements['hit_rate']:.1%} hit rate)",
+            inline=False
+        )
+
+        counters = self.db.counters.stats()
+        mode = f"write-behind every {counters['interval_ms']} ms" if counters['enabled'] else "write-through"
+        embed.add_field(
+            name="Counter Buffer",
+            value=f"{mode}\n{counters['increments']} increments, {counters['pending_rows']} rows pending\n"
+                  f"{counters['flushes']} flushes ({counters['rows_flushed']} rows)",
+            inline=False
+        )
+
+        effects = self.db.effects.stats()
+        embed.add_field(
+            name="Active Effects",
+            value=f"{effects['active']} active ({effects['heap']} queued expiries)\n"
+                  f"{effects['sweeps']} sweeps, {effects['rows_deleted']} expired rows deleted",
+            inline=False
+        )
+
+        ledger = self.db.ledger.stats()
+        embed.add_field(
+            name="Ledger",
+            value=f"{ledger['debits']} debits, {ledger['declined']} declined for insufficient coins",
+            inline=False
+        )
+
+        snapshots = self.db.snapshots.stats()
+        embed.add_field(
+            name="Game Snapshots",
+            value=f"{snapshots['pending']} queued, {snapshots['writes']} writes ({snapshots['rows_written']} rows)",
+            inline=False
+        )
+
+        users = self.db.users.stats()
+        embed.add_field(
+            name="User Cache",
+            value=f"{users['users']}/{users['max_users']} users, {users['ttl_seconds']:.0f}s TTL\n"
+                  f"{users['hits']} hits / {users['misses']} misses ({users['hit_rate']:.1%} hit rate), {users['evictions']} evictions",
+            inline=False
+        )
+        await ctx.send(embed=embed)
+
 async def setup(bot):
     await bot.add_cog(PPDB(bot))
     print("✅ PPDB Cog loaded")
@@ -4,42 +4,38 @@ from datetime import datetime, timezone, timedelta
 import random
 import asyncio
 import pytz
+# Event schedule (checked at the top of every hour while no event is running) and roll effects
+from roll_engine import EVENT_CHANCE_PERCENT, EVENT_QUIET_HOURS_ET, EVENT_MODIFIERS
 
-# Event Definitions
+# Event Definitions (effect and duration_hours come from roll_engine.EVENT_MODIFIERS)
 EVENTS = [
     {
         "name": "Heat Wave",
-        "effect": 2,
-        "duration_hours": 1,
         "start_msg": "☀️ **Heat Wave!** Things are heating up! All pp rolls get a +2 bonus for the next hour!",
         "end_msg": "☀️ The Heat Wave has subsided. PP rolls are back to normal.",
         "color": discord.Color.orange()
     },
     {
         "name": "Cold Snap",
-        "effect": -2,
-        "duration_hours": 1,
         "start_msg": "❄️ **Cold Snap!** Brrr! It's chilly... all pp rolls get a -2 penalty for the next hour!",
         "end_msg": "❄️ The Cold Snap has passed. PP rolls are back to normal.",
         "color": discord.Color.blue()
     },
     {
         "name": "Growth Spurt",
-        "effect": 1,
-        "duration_hours": 2,
         "start_msg": "🌱 **Growth Spurt!** Favorable conditions! All pp rolls get a +1 bonus for the next 2 hours!",
         "end_msg": "🌱 The Growth Spurt is over. PP rolls are back to normal.",
         "color": discord.Color.green()
     },
     {
         "name": "Shrinkage",
-        "effect": -1,
-        "duration_hours": 2,
         "start_msg": "🥶 **Shrinkage!** Uh oh... All pp rolls get a -1 penalty for the next 2 hours!",
         "end_msg": "🥶 The Shrinkage effect has worn off. PP rolls are back to normal.",
         "color": discord.Color.light_grey()
     }
 ]
+for event in EVENTS:
+    event["effect"], event["duration_hours"] = EVENT_MODIFIERS[event["name"]]
 
 class PPEvents(commands.Cog):
     def __init__(self, bot):
@@ -92,9 +88,9 @@ class PPEvents(commands.Cog):
         elif not self.current_event:
             # Allowed hours: 8 AM to 1 AM ET (inclusive)
             # Disallowed hours: 2, 3, 4, 5, 6, 7
-            if now_et.hour not in [2, 3, 4, 5, 6, 7]:
-                # Make events rare: 5% chance per hour
-                if random.randint(1, 100) <= 5:  # 5% chance every hour during allowed times
+            if now_et.hour not in EVENT_QUIET_HOURS_ET:
+                # Make events rare: EVENT_CHANCE_PERCENT chance per hour
+                if random.randint(1, 100) <= EVENT_CHANCE_PERCENT:
                     self.current_event = random.choice(EVENTS)
                     duration = timedelta(hours=self.current_event['duration_hours'])
                     event_start_time = now_utc.replace(minute=0, second=0, microsecond=0)
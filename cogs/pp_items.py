@@ -27,47 +27,21 @@ class PPItems(commands.Cog):
     async def _remove_item_from_inventory(self, user_id: int, item_id: int, quantity: int = 1) -> bool:
         """Removes an item from a user's inventory or decreases the quantity. Returns True if successful."""
         db = await self._get_db()
-        async with db.acquire() as conn:
-            current_quantity = await conn.fetchval(
-                "SELECT quantity FROM user_inventory WHERE user_id = $1 AND item_id = $2",
-                user_id, item_id
-            )
-            
-            if not current_quantity or current_quantity < quantity:
-                return False
-
-            if current_quantity == quantity:
-                await conn.execute(
-                    "DELETE FROM user_inventory WHERE user_id = $1 AND item_id = $2",
-                    user_id, item_id
-                )
-            else:
-                await conn.execute(
-                    "UPDATE user_inventory SET quantity = quantity - $3 WHERE user_id = $1 AND item_id = $2",
-                    user_id, item_id, quantity
-                )
-            return True
+        return await db.ledger.consume_item_if_available(user_id, item_id, quantity)
 
     async def _get_item_by_name(self, item_name: str):
-        """Fetches item details from the database by name (case-insensitive)."""
+        """Looks an item up by name or alias (case and spacing don't matter)."""
         db = await self._get_db()
+        if db.items.loaded:
+            return db.items.by_name(item_name)
         async with db.acquire() as conn:
-            return await conn.fetchrow(
-                "SELECT * FROM items WHERE LOWER(name) = LOWER($1)",
-                item_name
-            )
+            return await db.statements.fetchrow(conn, 'item_by_name', item_name)
 
     async def _apply_active_effect(self, user_id: int, effect_type: str, effect_value: int, duration_minutes: int):
         """Adds or updates an active effect for a user."""
         end_time = datetime.now(timezone.utc) + timedelta(minutes=duration_minutes)
         db = await self._get_db()
-        async with db.acquire() as conn:
-            await conn.execute("""
-                INSERT INTO user_active_effects (user_id, effect_type, effect_value, end_time)
-                VALUES ($1, $2, $3, $4)
-                ON CONFLICT (user_id, effect_type)
-                DO UPDATE SET effect_value = EXCLUDED.effect_value, end_time = EXCLUDED.end_time
-            """, user_id, effect_type, effect_value, end_time)
+        await db.effects.apply(user_id, effect_type, effect_value, end_time)
 
     @commands.command(aliases=['inv'])
     async def inventory(self, ctx):
@@ -167,13 +141,19 @@ class PPItems(commands.Cog):
         """Shrink a user's pp by amount. Returns (True, old_size, new_size) or (False, None, None) if not found."""
         db = await self._get_db()
         async with db.acquire() as conn:
-            record = await conn.fetchrow("SELECT size FROM pp_sizes WHERE user_id = $1", user_id)
+            record = await conn.fetchrow("SELECT size, last_roll_timestamp FROM pp_sizes WHERE user_id = $1", user_id)
             if not record:
                 return False, None, None
             old_size = record['size']
             new_size = max(0, old_size - amount)
             await conn.execute("UPDATE pp_sizes SET size = $1 WHERE user_id = $2", new_size, user_id)
-            return True, old_size, new_size
+        db.users.set(user_id, 'pp_size', (new_size, record['last_roll_timestamp']))
+
+        # Keep PPCore's in-memory leaderboard and daily leader in step
+        core_cog = self.bot.get_cog('PPCore')
+        if core_cog:
+            core_cog.record_shrink(user_id, new_size)
+        return True, old_size, new_size
 
 
 async def setup(bot):
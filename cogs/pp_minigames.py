@@ -1,22 +1,56 @@
 import discord
 from discord.ext import commands
-import aiohttp
 import html
 import random
 from datetime import datetime, timezone, timedelta
-import asyncio
+from user_cache import MISSING
+from item_catalog import rarity_label
+from roll_engine import RollEngine
+from economy import GAME_WIN_COINS, TRIVIA_WIN_COINS, blackjack_winnings
+import blackjack
+from scheduler import Scheduler
+from trivia_provider import TriviaProvider
+from trivia_bank import TriviaBank
+from duels import DuelChallenge, DuelRegistry
+from sessions import (SessionManager, TriviaSession, ScrambleSession, HighLowSession, MathSession,
+                      TRIVIA, SCRAMBLE, HIGHLOW, MATH)
+
+# game_snapshots kinds (see snapshots.SnapshotStore)
+BLACKJACK_SNAPSHOT = 'blackjack'  # key: player id
+DUEL_SNAPSHOT = 'duel'  # key: challenge id (the duel command's message id)
+PP_OFF_SNAPSHOT = 'ppoff'  # key: always 0, there's one PP Off at a time
+
+DUEL_WIN_ACHIEVEMENTS = {1: 'first_duel_win', 10: 'ten_duel_wins'}  # duel_wins total -> achievement granted
+
+def _seconds_until(deadline):
+    return max(0.0, (deadline - datetime.now(timezone.utc)).total_seconds())
+
 
 class PPMinigames(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.rolls = RollEngine() # Duel rolls
+        self.scheduler = Scheduler() # Game timeouts, duel expiry and PP Off ends
+        self.sessions = SessionManager() # Trivia, scramble, higher/lower and math rush games, per channel
+        self.snapshots = None # The shared SnapshotStore, set in cog_load
+        self._restored = False
+        # Tried in this order for a message in a channel with games running
+        self._answer_handlers = (
+            (SCRAMBLE, self._answer_scramble),
+            (HIGHLOW, self._answer_highlow),
+            (MATH, self._answer_math),
+            (TRIVIA, self._answer_trivia),
+        )
+
         # Trivia State
-        self.current_trivia_question = None
+        self.trivia_bank = TriviaBank() # Local copy of every question seen, for when the API is down (or TRIVIA_OFFLINE=1)
+        self.trivia_provider = TriviaProvider(bank=self.trivia_bank) # Buffered questions from the-trivia-api.com
         self.trivia_timeout = 15
         self.trivia_reward = 1
         self._last_trivia_time = {}
 
         # Duel State
-        self.pending_duels = {}
+        self.duels = DuelRegistry()
         self.duel_timeout_seconds = 60
 
         # PP Off State
@@ -25,20 +59,39 @@ class PPMinigames(commands.Cog):
         self.pp_off_participants = {}
         self.pp_off_channel = None
 
-        # Word Scramble State
-        self.current_scramble = None
+        # Word Scramble, Higher/Lower and Math Rush timeouts
         self.scramble_timeout = 20
-
-        # Higher/Lower State
-        self.current_highlow = None
         self.highlow_timeout = 15
-
-        # Math Rush State
-        self.current_math = None
         self.math_timeout = 10
 
         # Blackjack State
-        self.active_blackjack_games = {}  # user_id: game_data
+        self.active_blackjack_games = {}  # user_id: blackjack.BlackjackGame
+        self.starting_blackjack = set()  # user_ids whose bet is being taken, so a second bet can't start another game
+
+    async def cog_load(self):
+        self.trivia_provider.start()
+        try:
+            db = await self._get_db()
+            self.snapshots = db.snapshots
+            if self.bot.is_ready(): # Reloaded while running; otherwise on_ready restores
+                await self._restore_games()
+        except Exception as e:
+            print(f"❌ Failed to restore saved games: {e}")
+            import traceback
+            traceback.print_exc()
+
+    async def cog_unload(self):
+        await self.scheduler.close()
+        await self.trivia_provider.close()
+        self.trivia_bank.close()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if not self._restored and self.snapshots:
+            try:
+                await self._restore_games()
+            except Exception as e:
+                print(f"❌ Failed to restore saved games: {e}")
 
     async def _get_db(self):
         """Get database pool from PPDB cog"""
@@ -59,6 +112,7 @@ class PPMinigames(commands.Cog):
             current_highest = self.pp_off_participants.get(user_id, -1)
             if score > current_highest:
                 self.pp_off_participants[user_id] = score
+                self._save_pp_off()
                 print(f"PP Off: Recorded score {score} for User ID {user_id}")
 
     @commands.command()
@@ -75,27 +129,16 @@ class PPMinigames(commands.Cog):
             await ctx.send(f"{challenger.mention}, you can't duel a bot. They have no PP to measure!")
             return
 
-        # Clear expired duels
-        await self._clear_expired_duels()
-
-        # Check existing duels
-        if await self._is_user_in_duel(challenger.id):
-            await ctx.send(f"{challenger.mention}, you are already involved in a duel request. Wait for it to resolve or expire.")
-            return
-        if await self._is_user_in_duel(challenged_user.id):
-            if challenged_user.id in self.pending_duels and self.pending_duels[challenged_user.id]['challenger'] == challenger.id:
+        # Create Duel Request (one open challenge per pair of users)
+        deadline = datetime.now(timezone.utc) + timedelta(seconds=self.duel_timeout_seconds)
+        existing = self._add_duel(DuelChallenge(ctx.message.id, challenger.id, challenged_user.id, deadline))
+        if existing:
+            if existing.challenger_id == challenger.id:
                 await ctx.send(f"{challenger.mention}, you have already challenged {challenged_user.mention}. They have {self.duel_timeout_seconds} seconds to accept.")
             else:
-                await ctx.send(f"{challenger.mention}, {challenged_user.display_name} is already involved in another duel request.")
+                await ctx.send(f"{challenger.mention}, {challenged_user.display_name} has already challenged you! Type `pls accept {challenged_user.mention}` to accept.")
             return
 
-        # Create Duel Request
-        now_utc = datetime.now(timezone.utc)
-        self.pending_duels[challenged_user.id] = {
-            'challenger': challenger.id,
-            'timestamp': now_utc
-        }
-
         await ctx.send(
             f"⚔️ {challenger.mention} has challenged {challenged_user.mention} to a PP duel! ⚔️\n"
             f"{challenged_user.mention}, type `pls accept {challenger.mention}` within {self.duel_timeout_seconds} seconds to accept!"
@@ -106,27 +149,23 @@ class PPMinigames(commands.Cog):
     async def accept(self, ctx, challenger_user: discord.Member):
         """Accepts a pending duel challenge."""
         acceptor = ctx.author
-        await self._clear_expired_duels()
-
-        pending_request = self.pending_duels.get(acceptor.id)
-        if not pending_request:
-            await ctx.send(f"{acceptor.mention}, you don't have any pending duel requests to accept.")
-            return
 
-        if pending_request['challenger'] != challenger_user.id:
-            actual_challenger = ctx.guild.get_member(pending_request['challenger'])
-            actual_challenger_name = actual_challenger.mention if actual_challenger else f"<@{pending_request['challenger']}>"
-            await ctx.send(f"{acceptor.mention}, you were challenged by {actual_challenger_name}, not {challenger_user.mention}.")
+        challenge = self.duels.get(challenger_user.id, acceptor.id)
+        if not challenge:
+            received = self.duels.received_by(acceptor.id)
+            if not received:
+                await ctx.send(f"{acceptor.mention}, you don't have any pending duel requests to accept.")
+            else:
+                challengers = ", ".join(f"<@{c.challenger_id}>" for c in received[:10])
+                await ctx.send(f"{acceptor.mention}, you were challenged by {challengers}, not {challenger_user.mention}.")
             return
 
-        # Remove pending request and perform duel
-        del self.pending_duels[acceptor.id]
-        challenger_roll = await self._perform_duel_roll(challenger_user.id)
-        acceptor_roll = await self._perform_duel_roll(acceptor.id)
-
-        # Get profile cog and DB for stat updates/achievements
-        profile_cog = self.bot.get_cog('PPProfile')
-        db = await self._get_db()
+        # Remove pending request and perform duel (both rolls at once, no queries: boosts are in memory)
+        self.duels.remove(challenge)
+        self.snapshots.discard(DUEL_SNAPSHOT, challenge.challenge_id)
+        rolls = await self._perform_duel_rolls([challenger_user.id, acceptor.id])
+        challenger_roll = rolls[challenger_user.id]
+        acceptor_roll = rolls[acceptor.id]
 
         result_message = (
             f"🔥 **Duel Result!** 🔥\n"
@@ -144,56 +183,27 @@ class PPMinigames(commands.Cog):
         else:
             result_message += f"🤝 It's a **draw**! A rare display of equal PP prowess! 🤝"
 
-        # Update stats and check achievements if there's a winner
-        if winner and profile_cog:
-            try:
-                async with db.acquire() as conn:
-                    async with conn.transaction(): # Use transaction for atomicity
-                        # Increment duel_wins and get the new count
-                        new_stats = await conn.fetchrow("""
-                            INSERT INTO user_stats (user_id, duel_wins) VALUES ($1, 1)
-                            ON CONFLICT (user_id) DO UPDATE SET
-                                duel_wins = user_stats.duel_wins + 1
-                            RETURNING duel_wins
-                            """, winner.id)
-                        new_duel_wins = new_stats['duel_wins'] if new_stats else 1
-                        print(f"[Stats] Updated duel_wins for {winner.name} ({winner.id}) to {new_duel_wins}")
-
-                        # Grant achievements based on the new count
-                        if new_duel_wins == 1:
-                            await profile_cog._grant_achievement(winner, 'first_duel_win', ctx)
-                        if new_duel_wins == 10:
-                            await profile_cog._grant_achievement(winner, 'ten_duel_wins', ctx)
-
-            except Exception as e:
-                print(f"Error updating duel stats/achievements for {winner.name}: {e}")
-                import traceback
-                traceback.print_exc()
-
         await ctx.send(result_message)
 
+        # Update stats and check achievements if there's a winner
+        if winner:
+            await self._record_duel_win(winner, ctx)
+
     @commands.command()
     @commands.guild_only()
     async def trivia(self, ctx):
         """Asks a trivia question from the Open Trivia Database."""
-        # First check if a trivia is already active
-        if self.current_trivia_question:
-            try:
-                existing_msg = await self.current_trivia_question['channel'].fetch_message(self.current_trivia_question['message_id'])
-                await ctx.send(f"A trivia question is already active! Answer it first: {existing_msg.jump_url}")
-                return
-            except (discord.NotFound, discord.Forbidden):
-                self.current_trivia_question = None
-        
+        # First check if a trivia is already active in this channel
+        existing = self.sessions.get(ctx.guild.id, ctx.channel.id, TRIVIA)
+        if existing:
+            await ctx.send(f"A trivia question is already active! Answer it first: {existing.jump_url}")
+            return
+
         # Check for cooldown using a custom cooldown system
         # This is more reliable than the built-in cooldown decorator
         current_time = datetime.now(timezone.utc)
         guild_id = ctx.guild.id
         
-        # Make sure we have the cooldown tracking dictionary
-        if not hasattr(self, '_last_trivia_time'):
-            self._last_trivia_time = {}
-        
         # Check if this guild has used trivia recently
         if guild_id in self._last_trivia_time:
             time_diff = (current_time - self._last_trivia_time[guild_id]).total_seconds()
@@ -207,80 +217,42 @@ class PPMinigames(commands.Cog):
                 await ctx.send(cooldown_msg)
                 return
         
-        # Using The Trivia API - more questions, better variety!
-        # Categories: film_and_tv, music, sport_and_leisure, arts_and_literature, history, society_and_culture, science, geography, food_and_drink, general_knowledge
-        categories = ['film_and_tv', 'music', 'sport_and_leisure', 'general_knowledge', 'science']
-        category = random.choice(categories)
-        difficulties = ['easy', 'medium', 'hard']
-        difficulty = random.choice(difficulties)
+        # Questions come from the provider's buffers or the local bank; the network is only hit here on a cold start
+        trivia = await self.trivia_provider.fetch()
+        if not trivia:
+            await ctx.send("Sorry, couldn't fetch a trivia question right now.")
+            return
 
-        api_url = f"https://the-trivia-api.com/v2/questions?limit=1&categories={category}&difficulties={difficulty}"
+        all_answers = trivia.choices()
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(api_url) as response:
-                    if response.status != 200:
-                        await ctx.send("Sorry, couldn't fetch a trivia question right now.")
-                        return
-
-                    data = await response.json()
-                    if not data or len(data) == 0:
-                        await ctx.send("Sorry, couldn't get a trivia question. Try again later.")
-                        return
-
-                    question_data = data[0]
-                    question = question_data['question']['text']
-                    correct_answer = question_data['correctAnswer']
-                    incorrect_answers = question_data['incorrectAnswers']
-
-                    all_answers = incorrect_answers + [correct_answer]
-                    random.shuffle(all_answers)
-
-                    choices_text = "\n".join([f"**{chr(65+i)}.** {choice}" for i, choice in enumerate(all_answers)])
-
-                    # Format category name nicely
-                    category_display = question_data['category'].replace('_', ' ').title()
-                    difficulty_emoji = "🟢" if difficulty == "easy" else "🟡" if difficulty == "medium" else "🔴"
-
-                    embed = discord.Embed(
-                        title=f"🧠 Trivia Time! {difficulty_emoji}",
-                        description=f"**{question}**\n\n{choices_text}",
-                        color=discord.Color.blue()
-                    )
-                    embed.set_footer(text=f"Category: {category_display} | Difficulty: {difficulty.title()} | {self.trivia_timeout}s to answer!")
-
-                    trivia_msg = await ctx.send(embed=embed)
-
-                    self.current_trivia_question = {
-                        'question': question,
-                        'correct_answer': correct_answer,
-                        'choices': all_answers,
-                        'channel': ctx.channel,
-                        'message_id': trivia_msg.id,
-                        'ask_time': datetime.now(timezone.utc),
-                        'answered_users': set()
-                    }
-
-                    self.bot.loop.create_task(self._trivia_timeout_check(ctx.channel.id, trivia_msg.id, self.trivia_timeout))
+        # Claim the channel before sending (another !trivia may have claimed it while we waited)
+        session = TriviaSession(ctx.channel, trivia.text, trivia.correct_answer, all_answers)
+        existing = self.sessions.start(session)
+        if existing:
+            await ctx.send(f"A trivia question is already active! Answer it first: {existing.jump_url}")
+            return
 
-            except Exception as e:
-                await ctx.send("An error occurred while fetching trivia.")
-                print(f"Trivia error: {e}")
-                import traceback
-                traceback.print_exc()
+        choices_text = "\n".join([f"**{chr(65+i)}.** {choice}" for i, choice in enumerate(all_answers)])
+
+        # Format category name nicely
+        category_display = trivia.category.replace('_', ' ').title()
+        difficulty = trivia.difficulty
+        difficulty_emoji = "🟢" if difficulty == "easy" else "🟡" if difficulty == "medium" else "🔴"
+
+        embed = discord.Embed(
+            title=f"🧠 Trivia Time! {difficulty_emoji}",
+            description=f"**{trivia.text}**\n\n{choices_text}",
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text=f"Category: {category_display} | Difficulty: {difficulty.title()} | {self.trivia_timeout}s to answer!")
+
+        session.message_id = await self._send_game_message(ctx, session, embed)
+        session.timer = self.scheduler.call_later(self.trivia_timeout, self._trivia_timeout_check, session)
 
     @commands.command()
     @commands.guild_only()
     async def scramble(self, ctx):
         """Scrambles a word - unscramble it to win an item!"""
-        if self.current_scramble:
-            try:
-                existing_msg = await self.current_scramble['channel'].fetch_message(self.current_scramble['message_id'])
-                await ctx.send(f"A scramble is already active! Answer it first: {existing_msg.jump_url}")
-                return
-            except (discord.NotFound, discord.Forbidden):
-                self.current_scramble = None
-
         # Word bank with varying difficulties
         words = [
             # Easy (5-6 letters)
@@ -300,6 +272,12 @@ class PPMinigames(commands.Cog):
             scrambled = ''.join(random.sample(chosen_word, len(chosen_word)))
             attempts += 1
 
+        session = ScrambleSession(ctx.channel, chosen_word.lower(), scrambled)
+        existing = self.sessions.start(session)
+        if existing:
+            await ctx.send(f"A scramble is already active! Answer it first: {existing.jump_url}")
+            return
+
         difficulty_emoji = "🟢" if len(chosen_word) <= 6 else "🟡" if len(chosen_word) <= 8 else "🔴"
 
         embed = discord.Embed(
@@ -309,33 +287,22 @@ class PPMinigames(commands.Cog):
         )
         embed.set_footer(text=f"You have {self.scramble_timeout} seconds! Type your answer in chat.")
 
-        scramble_msg = await ctx.send(embed=embed)
-
-        self.current_scramble = {
-            'word': chosen_word.lower(),
-            'scrambled': scrambled,
-            'channel': ctx.channel,
-            'message_id': scramble_msg.id,
-            'answered_users': set()
-        }
-
-        self.bot.loop.create_task(self._scramble_timeout_check(ctx.channel.id, scramble_msg.id))
+        session.message_id = await self._send_game_message(ctx, session, embed)
+        session.timer = self.scheduler.call_later(self.scramble_timeout, self._scramble_timeout_check, session)
 
     @commands.command()
     @commands.guild_only()
     async def highlow(self, ctx):
         """Guess if the next number will be higher or lower!"""
-        if self.current_highlow:
-            try:
-                existing_msg = await self.current_highlow['channel'].fetch_message(self.current_highlow['message_id'])
-                await ctx.send(f"A Higher/Lower game is already active: {existing_msg.jump_url}")
-                return
-            except (discord.NotFound, discord.Forbidden):
-                self.current_highlow = None
-
         first_number = random.randint(1, 100)
         actual_next = random.randint(1, 100)
 
+        session = HighLowSession(ctx.channel, first_number, actual_next)
+        existing = self.sessions.start(session)
+        if existing:
+            await ctx.send(f"A Higher/Lower game is already active: {existing.jump_url}")
+            return
+
         embed = discord.Embed(
             title="🎲 Higher or Lower?",
             description=f"**Current number: {first_number}**\n\nWill the next number be **higher** or **lower**?\n\nType `h` or `higher` for higher\nType `l` or `lower` for lower",
@@ -343,30 +310,13 @@ class PPMinigames(commands.Cog):
         )
         embed.set_footer(text=f"You have {self.highlow_timeout} seconds to guess!")
 
-        highlow_msg = await ctx.send(embed=embed)
-
-        self.current_highlow = {
-            'current_number': first_number,
-            'next_number': actual_next,
-            'channel': ctx.channel,
-            'message_id': highlow_msg.id,
-            'answered_users': set()
-        }
-
-        self.bot.loop.create_task(self._highlow_timeout_check(ctx.channel.id, highlow_msg.id))
+        session.message_id = await self._send_game_message(ctx, session, embed)
+        session.timer = self.scheduler.call_later(self.highlow_timeout, self._highlow_timeout_check, session)
 
     @commands.command()
     @commands.guild_only()
     async def mathrush(self, ctx):
         """Solve a quick math problem to win an item!"""
-        if self.current_math:
-            try:
-                existing_msg = await self.current_math['channel'].fetch_message(self.current_math['message_id'])
-                await ctx.send(f"A Math Rush is already active: {existing_msg.jump_url}")
-                return
-            except (discord.NotFound, discord.Forbidden):
-                self.current_math = None
-
         # Generate random math problem
         num1 = random.randint(5, 50)
         num2 = random.randint(5, 50)
@@ -384,6 +334,12 @@ class PPMinigames(commands.Cog):
             answer = num1 * num2
             problem = f"{num1} × {num2}"
 
+        session = MathSession(ctx.channel, problem, answer)
+        existing = self.sessions.start(session)
+        if existing:
+            await ctx.send(f"A Math Rush is already active: {existing.jump_url}")
+            return
+
         embed = discord.Embed(
             title="🧮 Math Rush!",
             description=f"**Solve this:**\n\n`{problem} = ?`",
@@ -391,17 +347,8 @@ class PPMinigames(commands.Cog):
         )
         embed.set_footer(text=f"Quick! You have {self.math_timeout} seconds!")
 
-        math_msg = await ctx.send(embed=embed)
-
-        self.current_math = {
-            'answer': answer,
-            'problem': problem,
-            'channel': ctx.channel,
-            'message_id': math_msg.id,
-            'answered_users': set()
-        }
-
-        self.bot.loop.create_task(self._math_timeout_check(ctx.channel.id, math_msg.id))
+        session.message_id = await self._send_game_message(ctx, session, embed)
+        session.timer = self.scheduler.call_later(self.math_timeout, self._math_timeout_check, session)
 
     @commands.command(name="wyr")
     @commands.guild_only()
@@ -452,8 +399,8 @@ class PPMinigames(commands.Cog):
             await ctx.send(f"{player.mention}, please enter a valid number! Example: `pls blackjack 50`")
             return
 
-        # Check if already in a game
-        if player.id in self.active_blackjack_games:
+        # Check if already in a game (or starting one)
+        if player.id in self.active_blackjack_games or player.id in self.starting_blackjack:
             await ctx.send(f"{player.mention}, you're already in a blackjack game! Use `pls hit` or `pls stand`.")
             return
 
@@ -462,50 +409,37 @@ class PPMinigames(commands.Cog):
             await ctx.send(f"{player.mention}, you need to bet at least 1 PP coin!")
             return
 
-        # Check if player has enough coins
-        db = await self._get_db()
-        async with db.acquire() as conn:
-            user_data = await conn.fetchrow("SELECT pp_coins FROM user_data WHERE user_id = $1", player.id)
-            current_coins = user_data['pp_coins'] if user_data else 0
-
-            if current_coins < bet:
-                await ctx.send(f"{player.mention}, you only have **{current_coins}** PP coins! You can't bet {bet}.")
+        # Claim the player's game slot before the first await, so a second quick bet is turned away above
+        self.starting_blackjack.add(player.id)
+        try:
+            # Check if player has enough coins (a cached balance turns short bets away without a query)
+            db = await self._get_db()
+            cached_coins = db.users.get(player.id, 'coins')
+            if cached_coins is not MISSING and cached_coins < bet:
+                await ctx.send(f"{player.mention}, you only have **{cached_coins}** PP coins! You can't bet {bet}.")
                 return
 
-            # Deduct bet from their balance
-            await conn.execute("""
-                INSERT INTO user_data (user_id, pp_coins) VALUES ($1, 0)
-                ON CONFLICT (user_id) DO UPDATE SET pp_coins = user_data.pp_coins - $2
-            """, player.id, bet)
-            print(f"[Blackjack] Deducted {bet} PP coins from user {player.id}")
-
-        # Create new game
-        deck = self._create_deck()
-        random.shuffle(deck)
-
-        player_hand = [deck.pop(), deck.pop()]
-        dealer_hand = [deck.pop(), deck.pop()]
-
-        game_data = {
-            'bet': bet,
-            'deck': deck,
-            'player_hand': player_hand,
-            'dealer_hand': dealer_hand,
-            'channel': ctx.channel
-        }
-
-        self.active_blackjack_games[player.id] = game_data
+            # Deal first, so the bet and the saved game are committed together (a natural blackjack is settled on the deal)
+            game = blackjack.deal(bet, ctx.channel.id)
 
-        # Check for natural blackjack
-        player_value = self._calculate_hand(player_hand)
-        dealer_value = self._calculate_hand(dealer_hand)
+            # Check and deduct in one statement, so two quick bets can't both spend the same coins
+            debited, balance = await db.ledger.debit_if_sufficient(
+                player.id, bet, snapshot=(BLACKJACK_SNAPSHOT, player.id, blackjack.to_state(game))
+            )
+            if not debited:
+                await ctx.send(f"{player.mention}, you only have **{balance}** PP coins! You can't bet {bet}.")
+                return
+            print(f"[Blackjack] Deducted {bet} PP coins from user {player.id}")
+            self.active_blackjack_games[player.id] = game
+        finally:
+            self.starting_blackjack.discard(player.id)
 
-        if player_value == 21:
-            await self._end_blackjack_game(player, ctx, "blackjack")
+        if game.result:
+            await self._end_blackjack_game(player, ctx)
             return
 
         # Show initial hands
-        embed = self._create_blackjack_embed(player, game_data, show_dealer_card=False)
+        embed = self._create_blackjack_embed(player, game, show_dealer_card=False)
         await ctx.send(embed=embed)
 
     @commands.command()
@@ -518,31 +452,22 @@ class PPMinigames(commands.Cog):
             await ctx.send(f"{player.mention}, you're not in a blackjack game! Start one with `pls blackjack <bet>`.")
             return
 
-        game_data = self.active_blackjack_games[player.id]
+        game = self.active_blackjack_games[player.id]
 
         # Check if in correct channel
-        if ctx.channel.id != game_data['channel'].id:
-            await ctx.send(f"{player.mention}, your blackjack game is in {game_data['channel'].mention}!")
+        if ctx.channel.id != game.channel_id:
+            await ctx.send(f"{player.mention}, your blackjack game is in <#{game.channel_id}>!")
             return
 
-        # Deal a card
-        card = game_data['deck'].pop()
-        game_data['player_hand'].append(card)
-
-        player_value = self._calculate_hand(game_data['player_hand'])
-
-        # Check for bust
-        if player_value > 21:
-            await self._end_blackjack_game(player, ctx, "bust")
-            return
-
-        # Check for 21
-        if player_value == 21:
-            await self._end_blackjack_game(player, ctx, "stand")
+        # Deal a card (busting or reaching 21 ends the game)
+        blackjack.hit(game)
+        if game.result:
+            await self._end_blackjack_game(player, ctx)
             return
+        self.snapshots.save(BLACKJACK_SNAPSHOT, player.id, blackjack.to_state(game))
 
         # Show updated hand
-        embed = self._create_blackjack_embed(player, game_data, show_dealer_card=False)
+        embed = self._create_blackjack_embed(player, game, show_dealer_card=False)
         await ctx.send(embed=embed)
 
     @commands.command()
@@ -555,14 +480,15 @@ class PPMinigames(commands.Cog):
             await ctx.send(f"{player.mention}, you're not in a blackjack game! Start one with `pls blackjack <bet>`.")
             return
 
-        game_data = self.active_blackjack_games[player.id]
+        game = self.active_blackjack_games[player.id]
 
         # Check if in correct channel
-        if ctx.channel.id != game_data['channel'].id:
-            await ctx.send(f"{player.mention}, your blackjack game is in {game_data['channel'].mention}!")
+        if ctx.channel.id != game.channel_id:
+            await ctx.send(f"{player.mention}, your blackjack game is in <#{game.channel_id}>!")
             return
 
-        await self._end_blackjack_game(player, ctx, "stand")
+        blackjack.settle(game)
+        await self._end_blackjack_game(player, ctx)
 
     @commands.command(name="ppoff")
     @commands.guild_only()
@@ -581,6 +507,7 @@ class PPMinigames(commands.Cog):
         self.pp_off_end_time = datetime.now(timezone.utc) + timedelta(minutes=duration_minutes)
         self.pp_off_participants = {}
         self.pp_off_channel = ctx.channel
+        self._save_pp_off()
 
         await ctx.send(
             f"🚨 **PP Off has begun!** 🚨\n"
@@ -588,176 +515,153 @@ class PPMinigames(commands.Cog):
             f"Ends at: {discord.utils.format_dt(self.pp_off_end_time, style='T')}"
         )
 
-        self.bot.loop.create_task(self._schedule_ppoff_end(duration_minutes * 60))
+        self.scheduler.call_later(_seconds_until(self.pp_off_end_time), self._calculate_and_announce_ppoff_results)
 
     # Helper Methods
-    async def _clear_expired_duels(self):
-        """Removes duel requests older than the timeout."""
-        now_utc = datetime.now(timezone.utc)
-        expired_keys = [
-            challenged_id for challenged_id, request in self.pending_duels.items()
-            if (now_utc - request['timestamp']).total_seconds() > self.duel_timeout_seconds
-        ]
-        for key in expired_keys:
-            del self.pending_duels[key]
-
-    async def _is_user_in_duel(self, user_id: int) -> bool:
-        """Check if a user is either challenging or being challenged."""
-        if user_id in self.pending_duels:
-            return True
-        return any(request['challenger'] == user_id for request in self.pending_duels.values())
-
-    async def _perform_duel_roll(self, user_id: int) -> int:
-        """Performs a PP roll for a duel, including event/item effects."""
-        sizes = list(range(21))
-        weights = [
-            1,  2,  3,  5,  7,  10,  15,  18,  20,  25,
-            30, 30, 25, 20, 15, 10,  7,   5,   3,   2,
-            1
-        ]
-
-        base_size = random.choices(sizes, weights=weights, k=1)[0]
-        final_size = base_size
-
+    def _add_duel(self, challenge):
+        """Registers a challenge, schedules its expiry and saves it. Returns the pair's existing challenge instead, if any."""
+        existing = self.duels.add(challenge)
+        if existing:
+            return existing
+        challenge.timer = self.scheduler.call_later(_seconds_until(challenge.deadline), self._expire_duel, challenge)
+        self.snapshots.save(DUEL_SNAPSHOT, challenge.challenge_id, {
+            'challenger': challenge.challenger_id,
+            'challenged': challenge.challenged_id,
+        }, challenge.deadline)
+        return None
+
+    def _expire_duel(self, challenge):
+        """Scheduler callback: drops a duel request nobody accepted in time."""
+        if self.duels.remove(challenge):
+            self.snapshots.discard(DUEL_SNAPSHOT, challenge.challenge_id)
+
+    def _save_pp_off(self):
+        self.snapshots.save(PP_OFF_SNAPSHOT, 0, {
+            'channel_id': self.pp_off_channel.id,
+            'participants': self.pp_off_participants,
+        }, self.pp_off_end_time)
+
+    async def _restore_games(self):
+        """Rebuilds blackjack games, duel requests and a PP Off from game_snapshots (one query) and re-arms their deadlines."""
+        self._restored = True
+        db = await self._get_db()
+        async with db.acquire() as conn:
+            snapshots = await db.snapshots.load(conn)
+
+        for user_id, state, _ in snapshots.get(BLACKJACK_SNAPSHOT, ()):
+            self.active_blackjack_games[user_id] = blackjack.from_state(state)
+
+        for challenge_id, state, deadline in snapshots.get(DUEL_SNAPSHOT, ()):
+            # Already-expired requests are dropped as soon as the scheduler runs
+            self._add_duel(DuelChallenge(challenge_id, state['challenger'], state['challenged'], deadline))
+
+        for _, state, deadline in snapshots.get(PP_OFF_SNAPSHOT, ()):
+            channel = self.bot.get_channel(state['channel_id'])
+            if not channel:
+                self.snapshots.discard(PP_OFF_SNAPSHOT, 0)
+                continue
+            self.pp_off_active = True
+            self.pp_off_end_time = deadline
+            self.pp_off_participants = {int(user_id): score for user_id, score in state['participants'].items()}
+            self.pp_off_channel = channel
+            self.scheduler.call_later(_seconds_until(deadline), self._calculate_and_announce_ppoff_results)
+
+        print(f" Restored {len(self.active_blackjack_games)} blackjack game(s), {len(self.duels)} duel request(s)"
+              f"{' and a PP Off' if self.pp_off_active else ''}.")
+
+    async def _perform_duel_rolls(self, user_ids) -> dict:
+        """Rolls for every duelist at once, including event/item effects. Returns {user_id: final_size}."""
         # Get event effect if available
+        event_value = 0
         event_cog = self.bot.get_cog('PPEvents')
         if event_cog:
             event_effect = event_cog.get_current_event_effect()
             if event_effect:
-                final_size += event_effect['effect']
+                event_value = event_effect['effect']
 
-        # Get active effects from database
+        # One lookup of everyone's item boosts (kept in memory by the effects engine)
         db = await self._get_db()
-        async with db.acquire() as conn:
-            active_boost = await conn.fetchrow("""
-                SELECT effect_value FROM user_active_effects 
-                WHERE user_id = $1 AND effect_type = 'pp_boost' AND end_time > NOW()
-            """, user_id)
-            
-            if active_boost:
-                final_size += active_boost['effect_value']
+        rolls = self.rolls.roll_many(user_ids, event_value, db.effects.roll_modifiers(user_ids))
+        return {user_id: final_size for user_id, (_, final_size) in rolls.items()}
 
-        return max(0, min(20, final_size))
+    async def _record_duel_win(self, winner, ctx):
+        """Adds a duel win (one upsert returning the new total), then grants any achievement that total reaches."""
+        try:
+            db = await self._get_db()
+            new_stats = await db.counters.add('user_stats', winner.id, returning=('duel_wins',), duel_wins=1)
+            new_duel_wins = new_stats['duel_wins']
+            print(f"[Stats] Updated duel_wins for {winner.name} ({winner.id}) to {new_duel_wins}")
+
+            # Grant achievements based on the new count (the win is already written)
+            achievement_id = DUEL_WIN_ACHIEVEMENTS.get(new_duel_wins)
+            profile_cog = self.bot.get_cog('PPProfile')
+            if achievement_id and profile_cog:
+                await profile_cog._grant_achievement(winner, achievement_id, ctx)
+        except Exception as e:
+            print(f"Error updating duel stats/achievements for {winner.name}: {e}")
+            import traceback
+            traceback.print_exc()
 
-    async def _trivia_timeout_check(self, channel_id, message_id, delay):
-        """Checks if a trivia question timed out."""
-        await asyncio.sleep(delay)
-        if (self.current_trivia_question and
-            self.current_trivia_question['channel'].id == channel_id and
-            self.current_trivia_question['message_id'] == message_id):
+    async def _send_game_message(self, ctx, session, embed):
+        """Sends a game's embed and returns the message id. Frees the channel's slot if sending fails."""
+        try:
+            message = await ctx.send(embed=embed)
+        except Exception:
+            self.sessions.end(session)
+            raise
+        return message.id
 
-            channel = self.current_trivia_question['channel']
-            correct_answer = self.current_trivia_question['correct_answer']
-            self.current_trivia_question = None
+    async def _trivia_timeout_check(self, session):
+        """Checks if a trivia question timed out."""
+        if self.sessions.end(session):
+            channel = session.channel
 
             # When a trivia times out, we should reset the cooldown for that guild
-            guild_id = channel.guild.id
-            if hasattr(self, '_last_trivia_time') and guild_id in self._last_trivia_time:
+            guild_id = session.guild_id
+            if guild_id in self._last_trivia_time:
                 # Set the time to more than 60 seconds ago to reset cooldown
                 self._last_trivia_time[guild_id] = datetime.now(timezone.utc) - timedelta(seconds=61)
 
             try:
-                await channel.send(f"⏰ Time's up! The correct answer was: **{correct_answer}**")
+                await channel.send(f"⏰ Time's up! The correct answer was: **{session.correct_answer}**")
             except (discord.NotFound, discord.Forbidden) as e:
                 print(f"Error sending trivia timeout message: {e}")
 
-    async def _scramble_timeout_check(self, channel_id, message_id):
+    async def _scramble_timeout_check(self, session):
         """Checks if a scramble timed out."""
-        await asyncio.sleep(self.scramble_timeout)
-        if (self.current_scramble and
-            self.current_scramble['channel'].id == channel_id and
-            self.current_scramble['message_id'] == message_id):
-
-            channel = self.current_scramble['channel']
-            correct_word = self.current_scramble['word']
-            self.current_scramble = None
-
+        if self.sessions.end(session):
             try:
-                await channel.send(f"⏰ Time's up! The word was: **{correct_word.upper()}**")
+                await session.channel.send(f"⏰ Time's up! The word was: **{session.word.upper()}**")
             except (discord.NotFound, discord.Forbidden) as e:
                 print(f"Error sending scramble timeout message: {e}")
 
-    async def _highlow_timeout_check(self, channel_id, message_id):
+    async def _highlow_timeout_check(self, session):
         """Checks if a higher/lower game timed out."""
-        await asyncio.sleep(self.highlow_timeout)
-        if (self.current_highlow and
-            self.current_highlow['channel'].id == channel_id and
-            self.current_highlow['message_id'] == message_id):
-
-            channel = self.current_highlow['channel']
-            next_num = self.current_highlow['next_number']
-            current_num = self.current_highlow['current_number']
+        if self.sessions.end(session):
+            next_num = session.next_number
+            current_num = session.current_number
             result = "higher" if next_num > current_num else "lower" if next_num < current_num else "the same"
-            self.current_highlow = None
 
             try:
-                await channel.send(f"⏰ Time's up! The next number was **{next_num}** ({result})!")
+                await session.channel.send(f"⏰ Time's up! The next number was **{next_num}** ({result})!")
             except (discord.NotFound, discord.Forbidden) as e:
                 print(f"Error sending highlow timeout message: {e}")
 
-    async def _math_timeout_check(self, channel_id, message_id):
+    async def _math_timeout_check(self, session):
         """Checks if a math problem timed out."""
-        await asyncio.sleep(self.math_timeout)
-        if (self.current_math and
-            self.current_math['channel'].id == channel_id and
-            self.current_math['message_id'] == message_id):
-
-            channel = self.current_math['channel']
-            answer = self.current_math['answer']
-            problem = self.current_math['problem']
-            self.current_math = None
-
+        if self.sessions.end(session):
             try:
-                await channel.send(f"⏰ Time's up! The answer was: **{problem} = {answer}**")
+                await session.channel.send(f"⏰ Time's up! The answer was: **{session.problem} = {session.answer}**")
             except (discord.NotFound, discord.Forbidden) as e:
                 print(f"Error sending math timeout message: {e}")
 
-    def _create_deck(self):
-        """Create a standard 52-card deck"""
-        suits = ['♠', '♥', '♦', '♣']
-        ranks = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
-        deck = []
-        for suit in suits:
-            for rank in ranks:
-                deck.append(f"{rank}{suit}")
-        return deck
-
-    def _calculate_hand(self, hand):
-        """Calculate the value of a blackjack hand"""
-        value = 0
-        aces = 0
-
-        for card in hand:
-            rank = card[:-1]  # Remove suit
-            if rank in ['J', 'Q', 'K']:
-                value += 10
-            elif rank == 'A':
-                aces += 1
-                value += 11
-            else:
-                value += int(rank)
-
-        # Adjust for aces
-        while value > 21 and aces > 0:
-            value -= 10
-            aces -= 1
-
-        return value
-
-    def _format_hand(self, hand, hide_second=False):
-        """Format a hand for display"""
-        if hide_second and len(hand) > 1:
-            return f"{hand[0]} 🂠"
-        return " ".join(hand)
-
-    def _create_blackjack_embed(self, player, game_data, show_dealer_card=False, result=None):
+    def _create_blackjack_embed(self, player, game, show_dealer_card=False):
         """Create an embed showing the blackjack game state"""
-        player_hand = game_data['player_hand']
-        dealer_hand = game_data['dealer_hand']
-        bet = game_data['bet']
+        bet = game.bet
+        result = game.result
 
-        player_value = self._calculate_hand(player_hand)
-        dealer_value = self._calculate_hand(dealer_hand) if show_dealer_card else self._calculate_hand([dealer_hand[0]])
+        player_value = game.player.total
+        dealer_value = game.dealer.total if show_dealer_card else blackjack.card_value(game.dealer.cards[0])
 
         # Choose color based on result
         if result == "win" or result == "blackjack":
@@ -775,14 +679,14 @@ class PPMinigames(commands.Cog):
         )
 
         # Dealer's hand
-        dealer_display = self._format_hand(dealer_hand, hide_second=not show_dealer_card)
+        dealer_display = game.dealer.format(hide_second=not show_dealer_card)
         if show_dealer_card:
             embed.add_field(name=f"Dealer's Hand ({dealer_value})", value=dealer_display, inline=False)
         else:
             embed.add_field(name="Dealer's Hand", value=dealer_display, inline=False)
 
         # Player's hand
-        player_display = self._format_hand(player_hand)
+        player_display = game.player.format()
         embed.add_field(name=f"{player.display_name}'s Hand ({player_value})", value=player_display, inline=False)
 
         # Show bet
@@ -791,9 +695,9 @@ class PPMinigames(commands.Cog):
         # Show result if game is over
         if result:
             if result == "win":
-                embed.add_field(name="Result", value=f"🎉 You win {bet * 2} PP coins!", inline=False)
+                embed.add_field(name="Result", value=f"🎉 You win {blackjack_winnings('win', bet)} PP coins!", inline=False)
             elif result == "blackjack":
-                embed.add_field(name="Result", value=f"🎰 BLACKJACK! You win {int(bet * 2.5)} PP coins!", inline=False)
+                embed.add_field(name="Result", value=f"🎰 BLACKJACK! You win {blackjack_winnings('blackjack', bet)} PP coins!", inline=False)
             elif result == "lose":
                 embed.add_field(name="Result", value=f"💔 Dealer wins! You lost {bet} PP coins.", inline=False)
             elif result == "bust":
@@ -805,139 +709,61 @@ class PPMinigames(commands.Cog):
 
         return embed
 
-    async def _end_blackjack_game(self, player, ctx, action):
-        """End a blackjack game and determine winner"""
-        game_data = self.active_blackjack_games[player.id]
-        bet = game_data['bet']
-        player_hand = game_data['player_hand']
-        dealer_hand = game_data['dealer_hand']
-
-        player_value = self._calculate_hand(player_hand)
-
-        # Handle bust
-        if action == "bust":
-            del self.active_blackjack_games[player.id]
-            embed = self._create_blackjack_embed(player, game_data, show_dealer_card=True, result="bust")
-            await ctx.send(embed=embed)
-            return
+    async def _end_blackjack_game(self, player, ctx):
+        """Pay out a settled blackjack game and show the result"""
+        game = self.active_blackjack_games.pop(player.id)
 
-        # Handle blackjack
-        if action == "blackjack":
-            dealer_value = self._calculate_hand(dealer_hand)
-            if dealer_value == 21:
-                # Push
-                result = "push"
-                winnings = bet
-            else:
-                # Blackjack pays 2.5x
-                result = "blackjack"
-                winnings = int(bet * 2.5)
+        # Award winnings, committed together with the snapshot's deletion so a crash can't lose or repeat them
+        winnings = game.winnings
+        if winnings > 0:
+            db = await self._get_db()
+            await db.ledger.credit(player.id, winnings, discard=(BLACKJACK_SNAPSHOT, player.id))
+            print(f"[Blackjack] Awarded {winnings} PP coins to user {player.id}")
         else:
-            # Dealer plays
-            while self._calculate_hand(dealer_hand) < 17:
-                dealer_hand.append(game_data['deck'].pop())
-
-            dealer_value = self._calculate_hand(dealer_hand)
-
-            # Determine winner
-            if dealer_value > 21:
-                result = "win"
-                winnings = bet * 2
-            elif dealer_value > player_value:
-                result = "lose"
-                winnings = 0
-            elif dealer_value < player_value:
-                result = "win"
-                winnings = bet * 2
-            else:
-                result = "push"
-                winnings = bet
+            await self.snapshots.delete(BLACKJACK_SNAPSHOT, player.id)
 
-        # Award winnings
-        db = await self._get_db()
-        async with db.acquire() as conn:
-            if winnings > 0:
-                await conn.execute("""
-                    INSERT INTO user_data (user_id, pp_coins) VALUES ($1, $2)
-                    ON CONFLICT (user_id) DO UPDATE SET pp_coins = user_data.pp_coins + $2
-                """, player.id, winnings)
-                print(f"[Blackjack] Awarded {winnings} PP coins to user {player.id}")
-
-        # Clean up and show result
-        del self.active_blackjack_games[player.id]
-        embed = self._create_blackjack_embed(player, game_data, show_dealer_card=True, result=result)
+        # Show result
+        embed = self._create_blackjack_embed(player, game, show_dealer_card=True)
         await ctx.send(embed=embed)
 
     async def _award_game_item(self, winner, message, success_message: str):
         """Awards a random item AND PP coins to a game winner (used for scramble, highlow, mathrush)"""
         db = await self._get_db()
-        coin_reward = 10  # Award 10 PP coins per game win
+        coin_reward = GAME_WIN_COINS
 
         try:
+            # Award PP coins
+            await db.ledger.credit(winner.id, coin_reward)
+            print(f"[Game Reward] Awarded {coin_reward} PP coins to user {winner.id}")
+
+            # Choose random item by its drop weight (from the in-memory item catalog)
+            chosen_item = db.items.draw()
+            if not chosen_item:
+                await message.channel.send(f"{success_message} You earned **{coin_reward} PP coins**! (No items available)")
+                return
+
+            # Add item to inventory
             async with db.acquire() as conn:
-                async with conn.transaction():
-                    # Award PP coins
-                    await conn.execute("""
-                        INSERT INTO user_data (user_id, pp_coins) VALUES ($1, $2)
-                        ON CONFLICT (user_id) DO UPDATE SET pp_coins = user_data.pp_coins + $2
-                    """, winner.id, coin_reward)
-                    print(f"[Game Reward] Awarded {coin_reward} PP coins to user {winner.id}")
-
-                    # Get all available items
-                    items = await conn.fetch("SELECT item_id, name FROM items")
-                    if not items:
-                        await message.channel.send(f"{success_message} You earned **{coin_reward} PP coins**! (No items available)")
-                        return
-
-                    # Define item rarities (same as trivia)
-                    item_weights = {
-                        1: 40,  # Growth Potion - common
-                        2: 30,  # Shrink Ray - uncommon
-                        3: 20,  # Lucky Socks - rare
-                        4: 10   # Reroll Token - very rare
-                    }
-
-                    # Choose random item based on weights
-                    item_ids = [item['item_id'] for item in items]
-                    weights = [item_weights.get(item_id, 25) for item_id in item_ids]
-                    chosen_item_id = random.choices(item_ids, weights=weights, k=1)[0]
-                    chosen_item = next(item for item in items if item['item_id'] == chosen_item_id)
-
-                    # Add item to inventory
-                    await conn.execute("""
-                        INSERT INTO user_inventory (user_id, item_id, quantity)
-                        VALUES ($1, $2, 1)
-                        ON CONFLICT (user_id, item_id)
-                        DO UPDATE SET quantity = user_inventory.quantity + 1
-                    """, winner.id, chosen_item_id)
-
-                    # Get rarity text
-                    weight = item_weights.get(chosen_item_id, 25)
-                    if weight <= 10:
-                        rarity_text = "🌟 VERY RARE 🌟"
-                    elif weight <= 20:
-                        rarity_text = "✨ RARE ✨"
-                    elif weight <= 30:
-                        rarity_text = "🔹 UNCOMMON 🔹"
-                    else:
-                        rarity_text = "COMMON"
-
-                    await message.channel.send(f"{success_message} You won a **{chosen_item['name']}** ({rarity_text}) and **{coin_reward} PP coins**! 💰")
+                await conn.execute("""
+                    INSERT INTO user_inventory (user_id, item_id, quantity)
+                    VALUES ($1, $2, 1)
+                    ON CONFLICT (user_id, item_id)
+                    DO UPDATE SET quantity = user_inventory.quantity + 1
+                """, winner.id, chosen_item['item_id'])
+
+            rarity_text = rarity_label(chosen_item['drop_weight'])
+            await message.channel.send(f"{success_message} You won a **{chosen_item['name']}** ({rarity_text}) and **{coin_reward} PP coins**! 💰")
         except Exception as e:
             print(f"Error awarding game item: {e}")
             await message.channel.send(f"{success_message} (Error giving rewards)")
 
-    async def _schedule_ppoff_end(self, delay_seconds: int):
-        """Waits for the duration then triggers PP Off results calculation."""
-        await asyncio.sleep(delay_seconds)
-        await self._calculate_and_announce_ppoff_results()
-
     async def _calculate_and_announce_ppoff_results(self):
         """Calculates and announces the winner of the PP Off event."""
         if not self.pp_off_channel:
             self.pp_off_active = False
             self.pp_off_participants = {}
             self.pp_off_end_time = None
+            self.snapshots.discard(PP_OFF_SNAPSHOT, 0)
             return
 
         if not self.pp_off_participants:
@@ -983,174 +809,131 @@ class PPMinigames(commands.Cog):
         self.pp_off_participants = {}
         self.pp_off_channel = None
         self.pp_off_end_time = None
+        self.snapshots.discard(PP_OFF_SNAPSHOT, 0)
 
     @commands.Cog.listener()
     async def on_message(self, message):
         """Handle answers for trivia, scramble, highlow, and math games"""
-        if message.author.bot:
+        # Hot path: most messages are in channels with no game running
+        games = self.sessions.in_channel(message.channel.id)
+        if not games or message.author.bot:
             return
 
-        # Handle Word Scramble
-        if self.current_scramble and message.channel.id == self.current_scramble['channel'].id:
-            if message.author.id not in self.current_scramble['answered_users']:
-                user_answer = message.content.strip().lower()
-                if user_answer == self.current_scramble['word']:
-                    self.current_scramble['answered_users'].add(message.author.id)
-                    winner = message.author
-                    correct_word = self.current_scramble['word']
-                    self.current_scramble = None
-
-                    # Award item
-                    await self._award_game_item(winner, message, f"🎉 Correct, {winner.mention}! The word was **{correct_word.upper()}**!")
+        content = message.content
+        for game_type, handler in self._answer_handlers:
+            session = games.get(game_type)
+            if (session and session.prefilter(content)
+                    and message.author.id not in session.answered_users):
+                if await handler(session, message):
                     return
 
-        # Handle Higher/Lower
-        if self.current_highlow and message.channel.id == self.current_highlow['channel'].id:
-            if message.author.id not in self.current_highlow['answered_users']:
-                user_answer = message.content.strip().lower()
-                if user_answer in ['h', 'higher', 'l', 'lower']:
-                    self.current_highlow['answered_users'].add(message.author.id)
-                    current = self.current_highlow['current_number']
-                    next_num = self.current_highlow['next_number']
-                    guess_higher = user_answer in ['h', 'higher']
-
-                    is_correct = (next_num > current and guess_higher) or (next_num < current and not guess_higher) or (next_num == current)
-
-                    if is_correct:
-                        winner = message.author
-                        self.current_highlow = None
-                        result_msg = f"🎉 Correct, {winner.mention}! The next number was **{next_num}**!"
-                        await self._award_game_item(winner, message, result_msg)
-                    else:
-                        await message.reply(f"❌ Wrong! The next number was **{next_num}**. Better luck next time!", delete_after=10)
-                        # Don't clear the game, let others try
-                    return
+    async def _answer_scramble(self, session, message):
+        """Returns True if the message was handled as a scramble answer."""
+        user_answer = message.content.strip().lower()
+        if user_answer != session.word:
+            return False
+        self.sessions.end(session)
+        winner = message.author
+
+        # Award item
+        await self._award_game_item(winner, message, f"🎉 Correct, {winner.mention}! The word was **{session.word.upper()}**!")
+        return True
+
+    async def _answer_highlow(self, session, message):
+        """Returns True if the message was handled as a higher/lower guess."""
+        user_answer = message.content.strip().lower()
+        if user_answer not in ('h', 'higher', 'l', 'lower'):
+            return False
+        session.answered_users.add(message.author.id)
+        current = session.current_number
+        next_num = session.next_number
+        guess_higher = user_answer in ('h', 'higher')
+
+        is_correct = (next_num > current and guess_higher) or (next_num < current and not guess_higher) or (next_num == current)
+
+        if is_correct:
+            self.sessions.end(session)
+            winner = message.author
+            result_msg = f"🎉 Correct, {winner.mention}! The next number was **{next_num}**!"
+            await self._award_game_item(winner, message, result_msg)
+        else:
+            await message.reply(f"❌ Wrong! The next number was **{next_num}**. Better luck next time!", delete_after=10)
+            # Don't clear the game, let others try
+        return True
 
-        # Handle Math Rush
-        if self.current_math and message.channel.id == self.current_math['channel'].id:
-            if message.author.id not in self.current_math['answered_users']:
-                try:
-                    user_answer = int(message.content.strip())
-                    if user_answer == self.current_math['answer']:
-                        self.current_math['answered_users'].add(message.author.id)
-                        winner = message.author
-                        problem = self.current_math['problem']
-                        answer = self.current_math['answer']
-                        self.current_math = None
-
-                        await self._award_game_item(winner, message, f"🎉 Correct, {winner.mention}! **{problem} = {answer}**!")
-                        return
-                except ValueError:
-                    pass  # Not a number, ignore
-
-        # Handle Trivia
-        if not self.current_trivia_question:
-            return
+    async def _answer_math(self, session, message):
+        """Returns True if the message was the right answer to the math problem."""
+        try:
+            user_answer = int(message.content.strip())
+        except ValueError:
+            return False  # Not a number, ignore
+        if user_answer != session.answer:
+            return False
+        self.sessions.end(session)
+        winner = message.author
 
-        if message.channel.id != self.current_trivia_question['channel'].id:
-            return
+        await self._award_game_item(winner, message, f"🎉 Correct, {winner.mention}! **{session.problem} = {session.answer}**!")
+        return True
 
+    async def _answer_trivia(self, session, message):
+        """Returns True if the message was handled as a trivia answer."""
         content_lower = message.content.strip().lower()
-        if len(content_lower) != 1 or content_lower not in 'abcd':
-            return
-
-        if message.author.id in self.current_trivia_question['answered_users']:
-            return
-
-        self.current_trivia_question['answered_users'].add(message.author.id)
         choice_index = ord(content_lower) - ord('a')
-        chosen_answer = self.current_trivia_question['choices'][choice_index]
-        correct_answer = self.current_trivia_question['correct_answer']
+        if choice_index >= len(session.choices):
+            return False # e.g. 'd' on a true/false question
+        session.answered_users.add(message.author.id)
+        chosen_answer = session.choices[choice_index]
+        correct_answer = session.correct_answer
 
         if chosen_answer == correct_answer:
+            self.sessions.end(session)
             winner = message.author
-            question_msg_id = self.current_trivia_question['message_id']
-            channel = self.current_trivia_question['channel']
+            channel = session.channel
             profile_cog = self.bot.get_cog('PPProfile') # Get profile cog
-            self.current_trivia_question = None
-            
+
             # Set cooldown time when someone answers correctly
-            guild_id = message.guild.id
-            if hasattr(self, '_last_trivia_time'):  # Ensure dict exists
-                self._last_trivia_time[guild_id] = datetime.now(timezone.utc)
+            self._last_trivia_time[session.guild_id] = datetime.now(timezone.utc)
 
             # Award a random item with varying rarity
             db = await self._get_db()
             try:
+                # 1. Update Trivia Wins Stat
+                new_stats = await db.counters.add('user_stats', winner.id, returning=('trivia_wins',), trivia_wins=1)
+                new_trivia_wins = new_stats['trivia_wins']
+                print(f"[Stats] Updated trivia_wins for {winner.name} ({winner.id}) to {new_trivia_wins}")
+
+                # 2. Check for Trivia Achievements
+                if profile_cog:
+                    ctx = await self.bot.get_context(message) # Get context for achievement message
+                    if new_trivia_wins == 1:
+                        await profile_cog._grant_achievement(winner, 'first_win_trivia', ctx)
+                    if new_trivia_wins == 10:
+                        await profile_cog._grant_achievement(winner, 'ten_wins_trivia', ctx)
+
+                # 3. Award PP coins
+                coin_reward = TRIVIA_WIN_COINS
+                await db.ledger.credit(winner.id, coin_reward)
+                print(f"[Trivia Reward] Awarded {coin_reward} PP coins to user {winner.id}")
+
+                # 4. Give Item Reward, chosen by drop weight from the in-memory item catalog
+                chosen_item = db.items.draw()
+                if not chosen_item:
+                    raise ValueError("No droppable items in the item catalog")
+
+                # Add the item to the user's inventory
                 async with db.acquire() as conn:
-                    async with conn.transaction(): # Ensure atomicity for stats and rewards
-                        # 1. Update Trivia Wins Stat
-                        new_stats = await conn.fetchrow("""
-                            INSERT INTO user_stats (user_id, trivia_wins) VALUES ($1, 1)
-                            ON CONFLICT (user_id) DO UPDATE SET
-                                trivia_wins = user_stats.trivia_wins + 1
-                            RETURNING trivia_wins
-                            """, winner.id)
-                        new_trivia_wins = new_stats['trivia_wins'] if new_stats else 1
-                        print(f"[Stats] Updated trivia_wins for {winner.name} ({winner.id}) to {new_trivia_wins}")
-
-                        # 2. Check for Trivia Achievements
-                        if profile_cog:
-                            ctx = await self.bot.get_context(message) # Get context for achievement message
-                            if new_trivia_wins == 1:
-                                await profile_cog._grant_achievement(winner, 'first_win_trivia', ctx)
-                            if new_trivia_wins == 10:
-                                await profile_cog._grant_achievement(winner, 'ten_wins_trivia', ctx)
-
-                        # 3. Award PP coins
-                        coin_reward = 10
-                        await conn.execute("""
-                            INSERT INTO user_data (user_id, pp_coins) VALUES ($1, $2)
-                            ON CONFLICT (user_id) DO UPDATE SET pp_coins = user_data.pp_coins + $2
-                        """, winner.id, coin_reward)
-                        print(f"[Trivia Reward] Awarded {coin_reward} PP coins to user {winner.id}")
-
-                        # 4. Give Item Reward (Existing Logic)
-                        # Get all available items
-                        items = await conn.fetch("SELECT item_id, name FROM items")
-                        if not items:
-                            raise ValueError("No items found in database")
-
-                        # Define item rarities (item_id: weight)
-                        # Lower weight = more rare
-                        item_weights = {
-                            1: 40,  # Growth Potion - common
-                            2: 30,  # Shrink Ray - uncommon
-                            3: 20,  # Lucky Socks - rare
-                            4: 10   # Reroll Token - very rare
-                        }
-
-                        # Get all item IDs and their corresponding weights
-                        item_ids = [item['item_id'] for item in items]
-                        weights = [item_weights.get(item_id, 25) for item_id in item_ids]  # Default weight 25 for any new items
-
-                        # Choose a random item based on weights
-                        chosen_item_id = random.choices(item_ids, weights=weights, k=1)[0]
-                        chosen_item = next(item for item in items if item['item_id'] == chosen_item_id)
-
-                        # Add the item to the user's inventory
-                        await conn.execute("""
-                            INSERT INTO user_inventory (user_id, item_id, quantity)
-                            VALUES ($1, $2, 1)
-                            ON CONFLICT (user_id, item_id)
-                            DO UPDATE SET quantity = user_inventory.quantity + 1
-                        """, winner.id, chosen_item_id)
-
-                        # Get rarity text based on weight
-                        weight = item_weights.get(chosen_item_id, 25)
-                        if weight <= 10:
-                            rarity_text = "🌟 VERY RARE 🌟"
-                        elif weight <= 20:
-                            rarity_text = "✨ RARE ✨"
-                        elif weight <= 30:
-                            rarity_text = "🔹 UNCOMMON 🔹"
-                        else:
-                            rarity_text = "COMMON"
-
-                        await message.channel.send(
-                            f"🎉 Correct, {winner.mention}! The answer was **{correct_answer}**. "
-                            f"You won a **{chosen_item['name']}** ({rarity_text}) and **{coin_reward} PP coins**! 💰"
-                        )
+                    await conn.execute("""
+                        INSERT INTO user_inventory (user_id, item_id, quantity)
+                        VALUES ($1, $2, 1)
+                        ON CONFLICT (user_id, item_id)
+                        DO UPDATE SET quantity = user_inventory.quantity + 1
+                    """, winner.id, chosen_item['item_id'])
+
+                rarity_text = rarity_label(chosen_item['drop_weight'])
+                await message.channel.send(
+                    f"🎉 Correct, {winner.mention}! The answer was **{correct_answer}**. "
+                    f"You won a **{chosen_item['name']}** ({rarity_text}) and **{coin_reward} PP coins**! 💰"
+                )
             except Exception as e:
                 print(f"Error giving trivia reward: {e}")
                 # Send a simplified message if reward fails
@@ -1164,6 +947,7 @@ class PPMinigames(commands.Cog):
                 "Try again next time!",
                 delete_after=10
             )
+        return True
 
 async def setup(bot):
     await bot.add_cog(PPMinigames(bot))
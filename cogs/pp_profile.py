@@ -1,43 +1,20 @@
 import discord
 from discord.ext import commands
-import asyncpg
-import os
 from datetime import datetime, timezone
+from user_cache import MISSING
 
 ACHIEVEMENT_CHANNEL_ID = 934181022659129444 # Your achievement announcement channel
 
 class PPProfile(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.db_pool = None
-
-    async def cog_load(self):
-        print("Attempting to connect to the database from PPProfile...")
-        try:
-            self.db_pool = await asyncpg.create_pool(dsn=os.getenv('DATABASE_URL'))
-            print("✅ PPProfile Database pool created successfully.")
-        except Exception as e:
-            print(f"❌ Failed to connect to PPProfile database: {e}")
-
-    async def cog_unload(self):
-        if self.db_pool:
-            await self.db_pool.close()
-            print("PPProfile Database pool closed.")
 
     async def _get_db(self):
-        if not self.db_pool:
-             # Attempt to reconnect or use the main bot pool if available
-            if hasattr(self.bot, 'db_pool') and self.bot.db_pool:
-                self.db_pool = self.bot.db_pool
-            else:
-                try: # Last resort: create a new pool just for this cog
-                    print("PPProfile trying fallback DB connection...")
-                    self.db_pool = await asyncpg.create_pool(dsn=os.getenv('DATABASE_URL'))
-                    print("✅ PPProfile Fallback DB pool created.")
-                except Exception as e:
-                    print(f"❌ PPProfile Fallback DB connection failed: {e}")
-                    raise ConnectionError("Database pool is not initialized in PPProfile.")
-        return self.db_pool
+        """Get database pool from PPDB cog"""
+        db_cog = self.bot.get_cog('PPDB')
+        if not db_cog:
+            raise RuntimeError("PPDB cog not loaded!")
+        return await db_cog.get_db()
 
     @commands.command(name='coins', aliases=['balance', 'bal'], help='Check your PP coin balance.')
     async def coins(self, ctx, member: discord.Member = None):
@@ -48,10 +25,15 @@ class PPProfile(commands.Cog):
         user_id = member.id
         db = await self._get_db()
 
-        async with db.acquire() as conn:
-            coins_record = await conn.fetchrow("SELECT pp_coins FROM user_data WHERE user_id = $1", user_id)
-
-        pp_coins = coins_record['pp_coins'] if coins_record else 0
+        pp_coins = db.users.get(user_id, 'coins')
+        if pp_coins is MISSING:
+            token = db.users.token()
+            async with db.acquire() as conn:
+                coins_record = await db.counters.fetch_merged( # Include unflushed increments
+                    'user_data', user_id, lambda: db.statements.fetchrow(conn, 'coins', user_id)
+                )
+            pp_coins = coins_record['pp_coins'] if coins_record else 0
+            db.users.fill(user_id, 'coins', pp_coins, token)
 
         if member == ctx.author:
             await ctx.send(f"💰 You have **{pp_coins} PP coins**!")
@@ -66,31 +48,48 @@ class PPProfile(commands.Cog):
         user_id = member.id
         db = await self._get_db()
 
-        async with db.acquire() as conn:
-            # Fetch PP Size
-            pp_record = await conn.fetchrow("SELECT size, last_roll_timestamp FROM pp_sizes WHERE user_id = $1", user_id)
-            # Fetch Stats
-            stats_record = await conn.fetchrow("SELECT * FROM user_stats WHERE user_id = $1", user_id)
-            # Fetch PP Coins
-            coins_record = await conn.fetchrow("SELECT pp_coins FROM user_data WHERE user_id = $1", user_id)
-            # Fetch Achievements
-            achievements_earned = await conn.fetch("""
-                SELECT a.name, a.description FROM user_achievements ua
-                JOIN achievements a ON ua.achievement_id = a.achievement_id
-                WHERE ua.user_id = $1 ORDER BY ua.earned_at
-            """, user_id)
+        # Serve what we can from the user cache and only query for the rest
+        pp_record = db.users.get(user_id, 'pp_size')
+        stats_record = db.users.get(user_id, 'stats')
+        pp_coins = db.users.get(user_id, 'coins')
+        achievements_earned = db.users.get(user_id, 'achievements')
+
+        if MISSING in (pp_record, stats_record, pp_coins, achievements_earned):
+            token = db.users.token()
+            async with db.acquire() as conn:
+                if pp_record is MISSING:
+                    # Fetch PP Size
+                    record = await db.statements.fetchrow(conn, 'pp_size', user_id)
+                    pp_record = (record['size'], record['last_roll_timestamp']) if record else None
+                    db.users.fill(user_id, 'pp_size', pp_record, token)
+                if stats_record is MISSING:
+                    # Fetch Stats (including counter increments that haven't been flushed yet)
+                    stats_record = await db.counters.fetch_merged(
+                        'user_stats', user_id, lambda: db.statements.fetchrow(conn, 'user_stats', user_id)
+                    )
+                    db.users.fill(user_id, 'stats', stats_record, token)
+                if pp_coins is MISSING:
+                    # Fetch PP Coins
+                    record = await db.counters.fetch_merged(
+                        'user_data', user_id, lambda: db.statements.fetchrow(conn, 'coins', user_id)
+                    )
+                    pp_coins = record['pp_coins'] if record else 0
+                    db.users.fill(user_id, 'coins', pp_coins, token)
+                if achievements_earned is MISSING:
+                    # Fetch Achievements
+                    records = await db.statements.fetch(conn, 'earned_achievements', user_id)
+                    achievements_earned = [(record['name'], record['description']) for record in records]
+                    db.users.fill(user_id, 'achievements', achievements_earned, token)
 
         embed = discord.Embed(title=f"{member.display_name}'s Profile", color=member.color)
         embed.set_thumbnail(url=member.display_avatar.url)
 
         # PP Coins
-        pp_coins = coins_record['pp_coins'] if coins_record else 0
         embed.add_field(name="💰 PP Coins", value=f"{pp_coins}", inline=True)
 
         # PP Info
         if pp_record:
-            pp_size = pp_record['size']
-            last_roll = pp_record['last_roll_timestamp']
+            pp_size, last_roll = pp_record
             embed.add_field(name="Current PP Size", value=f"{pp_size} inches", inline=True)
             if last_roll:
                  embed.add_field(name="Last Measured", value=discord.utils.format_dt(last_roll, style='R'), inline=True)
@@ -113,109 +112,123 @@ class PPProfile(commands.Cog):
 
         # Achievements Info
         if achievements_earned:
-            ach_text = "\n".join([f"- **{ach['name']}**: {ach['description']}" for ach in achievements_earned])
+            ach_text = "\n".join([f"- **{name}**: {description}" for name, description in achievements_earned])
             embed.add_field(name="Achievements", value=ach_text if ach_text else "None", inline=False)
         else:
             embed.add_field(name="Achievements", value="None", inline=False)
 
         await ctx.send(embed=embed)
 
+    async def _record_achievement(self, user_id: int, achievement_id: str):
+        """Marks an achievement as earned. Returns its details if this is a new grant, None if not."""
+        db = await self._get_db()
+        catalog = db.achievements
+        if not catalog.get(achievement_id):
+            # Might have been added since startup
+            async with db.acquire() as conn:
+                await catalog.load(conn)
+        achievement_info = catalog.get(achievement_id)
+        if not achievement_info:
+            print(f"Grant Achievement Error: Achievement ID '{achievement_id}' not found in database.")
+            return None
+
+        # Check the user's earned set first; most grant attempts stop here without a query
+        earned = db.users.get(user_id, 'earned')
+        if earned is MISSING:
+            token = db.users.token()
+            async with db.acquire() as conn:
+                rows = await conn.fetch("SELECT achievement_id FROM user_achievements WHERE user_id = $1", user_id)
+            earned = catalog.mask(row['achievement_id'] for row in rows)
+            db.users.fill(user_id, 'earned', earned, token)
+        bit = catalog.bit(achievement_id)
+        if earned & bit:
+            return None # Already has it
+
+        async with db.acquire() as conn:
+            granted = await conn.fetchval("""
+                INSERT INTO user_achievements (user_id, achievement_id) VALUES ($1, $2)
+                ON CONFLICT (user_id, achievement_id) DO NOTHING
+                RETURNING TRUE
+            """, user_id, achievement_id)
+        db.users.update(user_id, 'earned', lambda mask: mask | bit)
+        if not granted:
+            return None # Earned in the meantime
+
+        db.users.append(user_id, 'achievements', (achievement_info['name'], achievement_info['description']))
+        return achievement_info
+
     async def _grant_achievement(self, user: discord.Member, achievement_id: str, ctx: commands.Context):
         """Grants an achievement if not already earned, updates DB, announces, and gives role."""
-        db = await self._get_db()
         guild = user.guild
-        
-        async with db.acquire() as conn:
-            async with conn.transaction():
-                # Check if already earned
-                already_earned = await conn.fetchval("SELECT 1 FROM user_achievements WHERE user_id = $1 AND achievement_id = $2", user.id, achievement_id)
-                if already_earned:
-                    return # Already has it
-
-                # Get achievement details (including potential role reward)
-                achievement_info = await conn.fetchrow("SELECT name, description, reward_role_name FROM achievements WHERE achievement_id = $1", achievement_id)
-                if not achievement_info:
-                    print(f"Grant Achievement Error: Achievement ID '{achievement_id}' not found in database.")
-                    return
-
-                # Add to user_achievements
-                await conn.execute("INSERT INTO user_achievements (user_id, achievement_id) VALUES ($1, $2)", user.id, achievement_id)
-                print(f"[Achievement] Granted '{achievement_id}' to {user.name} ({user.id})")
-
-                # Announce in channel
-                announce_channel = self.bot.get_channel(ACHIEVEMENT_CHANNEL_ID)
-                if announce_channel:
+
+        achievement_info = await self._record_achievement(user.id, achievement_id)
+        if not achievement_info:
+            return # Already has it (or it doesn't exist)
+        print(f"[Achievement] Granted '{achievement_id}' to {user.name} ({user.id})")
+
+        # Announce in channel
+        announce_channel = self.bot.get_channel(ACHIEVEMENT_CHANNEL_ID)
+        if announce_channel:
+            try:
+                await announce_channel.send(f"🏆 Achievement Unlocked! {user.mention} earned **{achievement_info['name']}**! ({achievement_info['description']}) 🏆")
+            except discord.Forbidden:
+                print(f"Grant Achievement Error: Missing permissions to send to channel {ACHIEVEMENT_CHANNEL_ID}.")
+            except discord.HTTPException as e:
+                print(f"Grant Achievement Error: Failed to send announcement: {e}")
+        else:
+            print(f"Grant Achievement Error: Announcement channel {ACHIEVEMENT_CHANNEL_ID} not found.")
+
+        # Grant role reward if specified
+        role_name = achievement_info['reward_role_name']
+        if role_name:
+            role = discord.utils.get(guild.roles, name=role_name)
+            if role:
+                if role not in user.roles:
                     try:
-                        await announce_channel.send(f"🏆 Achievement Unlocked! {user.mention} earned **{achievement_info['name']}**! ({achievement_info['description']}) 🏆")
+                        await user.add_roles(role, reason=f"Achievement unlocked: {achievement_info['name']}")
+                        print(f"[Achievement] Granted role '{role.name}' to {user.name}")
                     except discord.Forbidden:
-                        print(f"Grant Achievement Error: Missing permissions to send to channel {ACHIEVEMENT_CHANNEL_ID}.")
+                        print(f"Grant Achievement Error: Bot lacks permission to add role '{role.name}' to {user.name}.")
+                        if ctx: await ctx.send(f"(Couldn't grant the '{role.name}' role reward due to permissions.)", delete_after=15)
                     except discord.HTTPException as e:
-                        print(f"Grant Achievement Error: Failed to send announcement: {e}")
+                        print(f"Grant Achievement Error: Failed to add role '{role.name}': {e}")
                 else:
-                    print(f"Grant Achievement Error: Announcement channel {ACHIEVEMENT_CHANNEL_ID} not found.")
-
-                # Grant role reward if specified
-                role_name = achievement_info['reward_role_name']
-                if role_name:
-                    role = discord.utils.get(guild.roles, name=role_name)
-                    if role:
-                        if role not in user.roles:
-                            try:
-                                await user.add_roles(role, reason=f"Achievement unlocked: {achievement_info['name']}")
-                                print(f"[Achievement] Granted role '{role.name}' to {user.name}")
-                            except discord.Forbidden:
-                                print(f"Grant Achievement Error: Bot lacks permission to add role '{role.name}' to {user.name}.")
-                                if ctx: await ctx.send(f"(Couldn't grant the '{role.name}' role reward due to permissions.)", delete_after=15)
-                            except discord.HTTPException as e:
-                                print(f"Grant Achievement Error: Failed to add role '{role.name}': {e}")
-                        else:
-                            print(f"[Achievement] User {user.name} already has role '{role.name}'.")
-                    else:
-                        print(f"Grant Achievement Error: Role '{role_name}' not found in guild '{guild.name}'.")
-                        if ctx: await ctx.send(f"(Achievement role '{role_name}' not found.)", delete_after=15)
+                    print(f"[Achievement] User {user.name} already has role '{role.name}'.")
+            else:
+                print(f"Grant Achievement Error: Role '{role_name}' not found in guild '{guild.name}'.")
+                if ctx: await ctx.send(f"(Achievement role '{role_name}' not found.)", delete_after=15)
     
     async def _grant_achievement_no_ctx(self, user_id: int, achievement_id: str, announcement_channel: discord.TextChannel):
         """Grants an achievement without a command context (for tasks). Fetches user/guild info."""
-        db = await self._get_db()
         guild = announcement_channel.guild
         user = guild.get_member(user_id)
         if not user:
             print(f"Grant Achievement (NoCtx) Error: User {user_id} not found in guild {guild.name}.")
             return
-        
-        # Re-use the main logic, passing None for ctx where needed inside the function
-        async with db.acquire() as conn:
-            async with conn.transaction():
-                already_earned = await conn.fetchval("SELECT 1 FROM user_achievements WHERE user_id = $1 AND achievement_id = $2", user.id, achievement_id)
-                if already_earned:
-                    return
 
-                achievement_info = await conn.fetchrow("SELECT name, description, reward_role_name FROM achievements WHERE achievement_id = $1", achievement_id)
-                if not achievement_info:
-                    print(f"Grant Achievement (NoCtx) Error: Achievement ID '{achievement_id}' not found.")
-                    return
+        achievement_info = await self._record_achievement(user.id, achievement_id)
+        if not achievement_info:
+            return
+        print(f"[Achievement][NoCtx] Granted '{achievement_id}' to {user.name} ({user.id})")
 
-                await conn.execute("INSERT INTO user_achievements (user_id, achievement_id) VALUES ($1, $2)", user.id, achievement_id)
-                print(f"[Achievement][NoCtx] Granted '{achievement_id}' to {user.name} ({user.id})")
+        # Announce
+        try:
+            await announcement_channel.send(f"🏆 Achievement Unlocked! {user.mention} earned **{achievement_info['name']}**! ({achievement_info['description']}) 🏆")
+        except Exception as e:
+             print(f"Grant Achievement (NoCtx) Error: Failed to send announcement: {e}")
 
-                # Announce
+        # Grant role
+        role_name = achievement_info['reward_role_name']
+        if role_name:
+            role = discord.utils.get(guild.roles, name=role_name)
+            if role and role not in user.roles:
                 try:
-                    await announcement_channel.send(f"🏆 Achievement Unlocked! {user.mention} earned **{achievement_info['name']}**! ({achievement_info['description']}) 🏆")
+                    await user.add_roles(role, reason=f"Achievement unlocked (Task): {achievement_info['name']}")
+                    print(f"[Achievement][NoCtx] Granted role '{role.name}' to {user.name}")
                 except Exception as e:
-                     print(f"Grant Achievement (NoCtx) Error: Failed to send announcement: {e}")
-
-                # Grant role
-                role_name = achievement_info['reward_role_name']
-                if role_name:
-                    role = discord.utils.get(guild.roles, name=role_name)
-                    if role and role not in user.roles:
-                        try:
-                            await user.add_roles(role, reason=f"Achievement unlocked (Task): {achievement_info['name']}")
-                            print(f"[Achievement][NoCtx] Granted role '{role.name}' to {user.name}")
-                        except Exception as e:
-                            print(f"Grant Achievement (NoCtx) Error: Failed to add role '{role.name}': {e}")
-                    elif not role:
-                         print(f"Grant Achievement (NoCtx) Error: Role '{role_name}' not found.")
+                    print(f"Grant Achievement (NoCtx) Error: Failed to add role '{role.name}': {e}")
+            elif not role:
+                 print(f"Grant Achievement (NoCtx) Error: Role '{role_name}' not found.")
 
 async def setup(bot):
     await bot.add_cog(PPProfile(bot))
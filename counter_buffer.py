@@ -0,0 +1,272 @@
+import os
+import asyncio
+
+# Counter columns that may be incremented through the buffer, per table (all keyed by user_id)
+COUNTER_COLUMNS = {
+    'user_stats': ('total_rolls', 'zero_rolls', 'twenty_rolls', 'duel_wins', 'trivia_wins', 'days_as_hog_daddy'),
+    'user_data': ('pp_coins',),
+}
+
+# --- Write-Behind Settings (override with environment variables) ---
+WRITE_BEHIND_INTERVAL_MS = int(os.getenv("WRITE_BEHIND_INTERVAL_MS", "0"))  # 0 = write every increment immediately
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "500"))  # Flush early once this many rows are pending
+# --- End Write-Behind Settings ---
+
+
+class CounterBuffer:
+    """Adds up user_stats/user_data increments in memory and flushes them as one batched upsert per table.
+
+    When disabled (interval 0) every add() is written straight through, so callers
+    don't need to care which mode is active. Reads must go through fetch_merged()/read()
+    to see increments that haven't been flushed yet.
+    """
+
+    def __init__(self, db, interval_ms=WRITE_BEHIND_INTERVAL_MS, max_pending=WRITE_BEHIND_MAX_PENDING):
+        self.db = db
+        self.interval = interval_ms / 1000
+        self.enabled = interval_ms > 0
+        self.max_pending = max_pending
+        self._pending = {table: {} for table in COUNTER_COLUMNS}  # table -> {user_id: {column: delta}}
+        self._writing = {}  # (table, user_id) -> _Writes, while any write of that user's deltas is running
+        self._readers = {}  # (table, user_id) -> fetch_merged() calls in progress for that user
+        self._write_starts = {}  # (table, user_id) -> writes started, only counted while the user has readers
+        self._flush_lock = asyncio.Lock()  # Only orders flushes among themselves
+        self._wake = asyncio.Event()
+        self._task = None
+
+        # Counters
+        self.increments = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+
+    def start(self):
+        if self.enabled and not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stops the flush loop and writes out anything still pending."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f" Write-behind flush failed (will retry): {e}")
+
+    def _check(self, table, columns):
+        allowed = COUNTER_COLUMNS.get(table)
+        if allowed is None:
+            raise ValueError(f"'{table}' has no buffered counters")
+        for column in columns:
+            if column not in allowed:
+                raise ValueError(f"'{column}' is not a buffered counter of '{table}'")
+
+    async def add(self, table, user_id, returning=(), **deltas):
+        """Increments a user's counters. Returns a dict of the new totals for the `returning` columns."""
+        self._check(table, list(deltas) + list(returning))
+        self.increments += 1
+
+        if not self.enabled:
+            totals = await self._write_through(table, user_id, deltas, returning)
+            self.db.users.add(table, user_id, deltas)
+            return totals
+        if returning:
+            return await self._add_returning(table, user_id, deltas, returning)
+
+        _add_deltas(self._pending[table], user_id, deltas)
+        self.db.users.add(table, user_id, deltas)
+        if self.pending_rows() >= self.max_pending:
+            self._wake.set()
+        return None
+
+    async def _add_returning(self, table, user_id, deltas, returning):
+        # Totals have to come from one atomic statement (a read plus merge can hand two
+        # concurrent increments the same total), so the user's pending deltas go with it
+        pending = self._pending[table].pop(user_id, {})
+        combined = dict(pending)
+        for column, delta in deltas.items():
+            combined[column] = combined.get(column, 0) + delta
+        batch = {user_id: combined}
+        self._begin_write(table, batch)
+        try:
+            totals = await self._write_through(table, user_id, combined, returning)
+        except Exception:
+            _add_deltas(self._pending[table], user_id, pending)
+            raise
+        finally:
+            self._end_write(table, batch)
+        self.db.users.add(table, user_id, deltas)
+        return totals
+
+    def _begin_write(self, table, users):
+        """Marks {user_id: deltas} as being written, for pending() and fetch_merged()."""
+        for user_id, deltas in users.items():
+            key = (table, user_id)
+            writes = self._writing.get(key)
+            if writes is None:
+                writes = self._writing[key] = _Writes()
+            writes.count += 1
+            for column, delta in deltas.items():
+                writes.deltas[column] = writes.deltas.get(column, 0) + delta
+            if key in self._write_starts:
+                self._write_starts[key] += 1
+
+    def _end_write(self, table, users):
+        """Unmarks a write started by _begin_write(), once it has committed or failed."""
+        for user_id, deltas in users.items():
+            key = (table, user_id)
+            writes = self._writing[key]
+            writes.count -= 1
+            if not writes.count:
+                del self._writing[key]
+                writes.done.set()
+                continue
+            for column, delta in deltas.items():
+                writes.deltas[column] -= delta
+
+    async def _write_through(self, table, user_id, deltas, returning):
+        columns = list(deltas)
+        placeholders = ", ".join(f"${i}" for i in range(2, len(columns) + 2))
+        updates = ", ".join(f"{column} = t.{column} + EXCLUDED.{column}" for column in columns)
+        sql = f"""
+            INSERT INTO {table} AS t (user_id, {", ".join(columns)}) VALUES ($1, {placeholders})
+            ON CONFLICT (user_id) DO UPDATE SET {updates}
+        """
+        if returning:
+            sql += f" RETURNING {', '.join('t.' + column for column in returning)}"
+
+        async with self.db.acquire() as conn:
+            row = await conn.fetchrow(sql, user_id, *deltas.values())
+        return dict(row) if returning and row else None
+
+    def pending(self, table, user_id):
+        """Returns the unflushed deltas for a user ({} if none)."""
+        writes = self._writing.get((table, user_id))
+        deltas = dict(writes.deltas) if writes else {}
+        for column, delta in self._pending[table].get(user_id, {}).items():
+            deltas[column] = deltas.get(column, 0) + delta
+        return deltas
+
+    def pending_rows(self):
+        return sum(len(users) for users in self._pending.values())
+
+    def merge(self, table, user_id, row):
+        """Returns a DB row as a dict with the user's unflushed deltas added (None if neither exists).
+
+        Only exact for a row read while nothing was being flushed; use fetch_merged().
+        """
+        deltas = self.pending(table, user_id)
+        if row is None and not deltas:
+            return None
+        merged = dict(row) if row is not None else {column: 0 for column in COUNTER_COLUMNS[table]}
+        for column, delta in deltas.items():
+            merged[column] = (merged.get(column) or 0) + delta
+        return merged
+
+    async def fetch_merged(self, table, user_id, fetch):
+        """Awaits fetch() for a user's row and returns it merged with their unflushed deltas.
+
+        A row read while one of the user's writes commits may or may not include
+        it, so the read waits for that user's writes (only) and is repeated if
+        one started while it ran.
+        """
+        key = (table, user_id)
+        while True:
+            writes = self._writing.get(key)
+            if writes:
+                await writes.done.wait()
+                continue
+
+            self._readers[key] = self._readers.get(key, 0) + 1
+            started = self._write_starts.setdefault(key, 0)
+            try:
+                row = await fetch()
+            finally:
+                overlapped = self._write_starts[key] != started
+                self._readers[key] -= 1
+                if not self._readers[key]:
+                    del self._readers[key], self._write_starts[key]
+            if not overlapped:
+                return self.merge(table, user_id, row)
+
+    async def read(self, table, user_id, *columns):
+        """Reads counters from the DB with unflushed deltas added."""
+        self._check(table, columns)
+        sql = f"SELECT {', '.join(columns)} FROM {table} WHERE user_id = $1"
+        async with self.db.acquire() as conn:
+            merged = await self.fetch_merged(table, user_id, lambda: conn.fetchrow(sql, user_id)) or {}
+        return {column: merged.get(column) or 0 for column in columns}
+
+    async def flush(self):
+        """Writes all pending deltas: one UNNEST upsert per table."""
+        async with self._flush_lock:
+            if not any(self._pending.values()):
+                return
+            for table, columns in COUNTER_COLUMNS.items():
+                users = self._pending[table]
+                if not users:
+                    continue
+                self._pending[table] = {}
+                self._begin_write(table, users)
+
+                user_ids = list(users)
+                arrays = [[users[user_id].get(column, 0) for user_id in user_ids] for column in columns]
+                unnest_args = ", ".join(f"${i}::INTEGER[]" for i in range(2, len(columns) + 2))
+                updates = ", ".join(f"{column} = t.{column} + EXCLUDED.{column}" for column in columns)
+                try:
+                    async with self.db.acquire() as conn:
+                        await conn.execute(f"""
+                            INSERT INTO {table} AS t (user_id, {", ".join(columns)})
+                            SELECT * FROM UNNEST($1::BIGINT[], {unnest_args})
+                            ON CONFLICT (user_id) DO UPDATE SET {updates}
+                        """, user_ids, *arrays)
+                except Exception:
+                    # Put the deltas back so the next flush retries them
+                    for user_id, deltas in users.items():
+                        _add_deltas(self._pending[table], user_id, deltas)
+                    raise
+                finally:
+                    # Committed (or requeued): from here the DB row and pending() agree again
+                    self._end_write(table, users)
+
+                self.flushes += 1
+                self.rows_flushed += len(user_ids)
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'interval_ms': int(self.interval * 1000),
+            'pending_rows': self.pending_rows(),
+            'increments': self.increments,
+            'flushes': self.flushes,
+            'rows_flushed': self.rows_flushed,
+        }
+
+
+class _Writes:
+    """The writes of one user's deltas to one table that haven't finished yet."""
+    __slots__ = ('count', 'deltas', 'done')
+
+    def __init__(self):
+        self.count = 0
+        self.deltas = {}  # {column: delta}, summed over the running writes
+        self.done = asyncio.Event()  # Set once the last of them finishes
+
+
+def _add_deltas(pending, user_id, deltas):
+    user_pending = pending.setdefault(user_id, {})
+    for column, delta in deltas.items():
+        user_pending[column] = user_pending.get(column, 0) + delta
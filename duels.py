@@ -0,0 +1,77 @@
+class DuelChallenge:
+    """One open duel challenge. challenge_id is the id of the message that issued it."""
+    __slots__ = ('challenge_id', 'challenger_id', 'challenged_id', 'deadline', 'timer')
+
+    def __init__(self, challenge_id, challenger_id, challenged_id, deadline):
+        self.challenge_id = challenge_id
+        self.challenger_id = challenger_id
+        self.challenged_id = challenged_id
+        self.deadline = deadline  # Aware datetime
+        self.timer = None  # The scheduler's expiry for this challenge, cancelled when it's removed
+
+
+class DuelRegistry:
+    """Open duel challenges indexed both ways, so every lookup is a dict access.
+
+    A user can have any number of challenges out and any number waiting for
+    them, but only one per pair of users (in either direction).
+    """
+
+    def __init__(self):
+        self._sent = {}  # challenger_id -> {challenged_id: DuelChallenge}
+        self._received = {}  # challenged_id -> {challenger_id: DuelChallenge}
+        self._count = 0
+
+    def add(self, challenge):
+        """Registers a challenge. Returns the challenge already open between the two users instead, if any."""
+        existing = self.between(challenge.challenger_id, challenge.challenged_id)
+        if existing:
+            return existing
+        self._sent.setdefault(challenge.challenger_id, {})[challenge.challenged_id] = challenge
+        self._received.setdefault(challenge.challenged_id, {})[challenge.challenger_id] = challenge
+        self._count += 1
+        return None
+
+    def get(self, challenger_id, challenged_id):
+        """The challenge challenger_id sent to challenged_id, or None."""
+        return self._sent.get(challenger_id, {}).get(challenged_id)
+
+    def between(self, user_id, other_id):
+        """The open challenge between two users, whichever of them sent it."""
+        return self.get(user_id, other_id) or self.get(other_id, user_id)
+
+    def remove(self, challenge):
+        """Removes a challenge and cancels its expiry. Returns False if it was already gone."""
+        if self.get(challenge.challenger_id, challenge.challenged_id) is not challenge:
+            return False
+        if challenge.timer:
+            challenge.timer.cancel()
+        _remove(self._sent, challenge.challenger_id, challenge.challenged_id)
+        _remove(self._received, challenge.challenged_id, challenge.challenger_id)
+        self._count -= 1
+        return True
+
+    def sent_by(self, user_id):
+        """Challenges user_id has sent: [DuelChallenge]."""
+        return list(self._sent.get(user_id, {}).values())
+
+    def received_by(self, user_id):
+        """Challenges waiting for user_id to accept: [DuelChallenge]."""
+        return list(self._received.get(user_id, {}).values())
+
+    def involves(self, user_id):
+        return user_id in self._sent or user_id in self._received
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for challenges in self._sent.values():
+            yield from challenges.values()
+
+
+def _remove(index, user_id, other_id):
+    challenges = index[user_id]
+    del challenges[other_id]
+    if not challenges:
+        del index[user_id]
@@ -0,0 +1,26 @@
+# PP coin payouts and blackjack house rules, shared by the bot and simulate.py
+
+COINS_PER_INCH = 1  # pls pp awards the roll size in coins
+GAME_WIN_COINS = 10  # Word scramble, higher/lower and math rush wins
+TRIVIA_WIN_COINS = 10
+
+# --- Blackjack ---
+DEALER_STANDS_ON = 17  # Dealer draws until reaching this total
+BLACKJACK_WIN_MULTIPLIER = 2  # Regular win returns bet * 2 (the bet is taken up front)
+BLACKJACK_NATURAL_MULTIPLIER = 2.5  # A natural 21 returns bet * 2.5 unless the dealer also has 21
+
+
+def roll_coins(final_size):
+    """Coins awarded for a pls pp roll of final_size inches."""
+    return final_size * COINS_PER_INCH
+
+
+def blackjack_winnings(result, bet):
+    """Coins returned to the player for a finished hand (the bet was already deducted)."""
+    if result == "win":
+        return bet * BLACKJACK_WIN_MULTIPLIER
+    if result == "blackjack":
+        return int(bet * BLACKJACK_NATURAL_MULTIPLIER)
+    if result == "push":
+        return bet
+    return 0  # lose / bust
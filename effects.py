@@ -0,0 +1,141 @@
+import os
+import heapq
+import asyncio
+from datetime import datetime, timezone
+
+# --- Effects Settings (override with environment variables) ---
+EFFECT_SWEEP_SECONDS = float(os.getenv("EFFECT_SWEEP_SECONDS", "60"))  # How often expired rows are deleted
+# --- End Effects Settings ---
+
+ROLL_EFFECTS = ('pp_boost',)  # Effect types whose value is added to a user's pp roll
+
+
+def _utc(moment):
+    # user_active_effects.end_time is a plain TIMESTAMP holding UTC
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+
+class EffectsEngine:
+    """Active item effects mirrored in memory, so rolls don't query user_active_effects.
+
+    Effects are written through to the table and kept in a per-user dict; a
+    min-heap of expiry times lets the background sweep drop expired effects
+    from memory and delete their rows in one statement, instead of leaving
+    them in the table forever.
+    """
+
+    def __init__(self, db, sweep_seconds=EFFECT_SWEEP_SECONDS):
+        self.db = db
+        self.sweep_seconds = sweep_seconds
+        self._effects = {}  # user_id -> {effect_type: (effect_value, end_time)}
+        self._heap = []  # (end_time, user_id, effect_type); stale entries are skipped when popped
+        self._task = None
+        self._needs_delete = True  # The first sweep clears rows left over from before startup
+
+        # Counters
+        self.sweeps = 0
+        self.rows_deleted = 0
+
+    async def load(self, conn):
+        """Loads every effect that hasn't expired yet."""
+        rows = await conn.fetch(
+            "SELECT user_id, effect_type, effect_value, end_time FROM user_active_effects WHERE end_time > $1",
+            datetime.now(timezone.utc).replace(tzinfo=None)
+        )
+        self._effects = {}
+        self._heap = []
+        for row in rows:
+            self._remember(row['user_id'], row['effect_type'], row['effect_value'], _utc(row['end_time']))
+        print(f" Loaded {len(rows)} active effect(s).")
+
+    def start(self):
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _remember(self, user_id, effect_type, effect_value, end_time):
+        self._effects.setdefault(user_id, {})[effect_type] = (effect_value, end_time)
+        heapq.heappush(self._heap, (end_time, user_id, effect_type))
+
+    async def apply(self, user_id, effect_type, effect_value, end_time):
+        """Adds or replaces an effect for a user (writes through to user_active_effects)."""
+        end_time = _utc(end_time)
+        async with self.db.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO user_active_effects (user_id, effect_type, effect_value, end_time)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT (user_id, effect_type)
+                DO UPDATE SET effect_value = EXCLUDED.effect_value, end_time = EXCLUDED.end_time
+            """, user_id, effect_type, effect_value, end_time.replace(tzinfo=None))
+        self._remember(user_id, effect_type, effect_value, end_time)
+
+    def get(self, user_id, effect_type, now=None):
+        """Returns the value of a user's active effect, or None if they don't have it (or it expired)."""
+        effect = self._effects.get(user_id, {}).get(effect_type)
+        if effect and effect[1] > (now or datetime.now(timezone.utc)):
+            return effect[0]
+        return None
+
+    def roll_modifier(self, user_id, now=None):
+        """Total of the user's active effects that change a pp roll."""
+        now = now or datetime.now(timezone.utc)
+        return sum(self.get(user_id, effect_type, now) or 0 for effect_type in ROLL_EFFECTS)
+
+    def roll_modifiers(self, user_ids, now=None):
+        """roll_modifier for several users at once: {user_id: modifier}."""
+        now = now or datetime.now(timezone.utc)
+        return {user_id: self.roll_modifier(user_id, now) for user_id in user_ids}
+
+    def active_count(self):
+        return sum(len(effects) for effects in self._effects.values())
+
+    def _expire(self, now):
+        """Drops expired effects from memory. Returns how many were dropped."""
+        expired = 0
+        while self._heap and self._heap[0][0] <= now:
+            end_time, user_id, effect_type = heapq.heappop(self._heap)
+            effects = self._effects.get(user_id)
+            if not effects or effects.get(effect_type, (None, None))[1] != end_time:
+                continue # Replaced by a newer application of the same effect
+            del effects[effect_type]
+            if not effects:
+                del self._effects[user_id]
+            expired += 1
+        return expired
+
+    async def sweep(self):
+        """Forgets expired effects and deletes every expired row in one statement."""
+        now = datetime.now(timezone.utc)
+        if self._expire(now):
+            self._needs_delete = True
+        if not self._needs_delete:
+            return # Nothing expired since the last sweep
+        async with self.db.acquire() as conn:
+            result = await conn.execute("DELETE FROM user_active_effects WHERE end_time <= $1", now.replace(tzinfo=None))
+        self._needs_delete = False
+        self.sweeps += 1
+        self.rows_deleted += int(result.split()[-1])
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f" Expired effect sweep failed (will retry): {e}")
+            await asyncio.sleep(self.sweep_seconds)
+
+    def stats(self):
+        return {
+            'active': self.active_count(),
+            'heap': len(self._heap),
+            'sweeps': self.sweeps,
+            'rows_deleted': self.rows_deleted,
+        }
@@ -0,0 +1,138 @@
+import random
+import asyncio
+import asyncpg
+
+ITEMS_CHANGED_CHANNEL = "items_changed"  # NOTIFY channel fired by the items table trigger (migration 0005)
+
+
+def normalize_item_name(name):
+    """Loose lookup key: case-insensitive, whitespace collapsed ("  shrink  RAY " -> "shrink ray")."""
+    return " ".join(name.casefold().split())
+
+
+def rarity_label(weight):
+    """Display rarity for an item's drop weight (lower weight = rarer)."""
+    if weight <= 10:
+        return "🌟 VERY RARE 🌟"
+    elif weight <= 20:
+        return "✨ RARE ✨"
+    elif weight <= 30:
+        return "🔹 UNCOMMON 🔹"
+    return "COMMON"
+
+
+class AliasTable:
+    """Vose's alias method: O(n) to build, O(1) per weighted draw."""
+
+    def __init__(self, values, weights):
+        self.values = list(values)
+        n = len(self.values)
+        total = sum(weights)
+        self._prob = [1.0] * n
+        self._alias = list(range(n))
+
+        scaled = [weight * n / total for weight in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self._prob[less] = scaled[less]
+            self._alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left is 1.0 up to rounding error
+        for i in small + large:
+            self._prob[i] = 1.0
+
+    def draw(self, rng=random):
+        i = rng.randrange(len(self.values))
+        return self.values[i] if rng.random() < self._prob[i] else self.values[self._alias[i]]
+
+
+class ItemCatalog:
+    """Every item, loaded once and reloaded when the items table changes.
+
+    Looks items up by id, name or alias (matched loosely) and draws game
+    rewards from a precomputed alias table built from items.drop_weight, so
+    neither touches the database.
+    """
+
+    def __init__(self):
+        self.items = {}  # item_id -> item dict (a row of items)
+        self._by_name = {}  # normalized name or alias -> item dict
+        self._drops = None  # AliasTable over droppable items, None if there are none
+        self._db = None
+        self._listener = None  # Dedicated connection LISTENing for ITEMS_CHANGED_CHANNEL
+        self._reload_task = None
+        self._stale = False
+        self.loaded = False
+        self.reloads = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    async def load(self, conn):
+        """(Re)builds the catalog from the items table."""
+        rows = await conn.fetch("SELECT * FROM items ORDER BY item_id")
+        items = {row['item_id']: dict(row) for row in rows}
+
+        by_name = {}
+        for item in items.values():
+            for alias in item.get('aliases') or ():
+                by_name.setdefault(normalize_item_name(alias), item)
+        for item in items.values():
+            # Real names always win over another item's alias
+            by_name[normalize_item_name(item['name'])] = item
+
+        droppable = [item for item in items.values() if (item.get('drop_weight') or 0) > 0]
+        drops = AliasTable(droppable, [item['drop_weight'] for item in droppable]) if droppable else None
+
+        # Swap everything in at once so lookups never see a half-built catalog
+        self.items, self._by_name, self._drops = items, by_name, drops
+        self.loaded = True
+        self.reloads += 1
+        print(f" Loaded item catalog: {len(items)} item(s), {len(droppable)} droppable.")
+
+    async def listen(self, dsn, db):
+        """Reloads the catalog (through db's pool) whenever a NOTIFY arrives on ITEMS_CHANGED_CHANNEL."""
+        self._db = db
+        try:
+            self._listener = await asyncpg.connect(dsn)
+            await self._listener.add_listener(ITEMS_CHANGED_CHANNEL, self._on_notify)
+        except (OSError, asyncpg.PostgresError) as e:
+            print(f" Item catalog won't auto-refresh (LISTEN failed): {e}")
+            self._listener = None
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._stale = True
+        if not self._reload_task or self._reload_task.done():
+            self._reload_task = asyncio.create_task(self._reload())
+
+    async def _reload(self):
+        # Bulk edits fire one NOTIFY per statement; wait a moment so they coalesce into one reload
+        while self._stale:
+            await asyncio.sleep(0.5)
+            self._stale = False
+            try:
+                async with self._db.acquire() as conn:
+                    await self.load(conn)
+            except Exception as e:
+                print(f" Failed to reload item catalog: {e}")
+
+    async def close(self):
+        if self._reload_task:
+            self._reload_task.cancel()
+        if self._listener:
+            await self._listener.close()
+            self._listener = None
+
+    def get(self, item_id):
+        return self.items.get(item_id)
+
+    def by_name(self, name):
+        """Finds an item by name or alias, ignoring case and extra whitespace. None if unknown."""
+        return self._by_name.get(normalize_item_name(name))
+
+    def draw(self, rng=random):
+        """Picks a random droppable item by weight, or None if nothing can drop."""
+        return self._drops.draw(rng) if self._drops else None
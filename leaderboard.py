@@ -0,0 +1,266 @@
+import bisect
+from collections import OrderedDict
+
+
+class DailyLeaderTracker:
+    """Today's highest pp roll, kept in memory so rolls don't have to query for it.
+
+    pp_sizes holds each user's latest roll, and the leader is the highest size
+    with ties going to the earliest roll. Most rolls are decided in O(1); the
+    only cases that can't be (the leader re-rolling the same or lower, or being
+    shrunk) set needs_resync so the owner reloads the leader from the source.
+    """
+
+    def __init__(self):
+        self.day = None
+        self.user_id = None
+        self.size = None
+        self.timestamp = None
+        self.needs_resync = True  # Nothing loaded yet
+
+    def reset(self, day=None):
+        """Clears the leader (daily reset). Nobody has rolled yet on `day`."""
+        self.day = day
+        self.user_id = None
+        self.size = None
+        self.timestamp = None
+        self.needs_resync = False
+
+    def seed(self, day, user_id, size, timestamp):
+        """Sets the leader from a fresh query (startup or resync). user_id is None if nobody rolled today."""
+        self.reset(day)
+        if user_id is not None:
+            self.user_id = user_id
+            self.size = size
+            self.timestamp = timestamp
+
+    def observe(self, user_id, size, timestamp):
+        """Records a roll. Returns True if the roller is (still) today's leader as far as is known."""
+        day = timestamp.date()
+        if self.day is not None and day != self.day:
+            # First roll after midnight, before the reset task has run
+            self.reset(day)
+
+        if self.needs_resync:
+            return False
+
+        # Higher wins outright; an equal roll only wins if it happened earlier (rolls can be observed out of order)
+        if self.user_id is None or size > self.size or (size == self.size and timestamp < self.timestamp):
+            self.user_id = user_id
+            self.size = size
+            self.timestamp = timestamp
+            return True
+
+        if user_id == self.user_id:
+            # Same or lower re-roll by the leader: an earlier roll of equal size may now win
+            self.needs_resync = True
+            return False
+
+        # Lower, or tied but later: the existing leader keeps it
+        return False
+
+    def observe_shrink(self, user_id, new_size):
+        """Records an out-of-band size drop (e.g. a shrink ray)."""
+        if user_id == self.user_id and new_size < self.size:
+            self.needs_resync = True
+
+
+class BucketLeaderboard:
+    """Today's leaderboard (pp_sizes) held in memory for paging and rank lookups without queries.
+
+    Sizes only range 0-20, so users sit in one bucket per size, each bucket
+    sorted by roll time (earlier roll ranks higher on ties). A rank is the
+    size of the buckets above plus a bisect inside the user's own bucket.
+    """
+
+    def __init__(self, max_size=20):
+        self.max_size = max_size
+        self._buckets = [[] for _ in range(max_size + 1)]  # size -> sorted [(roll_key, user_id)]
+        self._entries = {}  # user_id -> (size, timestamp)
+        self.ready = False  # False until loaded from pp_sizes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, user_id):
+        return user_id in self._entries
+
+    @staticmethod
+    def _roll_key(timestamp):
+        # Rows that never recorded a roll time sort last, like NULLs in ORDER BY ... ASC
+        return timestamp.timestamp() if timestamp else float('inf')
+
+    def _clamp(self, size):
+        return max(0, min(self.max_size, size))
+
+    def clear(self):
+        """Empties the board (daily reset)."""
+        self._buckets = [[] for _ in range(self.max_size + 1)]
+        self._entries = {}
+        self.ready = True
+
+    def load(self, rows):
+        """Rebuilds the board from (user_id, size, last_roll_timestamp) rows."""
+        self.clear()
+        for user_id, size, timestamp in rows:
+            size = self._clamp(size or 0)
+            self._entries[user_id] = (size, timestamp)
+            self._buckets[size].append((self._roll_key(timestamp), user_id))
+        for bucket in self._buckets:
+            bucket.sort()
+
+    def _remove(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry:
+            size, timestamp = entry
+            bucket = self._buckets[size]
+            del bucket[bisect.bisect_left(bucket, (self._roll_key(timestamp), user_id))]
+        return entry
+
+    def update(self, user_id, size, timestamp):
+        """Records a user's latest roll."""
+        self._remove(user_id)
+        size = self._clamp(size)
+        self._entries[user_id] = (size, timestamp)
+        bisect.insort(self._buckets[size], (self._roll_key(timestamp), user_id))
+
+    def set_size(self, user_id, size):
+        """Changes a user's size without touching their roll time (e.g. a shrink ray)."""
+        entry = self._entries.get(user_id)
+        if entry:
+            self.update(user_id, size, entry[1])
+
+    def get(self, user_id):
+        """Returns (size, timestamp) for a user, or None if they haven't rolled today."""
+        return self._entries.get(user_id)
+
+    def count_above(self, size):
+        """How many users have a strictly larger size."""
+        return sum(len(bucket) for bucket in self._buckets[size + 1:])
+
+    def rank(self, user_id):
+        """Returns a user's 1-based rank, or None if they haven't rolled today."""
+        entry = self._entries.get(user_id)
+        if not entry:
+            return None
+        size, timestamp = entry
+        position = bisect.bisect_left(self._buckets[size], (self._roll_key(timestamp), user_id))
+        return self.count_above(size) + position + 1
+
+    def top(self):
+        """Returns the leader as (user_id, size, timestamp), or None if the board is empty."""
+        page = self.page(0, 1)
+        return page[0] if page else None
+
+    def page(self, offset, limit):
+        """Returns rows [offset, offset + limit) in rank order as (user_id, size, timestamp) tuples."""
+        rows = []
+        for size in range(self.max_size, -1, -1):
+            bucket = self._buckets[size]
+            if offset >= len(bucket):
+                offset -= len(bucket) # Skip whole buckets without touching their rows
+                continue
+            for _, user_id in bucket[offset:offset + limit - len(rows)]:
+                rows.append((user_id, size, self._entries[user_id][1]))
+            offset = 0
+            if len(rows) >= limit:
+                break
+        return rows
+
+
+# Keyset pagination over pp_sizes in leaderboard order. The sort key is written exactly as
+# idx_pp_sizes_rank_keyset indexes it, so both the ORDER BY and the row comparison below
+# are answered by one range scan of that index
+_PAGE_COLUMNS = "SELECT user_id, size, last_roll_timestamp FROM pp_sizes"
+_RANK_KEY = "(-size, COALESCE(last_roll_timestamp, 'infinity'::timestamptz), user_id)"
+_CURSOR = "($1, COALESCE($2::timestamptz, 'infinity'::timestamptz), $3)"
+_FORWARD_ORDER = "ORDER BY -size, COALESCE(last_roll_timestamp, 'infinity'::timestamptz), user_id"
+_BACKWARD_ORDER = "ORDER BY -size DESC, COALESCE(last_roll_timestamp, 'infinity'::timestamptz) DESC, user_id DESC"
+_AFTER = f"{_RANK_KEY} > {_CURSOR}"  # Rows ranked below the cursor row
+_BEFORE = f"{_RANK_KEY} < {_CURSOR}"  # Rows ranked above the cursor row
+
+
+def _keyset(condition, row, order, limit):
+    """Builds a keyset query from a cursor row (user_id, size, timestamp)."""
+    user_id, size, timestamp = row
+    return (f"{_PAGE_COLUMNS} WHERE {condition} {order} LIMIT $4", -size, timestamp, user_id, limit)
+
+
+class LeaderboardPages:
+    """Loads leaderboard pages on demand for one LeaderboardView.
+
+    Pages are sliced from the in-memory board when it's loaded, otherwise read
+    from pp_sizes with keyset pagination on the rank key (see idx_pp_sizes_rank_keyset):
+    the next/previous page starts after/before the current page's last/first
+    row, so any page costs one index range scan no matter how deep it is.
+    Only the last few pages viewed are kept, as tuples of (user_id, size, timestamp).
+    """
+
+    def __init__(self, board, db, page_size=10, cache_pages=4):
+        self.board = board
+        self.db = db
+        self.page_size = page_size
+        self.cache_pages = cache_pages
+        self.total = 0
+        self._pages = OrderedDict()  # page number -> tuple of rows, least recently used first
+
+    @property
+    def total_pages(self):
+        return max(1, (self.total + self.page_size - 1) // self.page_size)
+
+    async def refresh_total(self):
+        """Counts today's rolls (the board knows without a query). Returns the total."""
+        if self.board.ready:
+            self.total = len(self.board)
+        else:
+            async with self.db.acquire() as conn:
+                self.total = await conn.fetchval("SELECT COUNT(*) FROM pp_sizes")
+        return self.total
+
+    def peek(self, page):
+        """Returns a page's rows if they're available without a query, else None."""
+        if self.board.ready:
+            return self.board.page((page - 1) * self.page_size, self.page_size)
+        return self._pages.get(page)
+
+    async def get(self, page):
+        """Returns the rows of a 1-based page."""
+        if self.board.ready:
+            # The board is live and cheap to slice, no need to cache its pages
+            return self.board.page((page - 1) * self.page_size, self.page_size)
+
+        rows = self._pages.get(page)
+        if rows is not None:
+            self._pages.move_to_end(page)
+            return rows
+
+        rows = await self._fetch(page)
+
+        self._pages[page] = rows
+        if len(self._pages) > self.cache_pages:
+            self._pages.popitem(last=False)
+        return rows
+
+    async def _fetch(self, page):
+        async with self.db.acquire() as conn:
+            if page == 1:
+                records = await conn.fetch(f"{_PAGE_COLUMNS} {_FORWARD_ORDER} LIMIT $1", self.page_size)
+            elif self._pages.get(page - 1):
+                # Next page: everything after the previous page's last row
+                records = await conn.fetch(*_keyset(_AFTER, self._pages[page - 1][-1], _FORWARD_ORDER, self.page_size))
+            elif self._pages.get(page + 1):
+                # Previous page: walk backwards from the following page's first row
+                records = await conn.fetch(*_keyset(_BEFORE, self._pages[page + 1][0], _BACKWARD_ORDER, self.page_size))
+                records.reverse()
+            elif page == self.total_pages:
+                # Last page: the tail of the ranking, read backwards from the bottom
+                count = self.total - (page - 1) * self.page_size
+                records = await conn.fetch(f"{_PAGE_COLUMNS} {_BACKWARD_ORDER} LIMIT $1", count)
+                records.reverse()
+            else:
+                # No neighbouring page to start from (the buttons never get here)
+                records = await conn.fetch(
+                    f"{_PAGE_COLUMNS} {_FORWARD_ORDER} LIMIT $1 OFFSET $2",
+                    self.page_size, (page - 1) * self.page_size
+                )
+        return tuple((record['user_id'], record['size'], record['last_roll_timestamp']) for record in records)
@@ -0,0 +1,134 @@
+class Ledger:
+    """Coin and item balance changes as single conditional statements.
+
+    The balance check is in the UPDATE's WHERE clause, so two commands racing
+    for the same coins can't both pass it and no locks are needed. Buffered
+    coin increments for a user are flushed before a debit so the check sees
+    them. The user cache gets the change as a delta (so concurrent debits can
+    finish in any order); a declined debit only fills the cache if nothing
+    wrote the user's coins meanwhile.
+
+    A debit or credit can carry a game snapshot change (see SnapshotStore.writing),
+    so a bet and the game it pays for are committed together.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+        # Counters
+        self.debits = 0
+        self.declined = 0
+
+    async def _settle(self, *user_ids):
+        # Debits compare against the stored balance, so buffered winnings must be written first
+        if any(self.db.counters.pending('user_data', user_id) for user_id in user_ids):
+            await self.db.counters.flush()
+
+    def _declined(self, user_id, balance, token):
+        self.declined += 1
+        balance = balance or 0
+        self.db.users.fill(user_id, 'coins', balance, token)
+        return False, balance
+
+    async def debit_if_sufficient(self, user_id, amount, snapshot=None):
+        """Takes `amount` coins if the user has that many.
+
+        snapshot is an optional (kind, key, state) game snapshot, saved in the
+        same transaction only if the coins are taken.
+        Returns (True, new_balance) or (False, current_balance).
+        """
+        if amount <= 0:
+            raise ValueError("Debit amount must be positive")
+        await self._settle(user_id)
+        token = self.db.users.token()
+        async with self.db.snapshots.writing() as conn:
+            # The outer SELECT sees the balance from before the UPDATE, which is what a declined debit reports
+            row = await conn.fetchrow("""
+                WITH debit AS (
+                    UPDATE user_data SET pp_coins = pp_coins - $2
+                    WHERE user_id = $1 AND pp_coins >= $2
+                    RETURNING pp_coins
+                )
+                SELECT (SELECT pp_coins FROM debit) AS debited,
+                       (SELECT pp_coins FROM user_data WHERE user_id = $1) AS balance
+            """, user_id, amount)
+            if row['debited'] is not None and snapshot:
+                await self.db.snapshots.write(conn, *snapshot)
+
+        if row['debited'] is None:
+            return self._declined(user_id, row['balance'], token)
+        self.debits += 1
+        self.db.users.add('user_data', user_id, {'pp_coins': -amount})
+        return True, row['debited']
+
+    async def credit(self, user_id, amount, discard=None):
+        """Gives a user coins. Credits can't fail, so they go through the counter buffer like other increments.
+
+        With discard, a (kind, key) game snapshot, the coins are written straight
+        away in one transaction with the snapshot's deletion instead, so a
+        restart can't pay the same game twice.
+        """
+        if amount <= 0:
+            raise ValueError("Credit amount must be positive")
+        if not discard:
+            await self.db.counters.add('user_data', user_id, pp_coins=amount)
+            return
+        async with self.db.snapshots.writing() as conn:
+            await conn.execute("""
+                INSERT INTO user_data AS t (user_id, pp_coins) VALUES ($1, $2)
+                ON CONFLICT (user_id) DO UPDATE SET pp_coins = t.pp_coins + EXCLUDED.pp_coins
+            """, user_id, amount)
+            await self.db.snapshots.remove(conn, *discard)
+        self.db.users.add('user_data', user_id, {'pp_coins': amount})
+
+    async def transfer(self, from_user_id, to_user_id, amount):
+        """Moves coins between users in one statement, only if the sender has enough.
+
+        Returns (True, sender_new_balance) or (False, sender_current_balance).
+        """
+        if amount <= 0:
+            raise ValueError("Transfer amount must be positive")
+        if from_user_id == to_user_id:
+            raise ValueError("Can't transfer coins to the same user")
+        await self._settle(from_user_id, to_user_id)
+        token = self.db.users.token()
+        async with self.db.acquire() as conn:
+            row = await conn.fetchrow("""
+                WITH debit AS (
+                    UPDATE user_data SET pp_coins = pp_coins - $3
+                    WHERE user_id = $1 AND pp_coins >= $3
+                    RETURNING pp_coins
+                ), credit AS (  -- Inserts nothing when the debit didn't happen
+                    INSERT INTO user_data AS t (user_id, pp_coins)
+                    SELECT $2, $3 FROM debit
+                    ON CONFLICT (user_id) DO UPDATE SET pp_coins = t.pp_coins + EXCLUDED.pp_coins
+                )
+                SELECT (SELECT pp_coins FROM debit) AS debited,
+                       (SELECT pp_coins FROM user_data WHERE user_id = $1) AS balance
+            """, from_user_id, to_user_id, amount)
+
+        if row['debited'] is None:
+            return self._declined(from_user_id, row['balance'], token)
+        self.debits += 1
+        self.db.users.add('user_data', from_user_id, {'pp_coins': -amount})
+        self.db.users.add('user_data', to_user_id, {'pp_coins': amount})
+        return True, row['debited']
+
+    async def consume_item_if_available(self, user_id, item_id, quantity=1):
+        """Takes `quantity` of an item from a user's inventory if they have that many. Returns True if taken."""
+        async with self.db.acquire() as conn:
+            remaining = await conn.fetchval("""
+                UPDATE user_inventory SET quantity = quantity - $3
+                WHERE user_id = $1 AND item_id = $2 AND quantity >= $3
+                RETURNING quantity
+            """, user_id, item_id, quantity)
+            if remaining == 0:
+                # Inventory reads skip empty stacks; this just keeps them from piling up (unless one was re-added)
+                await conn.execute(
+                    "DELETE FROM user_inventory WHERE user_id = $1 AND item_id = $2 AND quantity = 0",
+                    user_id, item_id
+                )
+        return remaining is not None
+
+    def stats(self):
+        return {'debits': self.debits, 'declined': self.declined}
@@ -0,0 +1,70 @@
+import time
+import asyncio
+import discord
+
+NEGATIVE_TTL_SECONDS = 600  # How long to remember that a user isn't in the guild anymore
+QUERY_BATCH_SIZE = 100  # Discord's limit for one gateway member request
+
+
+class MemberResolver:
+    """Resolves a batch of user IDs to guild members without per-user REST calls.
+
+    Cache hits come straight from the guild; all misses go out as one gateway
+    member query (per 100 IDs). Users who weren't found are remembered for a
+    while so paging back and forth doesn't ask about them again.
+    """
+
+    def __init__(self, negative_ttl=NEGATIVE_TTL_SECONDS):
+        self.negative_ttl = negative_ttl
+        self._missing = {}  # (guild_id, user_id) -> monotonic time the "not found" expires
+        self._tasks = set()  # Keep background prefetches referenced until they finish
+
+        # Counters
+        self.cache_hits = 0
+        self.negative_hits = 0
+        self.gateway_queries = 0
+
+    async def resolve(self, guild: discord.Guild, user_ids):
+        """Returns {user_id: Member or None (not in guild)}. IDs whose lookup failed are left out."""
+        now = time.monotonic()
+        resolved = {}
+        misses = []
+        for user_id in user_ids:
+            member = guild.get_member(user_id)
+            if member:
+                self.cache_hits += 1
+                resolved[user_id] = member
+            elif self._missing.get((guild.id, user_id), 0) > now:
+                self.negative_hits += 1
+                resolved[user_id] = None
+            else:
+                misses.append(user_id)
+
+        for start in range(0, len(misses), QUERY_BATCH_SIZE):
+            batch = misses[start:start + QUERY_BATCH_SIZE]
+            self.gateway_queries += 1
+            try:
+                found = await guild.query_members(user_ids=batch, limit=len(batch), cache=True)
+            except (asyncio.TimeoutError, discord.ClientException) as e:
+                print(f"Member lookup failed for {len(batch)} user(s) in {guild.name}: {e}")
+                continue
+
+            for member in found:
+                resolved[member.id] = member
+            for user_id in batch:
+                if user_id not in resolved:
+                    resolved[user_id] = None
+                    self._missing[(guild.id, user_id)] = now + self.negative_ttl
+
+        if len(self._missing) > 10000:
+            self._missing = {key: expires for key, expires in self._missing.items() if expires > now}
+        return resolved
+
+    def prefetch(self, guild: discord.Guild, user_ids):
+        """Resolves IDs in the background (e.g. the next leaderboard page) so they're cached when needed."""
+        user_ids = [user_id for user_id in user_ids if not guild.get_member(user_id)]
+        if not user_ids:
+            return
+        task = asyncio.create_task(self.resolve(guild, user_ids))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
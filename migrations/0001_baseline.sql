@@ -0,0 +1,94 @@
+-- Baseline schema: everything the bot created with CREATE TABLE IF NOT EXISTS before
+-- migrations existed. Safe to apply to a database that already has these tables.
+
+CREATE TABLE IF NOT EXISTS pp_sizes (
+    user_id BIGINT PRIMARY KEY,
+    size INTEGER,
+    last_roll_timestamp TIMESTAMP WITH TIME ZONE DEFAULT NULL
+);
+
+CREATE TABLE IF NOT EXISTS items (
+    item_id SERIAL PRIMARY KEY,
+    name VARCHAR(50) UNIQUE NOT NULL,
+    description VARCHAR(255),
+    effect_type VARCHAR(50),
+    effect_value INTEGER,
+    duration_minutes INTEGER DEFAULT 0,
+    usable BOOLEAN DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS user_inventory (
+    user_id BIGINT NOT NULL,
+    item_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (user_id, item_id),
+    FOREIGN KEY (item_id) REFERENCES items(item_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS user_active_effects (
+    user_id BIGINT NOT NULL,
+    effect_type VARCHAR(50) NOT NULL,
+    effect_value INTEGER,
+    end_time TIMESTAMP NOT NULL,
+    PRIMARY KEY (user_id, effect_type)
+);
+
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id BIGINT PRIMARY KEY,
+    total_rolls INTEGER DEFAULT 0,
+    zero_rolls INTEGER DEFAULT 0,
+    twenty_rolls INTEGER DEFAULT 0,
+    duel_wins INTEGER DEFAULT 0,
+    trivia_wins INTEGER DEFAULT 0,
+    days_as_hog_daddy INTEGER DEFAULT 0
+);
+
+-- PP coins
+CREATE TABLE IF NOT EXISTS user_data (
+    user_id BIGINT PRIMARY KEY,
+    pp_coins INTEGER DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS achievements (
+    achievement_id VARCHAR(50) PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    description VARCHAR(255),
+    reward_role_name VARCHAR(100)
+);
+
+CREATE TABLE IF NOT EXISTS user_achievements (
+    user_id BIGINT NOT NULL,
+    achievement_id VARCHAR(50) NOT NULL,
+    earned_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (user_id, achievement_id),
+    FOREIGN KEY (achievement_id) REFERENCES achievements(achievement_id) ON DELETE CASCADE
+);
+
+-- Daily reset bookkeeping
+CREATE TABLE IF NOT EXISTS bot_state (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    updated_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Seed data (only into empty tables, like the old COUNT(*) checks)
+INSERT INTO achievements (achievement_id, name, description, reward_role_name)
+SELECT * FROM (VALUES
+    ('roll_a_zero', 'Micro PP', 'Rolled a 0 for the first time', NULL),
+    ('roll_a_twenty', 'Maximum PP', 'Rolled a 20 for the first time', NULL),
+    ('became_hog_daddy', 'Hog Daddy', 'Became the Daily Hog Daddy', NULL),
+    ('first_duel_win', 'Duelist', 'Won your first PP duel', NULL),
+    ('ten_duel_wins', 'Duel Master', 'Won 10 PP duels', NULL),
+    ('first_win_trivia', 'Trivia Novice', 'Won your first trivia game', NULL),
+    ('ten_wins_trivia', 'Trivia Master', 'Won 10 trivia games', NULL)
+) AS seed (achievement_id, name, description, reward_role_name)
+WHERE NOT EXISTS (SELECT 1 FROM achievements);
+
+INSERT INTO items (name, description, effect_type, effect_value, duration_minutes, usable)
+SELECT * FROM (VALUES
+    ('Growth Potion', 'Temporarily increases your next pp roll.', 'pp_boost', 2, 60, TRUE),
+    ('Shrink Ray', 'Zap another user to shrink their pp by 2 inches! Use: pls use shrink ray @user', 'shrink_ray', -2, 0, TRUE),
+    ('Lucky Socks', 'Slightly increases chance of a larger roll next time.', 'luck_boost', 1, 0, TRUE),
+    ('Reroll Token', 'Grants one reroll on your next pp command.', 'reroll', 1, 0, TRUE)
+) AS seed (name, description, effect_type, effect_value, duration_minutes, usable)
+WHERE NOT EXISTS (SELECT 1 FROM items);
@@ -0,0 +1,79 @@
+-- pp_roll(): the whole 'pls pp' roll in one round trip. Checks the hourly cooldown,
+-- adds the active pp_boost, clamps to 0-20, upserts pp_sizes, user_stats and
+-- user_data, and returns today's leader after the roll.
+
+CREATE OR REPLACE FUNCTION pp_roll(
+    p_user_id BIGINT,
+    p_base_size INTEGER,
+    p_event_effect INTEGER,
+    p_now TIMESTAMP WITH TIME ZONE
+)
+RETURNS TABLE (
+    rolled BOOLEAN,
+    last_roll TIMESTAMP WITH TIME ZONE,
+    final_size INTEGER,
+    boost INTEGER,
+    zero_rolls INTEGER,
+    twenty_rolls INTEGER,
+    pp_coins INTEGER,
+    leader_id BIGINT,
+    leader_size INTEGER
+) AS $$
+#variable_conflict use_column
+DECLARE
+    v_last TIMESTAMP WITH TIME ZONE;
+    v_boost INTEGER;
+    v_size INTEGER;
+    v_zero INTEGER;
+    v_twenty INTEGER;
+    v_coins INTEGER;
+    v_leader_id BIGINT;
+    v_leader_size INTEGER;
+BEGIN
+    -- One roll per calendar hour (UTC); the row lock stops double-sends both rolling
+    SELECT s.last_roll_timestamp INTO v_last
+    FROM pp_sizes s WHERE s.user_id = p_user_id FOR UPDATE;
+
+    IF v_last IS NOT NULL AND
+       date_trunc('hour', v_last AT TIME ZONE 'UTC') = date_trunc('hour', p_now AT TIME ZONE 'UTC') THEN
+        RETURN QUERY SELECT FALSE, v_last, NULL::INTEGER, NULL::INTEGER, NULL::INTEGER,
+                            NULL::INTEGER, NULL::INTEGER, NULL::BIGINT, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    SELECT e.effect_value INTO v_boost
+    FROM user_active_effects e
+    WHERE e.user_id = p_user_id AND e.effect_type = 'pp_boost' AND e.end_time > NOW();
+
+    v_size := GREATEST(0, LEAST(20, p_base_size + p_event_effect + COALESCE(v_boost, 0)));
+
+    INSERT INTO pp_sizes (user_id, size, last_roll_timestamp)
+    VALUES (p_user_id, v_size, p_now)
+    ON CONFLICT (user_id)
+    DO UPDATE SET size = EXCLUDED.size, last_roll_timestamp = EXCLUDED.last_roll_timestamp;
+
+    INSERT INTO user_stats AS us (user_id, total_rolls, zero_rolls, twenty_rolls)
+    VALUES (p_user_id, 1, (v_size = 0)::INTEGER, (v_size = 20)::INTEGER)
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_rolls = us.total_rolls + 1,
+        zero_rolls = us.zero_rolls + EXCLUDED.zero_rolls,
+        twenty_rolls = us.twenty_rolls + EXCLUDED.twenty_rolls
+    RETURNING us.zero_rolls, us.twenty_rolls INTO v_zero, v_twenty;
+
+    -- Award PP coins equal to the roll size (1 inch = 1 coin)
+    INSERT INTO user_data AS ud (user_id, pp_coins)
+    VALUES (p_user_id, v_size)
+    ON CONFLICT (user_id) DO UPDATE SET pp_coins = ud.pp_coins + EXCLUDED.pp_coins
+    RETURNING ud.pp_coins INTO v_coins;
+
+    -- Today's highest roll (ties go to the earlier roll)
+    SELECT s.user_id, s.size INTO v_leader_id, v_leader_size
+    FROM pp_sizes s
+    WHERE s.last_roll_timestamp >= date_trunc('day', p_now AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+    ORDER BY s.size DESC, s.last_roll_timestamp ASC
+    LIMIT 1;
+
+    RETURN QUERY SELECT TRUE, v_last, v_size, COALESCE(v_boost, 0), v_zero, v_twenty,
+                        v_coins, v_leader_id, v_leader_size;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,22 @@
+-- Indexes for the hot read paths, which were all sequential scans before.
+
+-- Leaderboard and today's-leader lookups: ORDER BY size DESC, last_roll_timestamp ASC
+-- (user_id last so pages can be walked with a keyset on the full sort key)
+CREATE INDEX IF NOT EXISTS idx_pp_sizes_rank
+    ON pp_sizes (size DESC, last_roll_timestamp ASC, user_id);
+
+-- "Rolled since midnight" filter used by the daily leader
+CREATE INDEX IF NOT EXISTS idx_pp_sizes_last_roll
+    ON pp_sizes (last_roll_timestamp);
+
+-- Active-effect lookups (user_id, effect_type, end_time > NOW()) answered from the index alone
+CREATE INDEX IF NOT EXISTS idx_user_active_effects_active
+    ON user_active_effects (user_id, effect_type, end_time) INCLUDE (effect_value);
+
+-- Expired-effect sweeps (end_time <= NOW())
+CREATE INDEX IF NOT EXISTS idx_user_active_effects_end_time
+    ON user_active_effects (end_time);
+
+-- Profile achievement list: WHERE user_id = $1 ORDER BY earned_at
+CREATE INDEX IF NOT EXISTS idx_user_achievements_user_earned
+    ON user_achievements (user_id, earned_at);
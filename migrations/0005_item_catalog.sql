@@ -0,0 +1,24 @@
+-- Item drop rarity and lookup aliases live on the items table, so the bot can
+-- build its drop table from data (item_catalog.ItemCatalog) instead of code.
+
+ALTER TABLE items ADD COLUMN IF NOT EXISTS drop_weight INTEGER NOT NULL DEFAULT 25;  -- Relative drop chance; 0 never drops
+ALTER TABLE items ADD COLUMN IF NOT EXISTS aliases TEXT[] NOT NULL DEFAULT '{}';
+
+-- The weights the game rewards used to hardcode by item_id
+UPDATE items SET drop_weight = 40, aliases = '{potion}' WHERE name = 'Growth Potion';
+UPDATE items SET drop_weight = 30, aliases = '{shrink,ray}' WHERE name = 'Shrink Ray';
+UPDATE items SET drop_weight = 20, aliases = '{socks}' WHERE name = 'Lucky Socks';
+UPDATE items SET drop_weight = 10, aliases = '{reroll,token}' WHERE name = 'Reroll Token';
+
+-- Tell running bots to reload their catalog whenever items change
+CREATE OR REPLACE FUNCTION notify_items_changed() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('items_changed', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS items_changed ON items;
+CREATE TRIGGER items_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON items
+FOR EACH STATEMENT EXECUTE FUNCTION notify_items_changed();
@@ -0,0 +1,13 @@
+-- In-flight minigame state (blackjack hands, pending duels, a running PP Off),
+-- so a restart can pick games up where they were instead of losing bets.
+-- One row per game; state is the game's own snapshot, deadline (if any) is
+-- re-armed on the scheduler at startup.
+
+CREATE TABLE IF NOT EXISTS game_snapshots (
+    kind VARCHAR(20) NOT NULL,
+    key BIGINT NOT NULL,
+    state JSONB NOT NULL,
+    deadline TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (kind, key)
+);
@@ -0,0 +1,6 @@
+-- New items must state their drop weight. 0005 backfilled every existing item
+-- (the four named ones explicitly, anything else with the column default), so
+-- the default has done its job; without it an INSERT that leaves drop_weight
+-- out fails instead of quietly dropping at weight 25.
+
+ALTER TABLE items ALTER COLUMN drop_weight DROP DEFAULT;
@@ -0,0 +1,8 @@
+-- Every snapshot write carries a version (increasing within and across runs),
+-- and a write only replaces a row with a lower version. Queued and direct
+-- writes to the same game can then commit in any order without a lock.
+-- A deleted game is kept as a tombstone (state NULL) so a late, older upsert
+-- can't bring it back; tombstones are purged once nothing can still be in flight.
+
+ALTER TABLE game_snapshots ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE game_snapshots ALTER COLUMN state DROP NOT NULL;
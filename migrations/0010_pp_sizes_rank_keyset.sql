@@ -0,0 +1,8 @@
+-- Leaderboard pages walk pp_sizes with a row comparison on the sort key,
+-- (-size, COALESCE(last_roll_timestamp, 'infinity'), user_id) > (cursor),
+-- which only becomes an index range scan when an index has exactly those
+-- expressions. An unrolled timestamp sorts as 'infinity', i.e. last, the
+-- same as NULLS LAST.
+
+CREATE INDEX IF NOT EXISTS idx_pp_sizes_rank_keyset
+    ON pp_sizes ((-size), (COALESCE(last_roll_timestamp, 'infinity'::timestamptz)), user_id);
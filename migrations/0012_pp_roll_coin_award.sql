@@ -0,0 +1,57 @@
+-- The coin award for a roll is now passed in as well (economy.roll_coins), so the
+-- payout rate is only defined in economy.py. The argument list changes, so drop
+-- and recreate.
+
+DROP FUNCTION IF EXISTS pp_roll(BIGINT, INTEGER, TIMESTAMP WITH TIME ZONE);
+
+CREATE FUNCTION pp_roll(
+    p_user_id BIGINT,
+    p_size INTEGER,
+    p_coins INTEGER,
+    p_now TIMESTAMP WITH TIME ZONE
+)
+RETURNS TABLE (
+    rolled BOOLEAN,
+    last_roll TIMESTAMP WITH TIME ZONE,
+    zero_rolls INTEGER,
+    twenty_rolls INTEGER,
+    pp_coins INTEGER
+) AS $$
+#variable_conflict use_column
+DECLARE
+    v_last TIMESTAMP WITH TIME ZONE;
+    v_zero INTEGER;
+    v_twenty INTEGER;
+    v_coins INTEGER;
+BEGIN
+    -- One roll per calendar hour (UTC); the row lock stops double-sends both rolling
+    SELECT s.last_roll_timestamp INTO v_last
+    FROM pp_sizes s WHERE s.user_id = p_user_id FOR UPDATE;
+
+    IF v_last IS NOT NULL AND
+       date_trunc('hour', v_last AT TIME ZONE 'UTC') = date_trunc('hour', p_now AT TIME ZONE 'UTC') THEN
+        RETURN QUERY SELECT FALSE, v_last, NULL::INTEGER, NULL::INTEGER, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    INSERT INTO pp_sizes (user_id, size, last_roll_timestamp)
+    VALUES (p_user_id, p_size, p_now)
+    ON CONFLICT (user_id)
+    DO UPDATE SET size = EXCLUDED.size, last_roll_timestamp = EXCLUDED.last_roll_timestamp;
+
+    INSERT INTO user_stats AS us (user_id, total_rolls, zero_rolls, twenty_rolls)
+    VALUES (p_user_id, 1, (p_size = 0)::INTEGER, (p_size = 20)::INTEGER)
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_rolls = us.total_rolls + 1,
+        zero_rolls = us.zero_rolls + EXCLUDED.zero_rolls,
+        twenty_rolls = us.twenty_rolls + EXCLUDED.twenty_rolls
+    RETURNING us.zero_rolls, us.twenty_rolls INTO v_zero, v_twenty;
+
+    INSERT INTO user_data AS ud (user_id, pp_coins)
+    VALUES (p_user_id, p_coins)
+    ON CONFLICT (user_id) DO UPDATE SET pp_coins = ud.pp_coins + EXCLUDED.pp_coins
+    RETURNING ud.pp_coins INTO v_coins;
+
+    RETURN QUERY SELECT TRUE, v_last, v_zero, v_twenty, v_coins;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,60 @@
+import bisect
+import random
+from itertools import accumulate
+
+# --- The pp roll distribution (the only place it's defined) ---
+MIN_SIZE = 0
+MAX_SIZE = 20
+ROLL_WEIGHTS = (
+    1,  2,  3,  5,  7,  10,  15,  18,  20,  25,
+    30, 30, 25, 20, 15, 10,  7,   5,   3,   2,
+    1
+)  # ROLL_WEIGHTS[size] = relative chance of rolling `size` inches before modifiers
+# --- End roll distribution ---
+
+# --- Roll events (run by PPEvents, modelled by simulate.py) ---
+EVENT_CHANCE_PERCENT = 5  # Chance per hourly check that an event starts
+EVENT_QUIET_HOURS_ET = (2, 3, 4, 5, 6, 7)  # Hours (ET) when no event may start
+EVENT_MODIFIERS = {  # Event name -> (roll effect, duration in hours)
+    "Heat Wave": (2, 1),
+    "Cold Snap": (-2, 1),
+    "Growth Spurt": (1, 2),
+    "Shrinkage": (-1, 2),
+}
+# --- End roll events ---
+
+_CUMULATIVE = tuple(accumulate(ROLL_WEIGHTS))
+_TOTAL_WEIGHT = _CUMULATIVE[-1]
+
+
+def clamp(size):
+    return max(MIN_SIZE, min(MAX_SIZE, size))
+
+
+def apply_modifiers(base_size, event_effect=0, boost=0):
+    """The modifier pipeline: event effect, then item boost, then clamp to MIN_SIZE..MAX_SIZE."""
+    return clamp(base_size + event_effect + boost)
+
+
+class RollEngine:
+    """Rolls pp sizes from ROLL_WEIGHTS using its own RNG (seed it for reproducible rolls)."""
+
+    def __init__(self, seed=None, rng=None):
+        self.rng = rng or random.Random(seed)
+
+    def base_roll(self):
+        """One unmodified roll: a binary search over the cumulative weight table."""
+        return bisect.bisect_right(_CUMULATIVE, self.rng.randrange(_TOTAL_WEIGHT)) + MIN_SIZE
+
+    def roll(self, event_effect=0, boost=0):
+        """Returns (base_size, final_size) for one roll."""
+        base_size = self.base_roll()
+        return base_size, apply_modifiers(base_size, event_effect, boost)
+
+    def roll_many(self, user_ids, event_effect=0, boosts=None):
+        """Rolls once for each user. boosts maps user_id -> item boost (see EffectsEngine.roll_modifiers).
+
+        Returns {user_id: (base_size, final_size)}.
+        """
+        boosts = boosts or {}
+        return {user_id: self.roll(event_effect, boosts.get(user_id, 0)) for user_id in user_ids}
@@ -0,0 +1,124 @@
+import heapq
+import asyncio
+import itertools
+
+
+class Timer:
+    """A pending call returned by Scheduler.call_later/call_at. cancel() stops it from firing."""
+    __slots__ = ('when', 'callback', 'args', 'cancelled', 'scheduler')
+
+    def __init__(self, scheduler, when, callback, args):
+        self.scheduler = scheduler
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        if not self.cancelled:
+            self.cancelled = True
+            self.scheduler._cancelled += 1
+
+
+class Scheduler:
+    """Every deadline in one min-heap, served by a single background task.
+
+    Times are event-loop (monotonic) seconds. Callbacks may be plain functions
+    or coroutine functions; coroutines are run as tasks the scheduler keeps a
+    reference to, so a slow announcement doesn't hold up later timers.
+    Cancelled timers stay in the heap until they reach the top, unless more
+    than half the heap is cancelled, in which case it is rebuilt.
+    """
+
+    def __init__(self):
+        self._heap = []  # (when, seq, Timer)
+        self._seq = itertools.count()  # Tie-breaker so equal deadlines fire in the order they were added
+        self._cancelled = 0
+        self._wake = None
+        self._task = None
+        self._running = set()  # Callback tasks that haven't finished yet
+
+        # Counters
+        self.fired = 0
+
+    def time(self):
+        return asyncio.get_running_loop().time()
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self.time() + delay, callback, *args)
+
+    def call_at(self, when, callback, *args):
+        timer = Timer(self, when, callback, args)
+        heapq.heappush(self._heap, (when, next(self._seq), timer))
+        self._start()
+        if self._heap[0][2] is timer:
+            self._wake.set()  # New earliest deadline: the runner is sleeping too long
+        return timer
+
+    def __len__(self):
+        return len(self._heap) - self._cancelled
+
+    def _start(self):
+        if not self._task:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stops the runner and cancels callbacks still running. Pending timers are dropped."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._running):
+            task.cancel()
+        self._heap = []
+        self._cancelled = 0
+
+    def _compact(self):
+        self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+        heapq.heapify(self._heap)
+        self._cancelled = 0
+
+    def _fire(self, timer):
+        self.fired += 1
+        try:
+            result = timer.callback(*timer.args)
+        except Exception as e:
+            print(f" Scheduled call {timer.callback.__name__} failed: {e}")
+            return
+        if asyncio.iscoroutine(result):
+            task = asyncio.create_task(result)
+            self._running.add(task)
+            task.add_done_callback(self._callback_done)
+
+    def _callback_done(self, task):
+        self._running.discard(task)
+        if not task.cancelled() and task.exception():
+            print(f" Scheduled task failed: {task.exception()}")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wake.clear()
+            now = loop.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, timer = heapq.heappop(self._heap)
+                if timer.cancelled:
+                    self._cancelled -= 1
+                    continue
+                timer.cancelled = True  # Fired: a later cancel() is a no-op
+                self._fire(timer)
+            if self._cancelled > len(self._heap) // 2:
+                self._compact()
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        return {'pending': len(self), 'heap': len(self._heap), 'fired': self.fired, 'running': len(self._running)}
@@ -0,0 +1,73 @@
+import os
+import re
+import asyncpg
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d{4})_(\w+)\.sql$")
+MIGRATION_LOCK_ID = 7203114  # pg_advisory_lock key so two booting instances never migrate at once
+
+
+def load_migrations(path=MIGRATIONS_DIR):
+    """Returns [(version, name, sql)] for every NNNN_name.sql file, ordered by version."""
+    migrations = []
+    for filename in sorted(os.listdir(path)):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(path, filename), "r", encoding="utf-8") as file:
+            migrations.append((int(match.group(1)), match.group(2), file.read()))
+
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {path}")
+    return migrations
+
+
+async def current_version(conn):
+    """Returns the newest applied migration version (0 for a database that has never been migrated)."""
+    try:
+        return await conn.fetchval("SELECT MAX(version) FROM schema_migrations") or 0
+    except asyncpg.UndefinedTableError:
+        return 0
+
+
+async def migrate(conn, migrations=None):
+    """Applies any pending migrations in order, each in its own transaction. Returns the final version."""
+    if migrations is None:
+        migrations = load_migrations()
+    head = migrations[-1][0] if migrations else 0
+
+    # The common case (every boot after the first) is a single query
+    version = await current_version(conn)
+    if version >= head:
+        print(f" Database schema already at head (version {version}).")
+        return version
+
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+    try:
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+            )
+        """)
+        # Another instance may have migrated while we waited for the lock
+        version = await current_version(conn)
+
+        for migration_version, name, sql in migrations:
+            if migration_version <= version:
+                continue
+            async with conn.transaction():
+                await conn.execute(sql)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)",
+                    migration_version, name
+                )
+            version = migration_version
+            print(f" Applied migration {migration_version:04d}_{name}")
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
+
+    print(f" Database schema migrated to version {version}.")
+    return version
@@ -0,0 +1,160 @@
+from datetime import datetime, timezone
+
+TRIVIA = 'trivia'
+SCRAMBLE = 'scramble'
+HIGHLOW = 'highlow'
+MATH = 'math'
+
+# First characters (or whole answers) each game's prefilter accepts
+_CHOICE_LETTERS = frozenset('abcdABCD')
+_HIGHLOW_START = frozenset('hlHL')
+_NUMBER_START = frozenset('-+0123456789')
+_WORD_START = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+
+class GameSession:
+    """One running minigame in one channel. Subclasses add the game's own fields.
+
+    prefilter() runs on the raw message content before anything is stripped,
+    lowercased or parsed, and must be cheap: it only rules out messages that
+    can't possibly be an answer.
+    """
+    __slots__ = ('guild_id', 'channel', 'message_id', 'started_at', 'answered_users', 'timer')
+    game_type = None
+    max_answer_length = 2000  # Longest raw message (answer plus stray whitespace) worth looking at
+
+    def __init__(self, channel, message_id=None):
+        self.guild_id = channel.guild.id
+        self.channel = channel
+        self.message_id = message_id  # Set once the game's message has been sent
+        self.started_at = datetime.now(timezone.utc)
+        self.answered_users = set()
+        self.timer = None  # The scheduler's timeout for this game, cancelled when the session ends
+
+    @property
+    def channel_id(self):
+        return self.channel.id
+
+    @property
+    def key(self):
+        return (self.guild_id, self.channel.id, self.game_type)
+
+    @property
+    def jump_url(self):
+        """Link to the game's message, built locally (no fetch_message)."""
+        url = f"https://discord.com/channels/{self.guild_id}/{self.channel.id}"
+        return f"{url}/{self.message_id}" if self.message_id else url
+
+    def prefilter(self, content):
+        return 0 < len(content) <= self.max_answer_length
+
+
+class TriviaSession(GameSession):
+    __slots__ = ('question', 'correct_answer', 'choices')
+    game_type = TRIVIA
+    max_answer_length = 3  # A single letter A-D
+
+    def __init__(self, channel, question, correct_answer, choices):
+        super().__init__(channel)
+        self.question = question
+        self.correct_answer = correct_answer
+        self.choices = choices
+
+    def prefilter(self, content):
+        return 0 < len(content) <= self.max_answer_length and content.strip() in _CHOICE_LETTERS
+
+
+class ScrambleSession(GameSession):
+    __slots__ = ('word', 'scrambled')
+    game_type = SCRAMBLE
+
+    def __init__(self, channel, word, scrambled):
+        super().__init__(channel)
+        self.word = word
+        self.scrambled = scrambled
+
+    def prefilter(self, content):
+        # Answers are compared stripped, so only messages exactly as long as the word once
+        # stripped, and not starting with something the word can't
+        stripped = content.strip()
+        return len(stripped) == len(self.word) and stripped[:1] in _WORD_START
+
+
+class HighLowSession(GameSession):
+    __slots__ = ('current_number', 'next_number')
+    game_type = HIGHLOW
+    max_answer_length = 8  # 'higher' / 'lower'
+
+    def __init__(self, channel, current_number, next_number):
+        super().__init__(channel)
+        self.current_number = current_number
+        self.next_number = next_number
+
+    def prefilter(self, content):
+        return 0 < len(content) <= self.max_answer_length and content.lstrip()[:1] in _HIGHLOW_START
+
+
+class MathSession(GameSession):
+    __slots__ = ('problem', 'answer')
+    game_type = MATH
+    max_answer_length = 8  # Answers are at most 4 digits with a sign
+
+    def __init__(self, channel, problem, answer):
+        super().__init__(channel)
+        self.problem = problem
+        self.answer = answer
+
+    def prefilter(self, content):
+        return 0 < len(content) <= self.max_answer_length and content.lstrip()[:1] in _NUMBER_START
+
+
+class SessionManager:
+    """Running minigames keyed by (guild_id, channel_id, game_type).
+
+    Any number of games can run at once as long as each channel has at most one
+    of each type. A second index by channel_id (channel ids are unique across
+    guilds) lets on_message reject a message in a channel with no game, or find
+    the channel's games, with one dict lookup.
+    """
+
+    def __init__(self):
+        self._sessions = {}  # (guild_id, channel_id, game_type) -> GameSession
+        self._channels = {}  # channel_id -> {game_type: GameSession}
+
+    def get(self, guild_id, channel_id, game_type):
+        return self._sessions.get((guild_id, channel_id, game_type))
+
+    def in_channel(self, channel_id):
+        """{game_type: session} for every game running in a channel, or None if there are none."""
+        return self._channels.get(channel_id)
+
+    def start(self, session):
+        """Registers a session. Returns the session already running in its slot instead, if any."""
+        existing = self._sessions.get(session.key)
+        if existing:
+            return existing
+        self._sessions[session.key] = session
+        self._channels.setdefault(session.channel.id, {})[session.game_type] = session
+        return None
+
+    def end(self, session):
+        """Removes a session and cancels its timeout. Returns False if it had already ended."""
+        if self._sessions.get(session.key) is not session:
+            return False
+        if session.timer:
+            session.timer.cancel()
+        del self._sessions[session.key]
+        games = self._channels[session.channel.id]
+        del games[session.game_type]
+        if not games:
+            del self._channels[session.channel.id]
+        return True
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        counts = {}
+        for session in self._sessions.values():
+            counts[session.game_type] = counts.get(session.game_type, 0) + 1
+        return {'active': len(self._sessions), 'channels': len(self._channels), 'by_type': counts}
@@ -0,0 +1,310 @@
+"""Offline PP coin economy simulator.
+
+Samples millions of user-days with NumPy using the bot's own roll weights,
+event schedule and modifier pipeline (roll_engine), payouts and blackjack
+rules (economy, with hands checked against blackjack.py) and item drop weights
+(the items table, through ItemCatalog), and reports the coin distribution,
+blackjack house edge and item drop rates.
+
+    python simulate.py --days 1000000 --rolls-per-day 6 --blackjack-hands 2 --bet 10 --boost-mix 2:0.1
+
+--boost-mix is the share of rolls made under each item boost (the summed
+value of a user's ROLL_EFFECTS, e.g. a Growth Potion's +2); the rest roll
+unboosted. Items without a roll effect in the bot (Lucky Socks' luck_boost
+isn't applied to rolls) aren't modelled.
+
+NumPy is only needed here, not by the bot itself, and nothing here imports
+discord. Drop rates need DATABASE_URL (or --database-url) to read the items
+table; without it that section is skipped.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("simulate.py needs NumPy: pip install numpy")
+
+import blackjack
+from roll_engine import (ROLL_WEIGHTS, MIN_SIZE, MAX_SIZE, EVENT_MODIFIERS, EVENT_CHANCE_PERCENT,
+                         EVENT_QUIET_HOURS_ET, apply_modifiers)
+from economy import (COINS_PER_INCH, GAME_WIN_COINS, TRIVIA_WIN_COINS, DEALER_STANDS_ON,
+                     blackjack_winnings)
+
+HOURS_PER_DAY = 24
+EVENT_WARMUP_HOURS = max(hours for _, hours in EVENT_MODIFIERS.values())  # Lets yesterday's late events run into today
+RANK_VALUES = np.array(blackjack.RANK_VALUES, dtype=np.int16)  # Indexed by card % 13, aces as 11
+BLACKJACK_RESULTS = ("win", "blackjack", "push", "lose", "bust")
+
+
+def sample_base_rolls(rng, shape):
+    """Unmodified pp rolls drawn from roll_engine.ROLL_WEIGHTS."""
+    weights = np.array(ROLL_WEIGHTS, dtype=np.float64)
+    return rng.choice(np.arange(MIN_SIZE, MAX_SIZE + 1), size=shape, p=weights / weights.sum())
+
+
+def simulate_event_hours(rng, days):
+    """Returns a (days, 24) array of the event roll effect active in each ET hour.
+
+    Mirrors PPEvents.event_task: at the top of each hour a running event ends
+    once its time is up (no new one starts that hour), otherwise outside the
+    quiet hours an event starts with EVENT_CHANCE_PERCENT chance.
+    """
+    effects = np.array([effect for effect, _ in EVENT_MODIFIERS.values()], dtype=np.int8)
+    durations = np.array([hours for _, hours in EVENT_MODIFIERS.values()], dtype=np.int8)
+    quiet = set(EVENT_QUIET_HOURS_ET)
+
+    active = np.zeros(days, dtype=bool)
+    remaining = np.zeros(days, dtype=np.int8)
+    current = np.zeros(days, dtype=np.int8)
+    by_hour = np.zeros((days, HOURS_PER_DAY), dtype=np.int8)
+
+    for step in range(-EVENT_WARMUP_HOURS, HOURS_PER_DAY):
+        hour = step % HOURS_PER_DAY
+        ended = active & (remaining == 0)
+        active &= ~ended
+        current[ended] = 0
+
+        if hour not in quiet:
+            start = ~active & ~ended & (rng.random(days) * 100 < EVENT_CHANCE_PERCENT)
+            chosen = rng.integers(len(EVENT_MODIFIERS), size=days)
+            current[start] = effects[chosen[start]]
+            remaining[start] = durations[chosen[start]]
+            active |= start
+
+        if step >= 0:
+            by_hour[:, hour] = current
+        remaining[active] -= 1
+    return by_hour
+
+
+def modifier_table(event_values, boost_values):
+    """roll_engine.apply_modifiers for every (base size, event effect, boost), as a lookup array."""
+    return np.array([[[apply_modifiers(size, event, boost) for boost in boost_values] for event in event_values]
+                     for size in range(MIN_SIZE, MAX_SIZE + 1)], dtype=np.int16)
+
+
+def simulate_rolls(rng, days, rolls_per_day, boost_mix):
+    """Returns (final sizes of shape (days, rolls_per_day), event hours) for users rolling in distinct hours."""
+    event_hours = simulate_event_hours(rng, days)
+    hours = np.argsort(rng.random((days, HOURS_PER_DAY)), axis=1)[:, :rolls_per_day]  # One roll per hour at most
+    event_effect = np.take_along_axis(event_hours, hours, axis=1)
+
+    event_values = np.array(sorted({0, *(effect for effect, _ in EVENT_MODIFIERS.values())}))
+    boost_values = [boost for boost, _ in boost_mix]
+    boost_p = np.array([share for _, share in boost_mix])
+    table = modifier_table(event_values, boost_values)
+    base = sample_base_rolls(rng, (days, rolls_per_day))
+    boost = rng.choice(len(boost_values), size=base.shape, p=boost_p / boost_p.sum())
+    final = table[base - MIN_SIZE, np.searchsorted(event_values, event_effect), boost]
+    return final, event_hours
+
+
+def _add_card(total, soft_aces, value, mask):
+    # blackjack.Hand.add, for every hand in mask at once
+    total = total + np.where(mask, value, 0)
+    soft_aces = soft_aces + (mask & (value == 11))
+    while True:
+        soften = (total > 21) & (soft_aces > 0)
+        if not soften.any():
+            return total, soft_aces
+        total = total - 10 * soften
+        soft_aces = soft_aces - soften
+
+
+def simulate_blackjack(rng, hands, bet, player_stands_on):
+    """Plays `hands` games of the bot's blackjack.
+
+    Returns (net coins, result index, cards dealt, player total, dealer total), one per hand.
+    Each game uses a freshly shuffled deck like PPMinigames.blackjack (cards
+    are 0-51 as in blackjack.py, dealt player, player, dealer, dealer). The
+    player hits below player_stands_on (and stops at 21, as `pls hit` does).
+    """
+    decks = rng.permuted(np.tile(np.arange(blackjack.CARDS_PER_DECK, dtype=np.int16), (hands, 1)), axis=1)
+    values = RANK_VALUES[decks % 13]
+    rows = np.arange(hands)
+    dealt = np.ones(hands, bool)
+    player, player_aces = _add_card(np.zeros(hands, np.int16), np.zeros(hands, np.int16), values[:, 0], dealt)
+    player, player_aces = _add_card(player, player_aces, values[:, 1], dealt)
+    dealer, dealer_aces = _add_card(np.zeros(hands, np.int16), np.zeros(hands, np.int16), values[:, 2], dealt)
+    dealer, dealer_aces = _add_card(dealer, dealer_aces, values[:, 3], dealt)
+    next_card = np.full(hands, 4)
+
+    natural = player == 21
+    drawing = ~natural & (player < player_stands_on)
+    while drawing.any():
+        player, player_aces = _add_card(player, player_aces, values[rows, next_card], drawing)
+        next_card += drawing
+        drawing &= (player < player_stands_on) & (player < 21)
+    bust = player > 21
+
+    drawing = ~natural & ~bust & (dealer < DEALER_STANDS_ON)
+    while drawing.any():
+        dealer, dealer_aces = _add_card(dealer, dealer_aces, values[rows, next_card], drawing)
+        next_card += drawing
+        drawing &= dealer < DEALER_STANDS_ON
+
+    result = np.select(
+        [natural & (dealer == 21), natural, bust, dealer > 21, dealer > player, dealer < player],
+        [BLACKJACK_RESULTS.index("push"), BLACKJACK_RESULTS.index("blackjack"), BLACKJACK_RESULTS.index("bust"),
+         BLACKJACK_RESULTS.index("win"), BLACKJACK_RESULTS.index("lose"), BLACKJACK_RESULTS.index("win")],
+        default=BLACKJACK_RESULTS.index("push"),
+    )
+    payouts = np.array([blackjack_winnings(name, bet) for name in BLACKJACK_RESULTS])
+    return payouts[result] - bet, result, (decks, next_card), player, dealer
+
+
+def check_blackjack(dealt, player, dealer, result, player_stands_on, sample):
+    """Replays the first `sample` simulated hands through blackjack.py and stops on any disagreement."""
+    decks, next_card = dealt
+    for hand in range(min(sample, len(result))):
+        shoe = blackjack.Shoe()
+        shoe.cards = array('B', decks[hand][::-1].tolist())  # Shoe.draw() takes from the end
+        game = blackjack.deal(0, shoe=shoe)
+        while not game.result and game.player.total < player_stands_on:
+            blackjack.hit(game)
+        if not game.result:
+            blackjack.settle(game)
+        expected = (game.player.total, game.dealer.total, len(game.player.cards) + len(game.dealer.cards), game.result)
+        got = (int(player[hand]), int(dealer[hand]), int(next_card[hand]), BLACKJACK_RESULTS[result[hand]])
+        if got != expected:
+            cards = " ".join(blackjack.format_card(card) for card in decks[hand][:expected[2]])
+            sys.exit(f"Vectorised blackjack disagrees with blackjack.py on {cards}: "
+                     f"got (player, dealer, cards, result) {got}, expected {expected}")
+
+
+async def load_drop_weights(dsn):
+    """Returns [(item name, drop_weight)] for droppable items, read through the bot's ItemCatalog."""
+    import asyncpg
+    from item_catalog import ItemCatalog
+
+    catalog = ItemCatalog()
+    conn = await asyncpg.connect(dsn)
+    try:
+        await catalog.load(conn)
+    finally:
+        await conn.close()
+    return [(item['name'], item['drop_weight']) for item in catalog.items.values() if (item.get('drop_weight') or 0) > 0]
+
+
+def run(args, drop_weights):
+    rng = np.random.default_rng(args.seed)
+    coins = np.empty(args.days, dtype=np.int64)
+    size_counts = np.zeros(MAX_SIZE - MIN_SIZE + 1, dtype=np.int64)
+    event_hours = 0
+    bj_net = 0
+    bj_results = np.zeros(len(BLACKJACK_RESULTS), dtype=np.int64)
+    drops = np.zeros(len(drop_weights), dtype=np.int64)
+    if drop_weights:
+        drop_p = np.array([weight for _, weight in drop_weights], dtype=np.float64)
+        drop_p /= drop_p.sum()
+
+    for start in range(0, args.days, args.chunk):
+        days = min(args.chunk, args.days - start)
+
+        final, events = simulate_rolls(rng, days, args.rolls_per_day, args.boost_mix)
+        day_coins = final.sum(axis=1, dtype=np.int64) * COINS_PER_INCH
+        size_counts += np.bincount(final.ravel() - MIN_SIZE, minlength=size_counts.size)
+        event_hours += np.count_nonzero(events)
+
+        game_wins = rng.poisson(args.game_wins, days)
+        trivia_wins = rng.poisson(args.trivia_wins, days)
+        day_coins += game_wins * GAME_WIN_COINS + trivia_wins * TRIVIA_WIN_COINS
+        if drop_weights:
+            drops += np.bincount(rng.choice(len(drop_weights), size=int(game_wins.sum() + trivia_wins.sum()), p=drop_p),
+                                 minlength=len(drop_weights))
+
+        if args.blackjack_hands:
+            net, results, dealt, player, dealer = simulate_blackjack(rng, days * args.blackjack_hands, args.bet, args.stand_on)
+            check_blackjack(dealt, player, dealer, results, args.stand_on, args.check_hands)
+            day_coins += net.reshape(days, args.blackjack_hands).sum(axis=1)
+            bj_net += int(net.sum())
+            bj_results += np.bincount(results, minlength=len(BLACKJACK_RESULTS))
+
+        coins[start:start + days] = day_coins
+    return coins, size_counts, event_hours, bj_net, bj_results, drops
+
+
+def report(args, drop_weights, coins, size_counts, event_hours, bj_net, bj_results, drops, elapsed):
+    print(f"Simulated {args.days:,} user-days in {elapsed:.1f}s "
+          f"({args.rolls_per_day} rolls, {args.game_wins} game wins, {args.trivia_wins} trivia wins, "
+          f"{args.blackjack_hands} blackjack hands of {args.bet} per day)")
+    print("Roll boosts: " + ", ".join(f"{boost:+d} on {share:.0%}" for boost, share in args.boost_mix) + "\n")
+
+    print("Coins earned per user-day")
+    print(f"  mean {coins.mean():.2f}  std {coins.std():.2f}  min {coins.min()}  max {coins.max()}")
+    percentiles = (1, 10, 25, 50, 75, 90, 99)
+    print("  " + "  ".join(f"p{p} {value:.0f}" for p, value in zip(percentiles, np.percentile(coins, percentiles))))
+    print(f"  {np.mean(coins < 0):.2%} of user-days end with fewer coins than they started\n")
+
+    rolls = size_counts.sum()
+    print(f"Roll sizes ({event_hours / (args.days * HOURS_PER_DAY):.2%} of hours had an event running)")
+    sizes = np.arange(MIN_SIZE, MAX_SIZE + 1)
+    print(f"  mean {(sizes * size_counts).sum() / rolls:.3f} inches")
+    print("  " + "  ".join(f"{size}:{count / rolls:.1%}" for size, count in zip(sizes, size_counts)) + "\n")
+
+    hands = bj_results.sum()
+    if hands:
+        print(f"Blackjack ({hands:,} hands, player stands on {args.stand_on})")
+        print(f"  house edge {-bj_net / (hands * args.bet):.2%}  (net {bj_net:+,} coins)")
+        print("  " + "  ".join(f"{name} {count / hands:.2%}" for name, count in zip(BLACKJACK_RESULTS, bj_results)) + "\n")
+
+    if drop_weights:
+        total = drops.sum()
+        print(f"Item drops ({total:,} game/trivia wins)")
+        for (name, weight), count in zip(drop_weights, drops):
+            print(f"  {name:<20} weight {weight:>3}  {count / total if total else 0:.2%}")
+    else:
+        print("Item drops skipped (set DATABASE_URL or --database-url to read the items table)")
+
+
+def parse_boost_mix(text):
+    """'2:0.1,4:0.02' -> [(2, 0.1), (4, 0.02), (0, 0.88)]."""
+    mix = {}
+    for pair in filter(None, text.split(",")):
+        boost, _, share = pair.partition(":")
+        try:
+            mix[int(boost)] = mix.get(int(boost), 0.0) + float(share)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected BOOST:SHARE, got '{pair}'")
+    unboosted = 1.0 - sum(mix.values())
+    if unboosted < -1e-9 or any(share < 0 for share in mix.values()):
+        raise argparse.ArgumentTypeError("boost shares must be positive and add up to at most 1")
+    if unboosted > 1e-9:
+        mix[0] = mix.get(0, 0.0) + unboosted
+    return sorted(mix.items(), key=lambda item: -item[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the PP coin economy.")
+    parser.add_argument("--days", type=int, default=1_000_000, help="User-days to simulate")
+    parser.add_argument("--rolls-per-day", type=int, default=6, help="pls pp rolls per user per day (max 24)")
+    parser.add_argument("--game-wins", type=float, default=1.0, help="Mean minigame wins per user per day")
+    parser.add_argument("--trivia-wins", type=float, default=0.5, help="Mean trivia wins per user per day")
+    parser.add_argument("--blackjack-hands", type=int, default=2, help="Blackjack hands per user per day")
+    parser.add_argument("--bet", type=int, default=10, help="Blackjack bet per hand")
+    parser.add_argument("--stand-on", type=int, default=DEALER_STANDS_ON, help="Player hits below this total")
+    parser.add_argument("--boost-mix", type=parse_boost_mix, default=[(0, 1.0)],
+                        help="Item roll boosts as BOOST:SHARE pairs, e.g. 2:0.1 (the rest of the rolls are unboosted)")
+    parser.add_argument("--check-hands", type=int, default=1000,
+                        help="Blackjack hands per batch replayed through blackjack.py to check the simulation (0 = off)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=200_000, help="User-days sampled per batch (memory bound)")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"), help="Postgres DSN for item drop weights")
+    args = parser.parse_args()
+    if not 0 < args.rolls_per_day <= HOURS_PER_DAY:
+        parser.error(f"--rolls-per-day must be between 1 and {HOURS_PER_DAY}")
+
+    drop_weights = asyncio.run(load_drop_weights(args.database_url)) if args.database_url else []
+
+    started = time.perf_counter()
+    results = run(args, drop_weights)
+    report(args, drop_weights, *results, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
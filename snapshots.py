@@ -0,0 +1,151 @@
+import json
+import time
+import asyncio
+import contextlib
+
+TOMBSTONE_SECONDS = 300  # Deleted games are remembered this long, far past any write still in flight
+
+_UPSERT = """
+    INSERT INTO game_snapshots AS g (kind, key, state, deadline, version)
+    SELECT kind, key, state::jsonb, deadline, version
+    FROM UNNEST($1::VARCHAR[], $2::BIGINT[], $3::TEXT[], $4::TIMESTAMPTZ[], $5::BIGINT[])
+        AS u(kind, key, state, deadline, version)
+    ON CONFLICT (kind, key) DO UPDATE
+    SET state = EXCLUDED.state, deadline = EXCLUDED.deadline, version = EXCLUDED.version, updated_at = NOW()
+    WHERE g.version < EXCLUDED.version
+"""
+
+
+class SnapshotStore:
+    """Write-behind persistence for in-flight game state (the game_snapshots table).
+
+    save()/discard() only queue a change and wake the writer, so they can be
+    called from sync code. Changes to the same game coalesce while queued, and
+    everything queued while a write is running goes out together in the next
+    one: one upsert per batch (a discard is written as a tombstone).
+
+    A change that must commit together with something else (a bet being taken,
+    winnings being paid) goes through write()/remove() on the caller's own
+    transaction instead. Every change is stamped with a version when it's made
+    and a row only takes a newer one, so a queued batch that commits late can't
+    undo a direct write, and no lock is shared between the two.
+    """
+
+    def __init__(self, db, retry_seconds=1):
+        self.db = db
+        self.retry_seconds = retry_seconds
+        self._pending = {}  # (kind, key) -> (state or None to delete, deadline, version)
+        self._version = time.time_ns()
+        self._flush_lock = asyncio.Lock()  # Only orders queued batches among themselves
+        self._wake = asyncio.Event()
+        self._task = None
+
+        # Counters
+        self.writes = 0
+        self.rows_written = 0
+
+    def start(self):
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stops the writer and writes out anything still queued."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f" Game snapshot write failed (will retry): {e}")
+                await asyncio.sleep(self.retry_seconds)  # flush() requeued the batch and set _wake
+
+    def _next_version(self):
+        # Nanosecond clock, so versions keep increasing across restarts too
+        self._version = max(self._version + 1, time.time_ns())
+        return self._version
+
+    def save(self, kind, key, state, deadline=None):
+        """Queues a game's latest state. deadline is an aware datetime, or None."""
+        self._pending[(kind, key)] = (state, deadline, self._next_version())
+        self._wake.set()
+
+    def discard(self, kind, key):
+        """Queues a finished game's snapshot for deletion."""
+        self._pending[(kind, key)] = (None, None, self._next_version())
+        self._wake.set()
+
+    async def flush(self):
+        """Writes every queued change in one transaction."""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch = self._pending
+            self._pending = {}
+
+            rows = [(kind, key, None if state is None else json.dumps(state, separators=(',', ':')), deadline, version)
+                    for (kind, key), (state, deadline, version) in batch.items()]
+            try:
+                async with self.db.acquire() as conn:
+                    async with conn.transaction():
+                        await conn.execute(_UPSERT, *map(list, zip(*rows)))
+                        await conn.execute(
+                            "DELETE FROM game_snapshots WHERE state IS NULL AND updated_at < NOW() - $1 * INTERVAL '1 second'",
+                            TOMBSTONE_SECONDS
+                        )
+            except Exception:
+                # Requeue whatever hasn't been superseded by a newer change
+                for game, change in batch.items():
+                    self._pending.setdefault(game, change)
+                self._wake.set()
+                raise
+
+            self.writes += 1
+            self.rows_written += len(batch)
+
+    @contextlib.asynccontextmanager
+    async def writing(self):
+        """A connection in a transaction, for write()/remove() alongside other statements."""
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                yield conn
+
+    async def _write_now(self, conn, kind, key, state, deadline):
+        # Anything already queued for this game is older and will be turned away by the version check
+        await conn.execute(_UPSERT, [kind], [key], [None if state is None else json.dumps(state, separators=(',', ':'))],
+                           [deadline], [self._next_version()])
+        self.rows_written += 1
+
+    async def write(self, conn, kind, key, state, deadline=None):
+        """Upserts a game's state on conn, in the caller's transaction."""
+        await self._write_now(conn, kind, key, state, deadline)
+
+    async def remove(self, conn, kind, key):
+        """Deletes a game's snapshot on conn, in the caller's transaction."""
+        await self._write_now(conn, kind, key, None, None)
+
+    async def delete(self, kind, key):
+        """Deletes a game's snapshot now, on its own."""
+        async with self.writing() as conn:
+            await self.remove(conn, kind, key)
+
+    async def load(self, conn):
+        """Every stored snapshot in one query: {kind: [(key, state, deadline)]}."""
+        rows = await conn.fetch("SELECT kind, key, state, deadline FROM game_snapshots WHERE state IS NOT NULL")
+        snapshots = {}
+        for row in rows:
+            snapshots.setdefault(row['kind'], []).append((row['key'], json.loads(row['state']), row['deadline']))
+        print(f" Loaded {len(rows)} game snapshot(s).")
+        return snapshots
+
+    def stats(self):
+        return {'pending': len(self._pending), 'writes': self.writes, 'rows_written': self.rows_written}
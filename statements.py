@@ -0,0 +1,81 @@
+import asyncpg
+
+# Hot-path queries, prepared once on every pooled connection by StatementRegistry.warm
+STATEMENTS = {
+    # PPCore.pp
+    'pp_roll': "SELECT * FROM pp_roll($1, $2, $3, $4)",
+    # PPItems._get_item_by_name
+    'item_by_name': "SELECT * FROM items WHERE LOWER(name) = LOWER($1)",
+    # PPProfile.profile / PPProfile.coins
+    'pp_size': "SELECT size, last_roll_timestamp FROM pp_sizes WHERE user_id = $1",
+    'user_stats': "SELECT * FROM user_stats WHERE user_id = $1",
+    'coins': "SELECT pp_coins FROM user_data WHERE user_id = $1",
+    'earned_achievements': """
+        SELECT a.name, a.description FROM user_achievements ua
+        JOIN achievements a ON ua.achievement_id = a.achievement_id
+        WHERE ua.user_id = $1 ORDER BY ua.earned_at
+    """,
+}
+
+
+class StatementRegistry:
+    """Named hot-path statements, planned once per connection and reused by every command.
+
+    Statements live in asyncpg's per-connection statement cache, which (unlike
+    PreparedStatement objects) survives the connection going back to the pool.
+    PoolService sizes that cache to never evict and never expire entries, so a
+    statement counted as prepared on a connection really is still prepared there.
+    """
+
+    def __init__(self, statements=STATEMENTS):
+        self.statements = dict(statements)
+        self._prepared = {}  # backend pid -> names prepared on that connection
+        self.hits = 0
+        self.misses = 0
+
+    async def warm(self, conn):
+        """Pool init hook: prepares every registered statement on a new connection."""
+        pid = conn.get_server_pid()
+        prepared = set()
+        for name, sql in self.statements.items():
+            try:
+                # An empty executemany() plans the statement into the cache without running it
+                await conn.executemany(sql, [])
+                prepared.add(name)
+            except asyncpg.PostgresError as e:
+                # The schema may not exist yet (first boot); it'll be prepared on first use instead
+                print(f" Deferred preparing statement '{name}': {e}")
+        self._prepared[pid] = prepared
+        conn.add_termination_listener(lambda _conn: self._prepared.pop(pid, None))
+
+    def _lookup(self, conn, name):
+        prepared = self._prepared.setdefault(conn.get_server_pid(), set())
+        if name in prepared:
+            self.hits += 1
+        else:
+            self.misses += 1  # asyncpg prepares and caches it as part of this call
+            prepared.add(name)
+        return self.statements[name]
+
+    async def fetch(self, conn, name, *args):
+        return await conn.fetch(self._lookup(conn, name), *args)
+
+    async def fetchrow(self, conn, name, *args):
+        return await conn.fetchrow(self._lookup(conn, name), *args)
+
+    async def fetchval(self, conn, name, *args):
+        return await conn.fetchval(self._lookup(conn, name), *args)
+
+    async def execute(self, conn, name, *args):
+        return await conn.execute(self._lookup(conn, name), *args)
+
+    def stats(self):
+        """Returns statement cache hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            'statements': len(self.statements),
+            'connections': len(self._prepared),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
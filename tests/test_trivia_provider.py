@@ -0,0 +1,90 @@
+import asyncio
+import itertools
+from aiohttp import web
+from trivia_bank import TriviaBank
+from trivia_provider import TriviaProvider
+
+
+async def start_stub_api():
+    """A local stand-in for the-trivia-api.com that returns new questions on every request."""
+    ids = itertools.count()
+    requests = []
+
+    async def questions(request):
+        requests.append(dict(request.query))
+        limit = int(request.query['limit'])
+        return web.json_response([{
+            'id': f"q{next(ids)}",
+            'category': request.query['categories'],
+            'difficulty': request.query['difficulties'],
+            'question': {'text': "What is 2 + 2?"},
+            'correctAnswer': "4",
+            'incorrectAnswers': ["3", "5", "22"],
+        } for _ in range(limit)])
+
+    app = web.Application()
+    app.router.add_get('/questions', questions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}/questions", requests
+
+
+async def wait_for(condition, timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("timed out")
+
+
+def test_api_batches_fill_the_bank(tmp_path):
+    async def run():
+        runner, url, requests = await start_stub_api()
+        bank = TriviaBank(str(tmp_path / "bank.sqlite3"))
+        provider = TriviaProvider(url=url, bank=bank, offline=False)
+        try:
+            assert len(bank) == 0  # An empty bank must still be used
+            provider.start()
+            await wait_for(lambda: provider.buffered() == len(provider._buffers) * provider.batch_size)
+
+            assert len(bank) == len(requests) * provider.batch_size
+            question = provider.get()
+            asked = bank.conn.execute(
+                "SELECT last_asked FROM questions WHERE question_id = ?", (question.question_id,)
+            ).fetchone()[0]
+            assert asked > 0
+        finally:
+            await provider.close()
+            bank.close()
+            await runner.cleanup()
+        return len(requests)
+
+    assert asyncio.run(run()) > 0
+
+
+def test_offline_mode_serves_from_the_bank_without_the_api(tmp_path):
+    async def run():
+        runner, url, requests = await start_stub_api()
+        path = str(tmp_path / "bank.sqlite3")
+        bank = TriviaBank(path)
+        online = TriviaProvider(url=url, bank=bank, offline=False)
+        online.start()
+        assert await online.fetch('science', 'easy') is not None
+        await online.close()
+        fetched = len(requests)
+
+        offline = TriviaProvider(url=url, bank=bank, offline=True)
+        offline.start()
+        try:
+            question = await offline.fetch()
+            assert question is not None
+            assert len(requests) == fetched
+        finally:
+            await offline.close()
+            bank.close()
+            await runner.cleanup()
+
+    asyncio.run(run())
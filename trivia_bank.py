@@ -0,0 +1,146 @@
+"""Local trivia question bank (SQLite), so trivia keeps working without the API.
+
+The bot adds every question the API returns; bulk files can be imported too:
+
+    python trivia_bank.py import questions.json [more.json ...]
+    python trivia_bank.py stats
+
+Import files are either a JSON list or JSON lines, each question in the
+the-trivia-api.com v2 format (id, category, difficulty, question.text,
+correctAnswer, incorrectAnswers; id is optional). Any category name is
+accepted.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import random
+import sqlite3
+import argparse
+from trivia_provider import TriviaQuestion
+
+# --- Trivia Bank Settings (override with environment variables) ---
+TRIVIA_BANK_PATH = os.getenv("TRIVIA_BANK_PATH", "trivia_bank.sqlite3")
+# --- End Trivia Bank Settings ---
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    question_id TEXT PRIMARY KEY,
+    category TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    text TEXT NOT NULL,
+    correct_answer TEXT NOT NULL,
+    incorrect_answers TEXT NOT NULL,  -- JSON list
+    last_asked REAL NOT NULL DEFAULT 0,  -- Unix time, 0 = never
+    shuffle REAL NOT NULL  -- Random tie-breaker, so never-asked questions come out in random order
+);
+CREATE INDEX IF NOT EXISTS questions_rotation ON questions (category, difficulty, last_asked, shuffle);
+CREATE INDEX IF NOT EXISTS questions_rotation_any ON questions (last_asked, shuffle);
+"""
+
+_COLUMNS = "question_id, text, correct_answer, incorrect_answers, category, difficulty"
+
+
+class TriviaBank:
+    """Questions in a local SQLite file, drawn least-recently-asked first.
+
+    Each draw is one indexed lookup plus an update of last_asked, so a question
+    isn't repeated until the rest of its category/difficulty has been asked.
+    Calls are synchronous: they take microseconds (WAL mode, no fsync per draw).
+    """
+
+    def __init__(self, path=TRIVIA_BANK_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def add(self, questions):
+        """Adds TriviaQuestions (ones already in the bank are left alone). Returns how many were new."""
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO questions (question_id, category, difficulty, text, correct_answer, incorrect_answers, shuffle)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(q.question_id, q.category, q.difficulty, q.text, q.correct_answer, json.dumps(q.incorrect_answers), random.random())
+                 for q in questions]
+            )
+            return self.conn.total_changes - before
+
+    def draw(self, category=None, difficulty=None):
+        """The least recently asked question (optionally of one category/difficulty), marked as asked. None if there are none."""
+        if category and difficulty:
+            where, args = "WHERE category = ? AND difficulty = ?", (category, difficulty)
+        elif category or difficulty:
+            # Not covered by an index prefix; fine for occasional use
+            where, args = ("WHERE category = ?", (category,)) if category else ("WHERE difficulty = ?", (difficulty,))
+        else:
+            where, args = "", ()
+        row = self.conn.execute(
+            f"SELECT {_COLUMNS} FROM questions {where} ORDER BY last_asked, shuffle LIMIT 1", args
+        ).fetchone()
+        if not row:
+            return None
+        self.mark_asked(row[0])
+        return TriviaQuestion(row[0], row[1], row[2], json.loads(row[3]), row[4], row[5])
+
+    def mark_asked(self, question_id):
+        """Moves a question to the back of the rotation (used when the API's copy of it was asked)."""
+        with self.conn:
+            self.conn.execute("UPDATE questions SET last_asked = ?, shuffle = ? WHERE question_id = ?",
+                              (time.time(), random.random(), question_id))
+
+    def counts(self):
+        """[(category, difficulty, questions)] for everything in the bank."""
+        return self.conn.execute(
+            "SELECT category, difficulty, COUNT(*) FROM questions GROUP BY category, difficulty ORDER BY category, difficulty"
+        ).fetchall()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+
+
+def read_import_file(path):
+    """TriviaQuestions from a JSON list or JSON-lines file in the API's format."""
+    with open(path, "r", encoding="utf-8") as file:
+        content = file.read().strip()
+    if content.startswith("["):
+        items = json.loads(content)
+    else:
+        items = [json.loads(line) for line in content.splitlines() if line.strip()]
+    for item in items:
+        if 'id' not in item:  # Hand-written files: identify questions by their text
+            item['id'] = hashlib.sha1(item['question']['text'].encode("utf-8")).hexdigest()
+    return [TriviaQuestion.from_api(item) for item in items]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local trivia bank.")
+    parser.add_argument("--path", default=TRIVIA_BANK_PATH, help="SQLite file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="Add questions from JSON / JSON-lines files")
+    import_parser.add_argument("files", nargs="+")
+    commands.add_parser("stats", help="Questions per category and difficulty")
+    args = parser.parse_args()
+
+    bank = TriviaBank(args.path)
+    if args.command == "import":
+        for path in args.files:
+            try:
+                questions = read_import_file(path)
+            except (OSError, ValueError, KeyError) as e:
+                sys.exit(f"Couldn't read {path}: {e}")
+            print(f"{path}: {bank.add(questions)} new of {len(questions)} question(s)")
+    for category, difficulty, count in bank.counts():
+        print(f"{category:<24} {difficulty:<8} {count}")
+    print(f"Total: {len(bank)}")
+    bank.close()
+
+
+if __name__ == "__main__":
+    main()
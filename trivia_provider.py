@@ -0,0 +1,208 @@
+import os
+import random
+import asyncio
+from collections import deque
+import aiohttp
+
+# --- Trivia Settings (override with environment variables) ---
+TRIVIA_API_URL = os.getenv("TRIVIA_API_URL", "https://the-trivia-api.com/v2/questions")  # Point at a local stub for testing
+TRIVIA_BATCH_SIZE = int(os.getenv("TRIVIA_BATCH_SIZE", "10"))  # Questions fetched per request (the API allows up to 50)
+TRIVIA_LOW_WATER = int(os.getenv("TRIVIA_LOW_WATER", "3"))  # Refill a category/difficulty once it has fewer than this
+TRIVIA_RECENT_SIZE = int(os.getenv("TRIVIA_RECENT_SIZE", "500"))  # Questions remembered so they aren't asked again
+TRIVIA_HTTP_TIMEOUT = float(os.getenv("TRIVIA_HTTP_TIMEOUT", "5"))  # Seconds per API request
+TRIVIA_RETRY_SECONDS = float(os.getenv("TRIVIA_RETRY_SECONDS", "30"))  # Wait after a failed refill
+TRIVIA_OFFLINE = os.getenv("TRIVIA_OFFLINE", "0") == "1"  # 1 = never call the API, ask from the local bank only
+# --- End Trivia Settings ---
+
+# Also available: arts_and_literature, history, society_and_culture, geography, food_and_drink
+CATEGORIES = ('film_and_tv', 'music', 'sport_and_leisure', 'general_knowledge', 'science')
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+
+class TriviaQuestion:
+    __slots__ = ('question_id', 'text', 'correct_answer', 'incorrect_answers', 'category', 'difficulty')
+
+    def __init__(self, question_id, text, correct_answer, incorrect_answers, category, difficulty):
+        self.question_id = question_id
+        self.text = text
+        self.correct_answer = correct_answer
+        self.incorrect_answers = incorrect_answers
+        self.category = category
+        self.difficulty = difficulty
+
+    @classmethod
+    def from_api(cls, data):
+        """Builds a question from one item of a the-trivia-api.com v2 response."""
+        return cls(data['id'], data['question']['text'], data['correctAnswer'], list(data['incorrectAnswers']),
+                   data['category'], data['difficulty'])
+
+    def choices(self):
+        """All answers in a random order."""
+        answers = self.incorrect_answers + [self.correct_answer]
+        random.shuffle(answers)
+        return answers
+
+
+class TriviaProvider:
+    """Trivia questions served from memory, with the network kept off the command path.
+
+    Questions are buffered per (category, difficulty). A background task refills
+    any buffer that drops under the low-water mark with one batched request,
+    through a single long-lived HTTP session. Questions asked recently (or
+    already buffered) are skipped, so repeats only happen once the API runs dry.
+
+    With a TriviaBank, every fetched question is also added to the bank, and
+    the bank is asked before the network when the buffers are empty. In
+    offline mode the API isn't used at all and every question comes from the bank.
+    """
+
+    def __init__(self, url=TRIVIA_API_URL, categories=CATEGORIES, difficulties=DIFFICULTIES,
+                 batch_size=TRIVIA_BATCH_SIZE, low_water=TRIVIA_LOW_WATER,
+                 recent_size=TRIVIA_RECENT_SIZE, timeout=TRIVIA_HTTP_TIMEOUT, bank=None, offline=TRIVIA_OFFLINE):
+        self.url = url
+        self.bank = bank
+        self.offline = offline
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self.timeout = timeout
+        self._buffers = {(category, difficulty): deque() for category in categories for difficulty in difficulties}
+        self._recent = deque(maxlen=recent_size)  # Question ids, oldest first
+        self._seen = set()  # Ids in _recent or in a buffer
+        self._session = None
+        self._wake = asyncio.Event()
+        self._task = None
+
+        # Counters
+        self.requests = 0
+        self.failures = 0
+        self.duplicates = 0
+        self.served = 0
+        self.misses = 0  # get() calls that found nothing buffered
+        self.from_bank = 0
+
+    def start(self):
+        if self.offline:
+            return
+        if not self._session:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit_per_host=4),  # Keep-alive connections shared by every refill
+            )
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+            self._wake.set()  # Fill every buffer straight away
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    def buffered(self):
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    def get(self, category=None, difficulty=None):
+        """A question from the buffers (random among those with questions left), or None if they're empty."""
+        keys = [key for key, buffer in self._buffers.items()
+                if buffer and category in (None, key[0]) and difficulty in (None, key[1])]
+        if not keys:
+            self.misses += 1
+            self._wake.set()
+            return None
+
+        key = random.choice(keys)
+        buffer = self._buffers[key]
+        question = buffer.popleft()
+        self._remember(question.question_id)
+        if self.bank is not None:
+            self.bank.mark_asked(question.question_id)
+        if len(buffer) < self.low_water:
+            self._wake.set()
+        self.served += 1
+        return question
+
+    async def fetch(self, category=None, difficulty=None):
+        """A question from the buffers, else the bank, else one batch from the API (cold start). None if all fail."""
+        if not self.offline:
+            question = self.get(category, difficulty)
+            if question:
+                return question
+        if self.bank is not None:
+            question = self.bank.draw(category, difficulty)
+            if question:
+                self._remember(question.question_id)
+                self.from_bank += 1
+                return question
+        if self.offline:
+            return None
+        category = category or random.choice([key[0] for key in self._buffers])
+        difficulty = difficulty or random.choice([key[1] for key in self._buffers])
+        try:
+            await self._refill((category, difficulty))
+        except Exception as e:
+            print(f" Trivia fetch failed: {e}")
+            return None
+        return self.get(category, difficulty)
+
+    def _remember(self, question_id):
+        if len(self._recent) == self._recent.maxlen:
+            self._seen.discard(self._recent[0])
+        self._recent.append(question_id)
+        self._seen.add(question_id)
+
+    async def _fetch_batch(self, category, difficulty):
+        self.requests += 1
+        params = {'limit': self.batch_size, 'categories': category, 'difficulties': difficulty}
+        async with self._session.get(self.url, params=params) as response:
+            response.raise_for_status()
+            data = await response.json()
+        return [TriviaQuestion.from_api(item) for item in data]
+
+    async def _refill(self, key):
+        """Fetches one batch for a (category, difficulty) and buffers the questions not seen recently."""
+        try:
+            questions = await self._fetch_batch(*key)
+        except Exception:
+            self.failures += 1
+            raise
+        if self.bank is not None:
+            try:
+                self.bank.add(questions)
+            except Exception as e:
+                print(f" Couldn't add trivia questions to the bank: {e}")
+        buffer = self._buffers[key]
+        for question in questions:
+            if question.question_id in self._seen:
+                self.duplicates += 1
+                continue
+            self._seen.add(question.question_id)
+            buffer.append(question)
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            low = [key for key, buffer in self._buffers.items() if len(buffer) < self.low_water]
+            results = await asyncio.gather(*(self._refill(key) for key in low), return_exceptions=True)
+            errors = [result for result in results if isinstance(result, Exception)]
+            if errors:
+                print(f" Trivia refill failed for {len(errors)}/{len(low)} categories (will retry): {errors[0]}")
+                await asyncio.sleep(TRIVIA_RETRY_SECONDS)
+                self._wake.set()
+
+    def stats(self):
+        return {
+            'buffered': self.buffered(),
+            'served': self.served,
+            'from_bank': self.from_bank,
+            'misses': self.misses,
+            'requests': self.requests,
+            'failures': self.failures,
+            'duplicates': self.duplicates,
+        }
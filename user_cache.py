@@ -0,0 +1,154 @@
+import os
+import time
+from collections import OrderedDict
+
+# --- User Cache Settings (override with environment variables) ---
+USER_CACHE_MAX_USERS = int(os.getenv("USER_CACHE_MAX_USERS", "5000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "600"))  # Re-read from the DB after this long
+# --- End User Cache Settings ---
+
+# What can be cached per user, and what each field holds
+FIELDS = (
+    'coins',         # pp_coins (int)
+    'stats',         # user_stats counters (dict), None if the user has no row
+    'pp_size',       # (size, last_roll_timestamp) from pp_sizes, None if they haven't rolled today
+    'achievements',  # [(name, description)] in the order they were earned
+    'earned',        # Bitmask of earned achievement ids (AchievementCatalog.bit)
+)
+TABLE_FIELDS = {'user_data': 'coins', 'user_stats': 'stats'}  # Counter table -> field it lives in
+
+MISSING = object()  # get() result for a field that isn't cached
+
+
+class UserStateCache:
+    """Bounded LRU cache of per-user state that is read far more often than it changes.
+
+    Every code path that changes one of these tables also updates the cache
+    (write-through), so entries hold the logical value including counter
+    increments that haven't been flushed yet. Fields expire independently
+    after the TTL. A DB read started before a write to the same user is
+    not allowed to fill the cache, so a slow read can't overwrite newer state.
+    """
+
+    def __init__(self, max_users=USER_CACHE_MAX_USERS, ttl=USER_CACHE_TTL_SECONDS):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user_id -> {field: (value, expires_at)}, least recently used first
+        self._seq = 0  # Bumped by every write
+        self._last_write = {}  # user_id -> seq of their latest write
+        self._floor = 0  # Fill tokens older than this are refused (set when _last_write is pruned)
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, user_id, field):
+        """Returns the cached value of a field, or MISSING."""
+        entry = self._entries.get(user_id)
+        cached = entry.get(field) if entry else None
+        if cached is None or cached[1] <= time.monotonic():
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        self._entries.move_to_end(user_id)
+        return cached[0]
+
+    def token(self):
+        """Call before reading a user's state from the DB; pass the result to fill()."""
+        return self._seq
+
+    def fill(self, user_id, field, value, token):
+        """Caches a value read from the DB, unless the user was written to since the read began."""
+        if token < self._floor or self._last_write.get(user_id, -1) > token:
+            return
+        self._store(user_id, field, value)
+
+    def _store(self, user_id, field, value):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            entry = self._entries[user_id] = {}
+            if len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._entries.move_to_end(user_id)
+        entry[field] = (value, time.monotonic() + self.ttl)
+
+    def _written(self, user_id):
+        self._seq += 1
+        self._last_write[user_id] = self._seq
+        if len(self._last_write) > self.max_users * 4:
+            # Only reads still in flight care about old writes; make them all refuse to fill instead
+            self._last_write = {}
+            self._floor = self._seq
+
+    def set(self, user_id, field, value):
+        """Write-through: records a field's new value."""
+        self._written(user_id)
+        self._store(user_id, field, value)
+
+    def add(self, table, user_id, deltas):
+        """Write-through for counter increments (see counter_buffer.COUNTER_COLUMNS)."""
+        self._written(user_id)
+        field = TABLE_FIELDS[table]
+        entry = self._entries.get(user_id)
+        cached = entry.get(field) if entry else None
+        if cached is None:
+            return  # Not cached; the next read loads it
+
+        value, expires = cached
+        if field == 'coins':
+            value += deltas.get('pp_coins', 0)
+        else:
+            value = dict(value or {})
+            for column, delta in deltas.items():
+                value[column] = (value.get(column) or 0) + delta
+        entry[field] = (value, expires)
+
+    def update(self, user_id, field, change):
+        """Write-through: replaces a cached field with change(value). Does nothing if it isn't cached."""
+        self._written(user_id)
+        entry = self._entries.get(user_id)
+        cached = entry.get(field) if entry else None
+        if cached is not None:
+            entry[field] = (change(cached[0]), cached[1])
+
+    def append(self, user_id, field, item):
+        """Write-through for list fields (e.g. a newly earned achievement)."""
+        self.update(user_id, field, lambda items: items + [item])
+
+    def invalidate(self, user_id, field=None):
+        """Drops one field (or everything) cached for a user."""
+        self._written(user_id)
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return
+        if field is None:
+            del self._entries[user_id]
+        else:
+            entry.pop(field, None)
+
+    def clear_field(self, field):
+        """Drops a field for every user (e.g. pp_size when the daily reset empties pp_sizes)."""
+        self._last_write = {}
+        self._seq += 1
+        self._floor = self._seq
+        for entry in self._entries.values():
+            entry.pop(field, None)
+
+    def stats(self):
+        """Returns cache size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            'users': len(self._entries),
+            'max_users': self.max_users,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+        }